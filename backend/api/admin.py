@@ -1,5 +1,29 @@
-from django.contrib import admin
-from .models import Bird
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ERROR_FLAG, ChangeList
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from . import bulk_edits, exports
+from .models import Bird, RequestProfile
+
+EXPORT_FIELDS = ("id", "genus", "species", "subspecies", "english_name", "family")
+
+
+class ExportChangeList(ChangeList):
+    """A changelist that only builds its queryset, for exports.
+
+    Skips ``get_results``, whose pagination runs ``COUNT`` queries the export
+    doesn't need.
+    """
+
+    def get_results(self, request):
+        pass
 
 
 class BirdAdmin(admin.ModelAdmin):
@@ -7,6 +31,189 @@ class BirdAdmin(admin.ModelAdmin):
     search_fields = ("genus", "species", "subspecies", "english_name")
     list_filter = ("genus", "species")
     empty_value_display = "—"
+    actions = (
+        "export_csv",
+        "export_ndjson",
+        "set_family",
+        "rename_genus",
+        "replace_in_english_name",
+    )
+
+    def get_urls(self):
+        return [
+            path(
+                "export/<str:format>/",
+                self.admin_site.admin_view(self.export_view),
+                name="api_bird_export",
+            ),
+        ] + super().get_urls()
+
+    def get_changelist(self, request, **kwargs):
+        if request.resolver_match.url_name == "api_bird_export":
+            return ExportChangeList
+        return super().get_changelist(request, **kwargs)
+
+    def export_view(self, request, format):
+        """Export every bird matching the changelist's current filters and search."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if format not in exports.FORMATS:
+            raise Http404(f"Unknown export format {format!r}")
+        try:
+            changelist = self.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            # As changelist_view does, but back on the changelist itself
+            return HttpResponseRedirect(
+                f"{reverse('admin:api_bird_changelist')}?{ERROR_FLAG}=1"
+            )
+        return exports.export_response(
+            changelist.queryset, EXPORT_FIELDS, format, "birds"
+        )
+
+    @admin.action(description="Export selected birds as CSV")
+    def export_csv(self, request, queryset):
+        return exports.export_response(queryset, EXPORT_FIELDS, "csv", "birds")
+
+    @admin.action(description="Export selected birds as NDJSON")
+    def export_ndjson(self, request, queryset):
+        return exports.export_response(queryset, EXPORT_FIELDS, "ndjson", "birds")
+
+    @admin.action(description="Set family of selected birds", permissions=["change"])
+    def set_family(self, request, queryset):
+        return self._bulk_edit(request, queryset, bulk_edits.SET_FAMILY)
+
+    @admin.action(description="Rename genus of selected birds", permissions=["change"])
+    def rename_genus(self, request, queryset):
+        return self._bulk_edit(request, queryset, bulk_edits.RENAME_GENUS)
+
+    @admin.action(
+        description="Find and replace in English name of selected birds",
+        permissions=["change"],
+    )
+    def replace_in_english_name(self, request, queryset):
+        return self._bulk_edit(request, queryset, bulk_edits.REPLACE_IN_NAME)
+
+    def _bulk_edit(self, request, queryset, edit):
+        """Show the edit's form and preview, then apply it on confirmation."""
+        form = edit.form_class(request.POST if "bulk_edit" in request.POST else None)
+        preview = None
+        if form.is_bound and form.is_valid():
+            if "apply" in request.POST:
+                updated, too_long = edit.apply(queryset, form.cleaned_data)
+                self.message_user(
+                    request, f"Updated {updated} birds.", messages.SUCCESS
+                )
+                if too_long:
+                    self.message_user(
+                        request,
+                        f"Skipped {too_long} birds whose new {edit.field} would be"
+                        " too long.",
+                        messages.WARNING,
+                    )
+                return None
+            preview = edit.preview(queryset, form.cleaned_data)
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": self.get_action(request.POST["action"])[2],
+            "opts": self.model._meta,
+            "form": form,
+            "field": edit.field,
+            "preview": preview,
+            "action": request.POST["action"],
+            "select_across": request.POST.get("select_across", "0"),
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, "admin/api/bird/bulk_edit.html", context)
 
 
 admin.site.register(Bird, BirdAdmin)
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "sql_ms",
+        "user",
+    )
+    list_select_related = ("user",)
+    list_filter = ("method", "status_code")
+    search_fields = ("path",)
+    date_hierarchy = "created_at"
+    fields = (
+        "created_at",
+        "method",
+        "path",
+        "status_code",
+        "user",
+        "duration_ms",
+        "sample_count",
+        "sample_interval",
+        "stacks_download",
+        "query_count",
+        "sql_ms",
+        "sql_timeline",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:object_id>/stacks/",
+                self.admin_site.admin_view(self.stacks_view),
+                name="api_requestprofile_stacks",
+            ),
+        ] + super().get_urls()
+
+    def stacks_view(self, request, object_id):
+        """Download the profile's stacks in the collapsed flamegraph format."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=object_id)
+        response = HttpResponse(profile.stacks, content_type="text/plain")
+        response["Content-Disposition"] = (
+            f'attachment; filename="profile-{profile.pk}.collapsed"'
+        )
+        return response
+
+    @admin.display(description="Stacks")
+    def stacks_download(self, obj):
+        return format_html(
+            '<a href="{}">Download</a> ({} stacks) for flamegraph.pl or speedscope',
+            reverse("admin:api_requestprofile_stacks", args=[obj.pk]),
+            obj.stacks.count("\n") + 1 if obj.stacks else 0,
+        )
+
+    @admin.display(description="SQL timeline")
+    def sql_timeline(self, obj):
+        """Queries in execution order, with their start offset and duration."""
+        if not obj.queries:
+            return "—"
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+            (
+                (query["start_ms"], query["duration_ms"], query["alias"], query["sql"])
+                for query in obj.queries
+            ),
+        )
+        return format_html(
+            "<table><thead><tr><th>Start (ms)</th><th>Duration (ms)</th>"
+            "<th>Database</th><th>SQL</th></tr></thead><tbody>{}</tbody></table>",
+            rows,
+        )
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
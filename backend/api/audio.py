@@ -0,0 +1,228 @@
+"""Local cache and decoding of xeno-canto recording audio.
+
+Audio files are kept in ``RECORDING_AUDIO["DIR"]`` as ``<id>.wav``, ``.flac``
+or ``.mp3``. WAV files are decoded with the stdlib; FLAC, MP3 and floating
+point WAV need the optional ``soundfile`` package (libsndfile 1.1 or later
+for MP3). Decoded audio is a mono float32 NumPy array scaled to [-1, 1], so
+NumPy is required to decode anything; without it ``decode`` raises
+``AudioUnavailable``.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import urllib.error
+import urllib.request
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import recordings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import soundfile
+except (ImportError, OSError):  # OSError: libsndfile itself is missing
+    soundfile = None
+
+DEFAULT_SETTINGS = {
+    "DIR": os.path.join(tempfile.gettempdir(), "hellobirdie-audio"),
+    # Only the start of longer recordings is decoded
+    "MAX_SECONDS": 60,
+    "TIMEOUT": 30,
+}
+
+EXTENSIONS = (".wav", ".flac", ".mp3")
+CONTENT_TYPES = {
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/wave": ".wav",
+    "audio/flac": ".flac",
+    "audio/x-flac": ".flac",
+    "audio/mpeg": ".mp3",
+}
+
+
+class AudioUnavailable(Exception):
+    pass
+
+
+def get_audio_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "RECORDING_AUDIO", {})}
+
+
+def audio_path(recording_id, directory=None):
+    """Return the cached audio file of ``recording_id``, or ``None``."""
+    directory = directory or get_audio_settings()["DIR"]
+    for extension in EXTENSIONS:
+        path = os.path.join(directory, f"{recording_id}{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def cached_recording_ids(directory=None):
+    """Return the ids of every cached recording, in numeric order."""
+    directory = directory or get_audio_settings()["DIR"]
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    ids = {
+        stem
+        for stem, extension in map(os.path.splitext, names)
+        if extension in EXTENSIONS and recordings.is_ascii_digits(stem)
+    }
+    return sorted(ids, key=int)
+
+
+def _download(recording_id, url, directory, timeout):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            content_type = response.headers.get_content_type()
+            extension = CONTENT_TYPES.get(content_type)
+            if extension is None:
+                raise recordings.UpstreamError(f"unsupported audio type {content_type}")
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    while chunk := response.read(1 << 16):
+                        f.write(chunk)
+                path = os.path.join(directory, f"{recording_id}{extension}")
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+    except (urllib.error.URLError, TimeoutError) as error:
+        raise recordings.UpstreamError(str(error)) from error
+    return path
+
+
+def fetch_audio(recording_ids):
+    """Download the audio of recordings that aren't cached yet.
+
+    Returns ``(paths, errors)`` mapping ids to their cached file or to a
+    message, like ``recordings.get_recordings``.
+    """
+    options = get_audio_settings()
+    paths = {}
+    missing = []
+    for recording_id in recording_ids:
+        path = audio_path(recording_id, options["DIR"])
+        if path is None:
+            missing.append(recording_id)
+        else:
+            paths[recording_id] = path
+    if not missing:
+        return paths, {}
+
+    details, errors = recordings.get_recordings(missing)
+    urls = {
+        recording_id: recording["file"]
+        for recording_id, recording in details.items()
+        if recording.get("file")
+    }
+    errors.update(
+        (recording_id, "no audio file")
+        for recording_id in details
+        if recording_id not in urls
+    )
+    if urls:
+        workers = min(len(urls), recordings.get_xeno_canto_settings()["MAX_WORKERS"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                recording_id: executor.submit(
+                    _download, recording_id, url, options["DIR"], options["TIMEOUT"]
+                )
+                for recording_id, url in urls.items()
+            }
+        for recording_id, future in futures.items():
+            try:
+                paths[recording_id] = future.result()
+            except recordings.UpstreamError as error:
+                errors[recording_id] = f"upstream error: {error}"
+    return paths, errors
+
+
+def _decode_wav(path, max_seconds):
+    with wave.open(path, "rb") as f:
+        rate = f.getframerate()
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        frames = f.getnframes()
+        if max_seconds:
+            frames = min(frames, int(max_seconds * rate))
+        data = f.readframes(frames)
+
+    if width == 1:
+        samples = (np.frombuffer(data, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        # Widen 24-bit samples to int32 by adding a low zero byte
+        raw = np.frombuffer(data, np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(raw), 4), np.uint8)
+        padded[:, 1:] = raw
+        samples = padded.view("<i4").ravel().astype(np.float32) / 2**31
+    elif width in (2, 4):
+        dtype = f"<i{width}"
+        samples = np.frombuffer(data, dtype).astype(np.float32) / 2 ** (8 * width - 1)
+    else:
+        raise AudioUnavailable(f"unsupported sample width {width}")
+    return samples.reshape(-1, channels).mean(axis=1), rate
+
+
+def decode(path, max_seconds=None):
+    """Return ``(samples, rate)`` of an audio file, mixed down to mono."""
+    if np is None:
+        raise AudioUnavailable("NumPy is not installed")
+    if max_seconds is None:
+        max_seconds = get_audio_settings()["MAX_SECONDS"]
+    if path.endswith(".wav"):
+        try:
+            return _decode_wav(path, max_seconds)
+        except (wave.Error, EOFError) as error:
+            if soundfile is None:
+                raise AudioUnavailable(f"{path}: {error}") from error
+    if soundfile is None:
+        raise AudioUnavailable(f"soundfile is needed to decode {path}")
+    try:
+        with soundfile.SoundFile(path) as f:
+            frames = int(max_seconds * f.samplerate) if max_seconds else -1
+            samples = f.read(frames, dtype="float32", always_2d=True)
+            return samples.mean(axis=1), f.samplerate
+    except RuntimeError as error:
+        raise AudioUnavailable(f"{path}: {error}") from error
+
+
+def stft_magnitudes(samples, n_fft=512, hop=256):
+    """Return the magnitude spectrogram of ``samples`` as (frames, bins) float32.
+
+    All frames are windowed and transformed in one batched FFT.
+    """
+    if len(samples) < n_fft:
+        samples = np.pad(samples, (0, n_fft - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop]
+    window = np.hanning(n_fft).astype(np.float32)
+    return np.abs(np.fft.rfft(frames * window, axis=1)).astype(np.float32)
+
+
+def map_batches(func, items, options, processes=None):
+    """Yield ``func(batch, options)`` for batches of ``options["BATCH_SIZE"]`` items.
+
+    Batches run on a pool of ``processes`` (default: one per core), or in this
+    process when there is a single batch, ``processes`` is 1, or this process
+    is itself a daemonic pool worker, which may not start children.
+    """
+    size = options["BATCH_SIZE"]
+    batches = [items[start : start + size] for start in range(0, len(items), size)]
+    if processes == 1 or len(batches) <= 1 or multiprocessing.current_process().daemon:
+        for batch in batches:
+            yield func(batch, options)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(func, batches, [options] * len(batches))
@@ -0,0 +1,85 @@
+"""Set-based edits of many birds at once, used by the admin's bulk actions.
+
+Each edit is one ``UPDATE`` of the rows it would actually change, run in a
+transaction; previews only count and sample rows, so no ``Bird`` instances are
+loaded either way. ``QuerySet.update()`` sends no model signals, so the
+catalogue version is bumped once after the transaction commits.
+
+Rows whose new value would be longer than the field's ``max_length`` (as a
+find and replace can make it) are left alone and counted as too long.
+"""
+
+from django.db import transaction
+from django.db.models import CharField, Expression, Value
+from django.db.models.functions import Length, Replace
+
+from . import forms
+from .cache import bump_catalogue_version
+
+PREVIEW_SAMPLES = 10
+
+
+class BulkEdit:
+    """Sets ``field`` to the value ``make_value`` builds from a valid form."""
+
+    def __init__(self, field, form_class, make_value):
+        self.field = field
+        self.form_class = form_class
+        self.make_value = make_value
+
+    def changing(self, queryset, value):
+        """Return the rows the edit changes and those whose new value is too long."""
+        # Comparing with the new value also works for expressions like Replace
+        changing = queryset.exclude(**{self.field: value})
+        max_length = queryset.model._meta.get_field(self.field).max_length
+        if not isinstance(value, Expression) or max_length is None:
+            # Plain values are limited by the form
+            return changing, changing.none()
+        changing = changing.alias(new_length=Length(value))
+        return (
+            changing.filter(new_length__lte=max_length),
+            changing.filter(new_length__gt=max_length),
+        )
+
+    def preview(self, queryset, data, samples=PREVIEW_SAMPLES):
+        """Return the number of matched, changing and too long rows and a few
+        samples."""
+        value = self.make_value(data)
+        changing, too_long = self.changing(queryset, value)
+        if not isinstance(value, Expression):
+            value = Value(value, output_field=CharField())
+        return {
+            "matched": queryset.count(),
+            "changing": changing.count(),
+            "too_long": too_long.count(),
+            "max_length": queryset.model._meta.get_field(self.field).max_length,
+            "samples": list(
+                changing.order_by(self.field)
+                .annotate(new_value=value)
+                .values_list(self.field, "new_value")[:samples]
+            ),
+        }
+
+    def apply(self, queryset, data):
+        """Update the changing rows and return how many were updated and how
+        many were skipped as too long."""
+        value = self.make_value(data)
+        with transaction.atomic():
+            changing, too_long = self.changing(queryset, value)
+            # Before the update, which can change what the replacement gives
+            skipped = too_long.count()
+            updated = changing.update(**{self.field: value})
+            if updated:
+                transaction.on_commit(bump_catalogue_version)
+        return updated, skipped
+
+
+SET_FAMILY = BulkEdit(
+    "family", forms.SetFamilyForm, lambda data: data["family"] or None
+)
+RENAME_GENUS = BulkEdit("genus", forms.RenameGenusForm, lambda data: data["genus"])
+REPLACE_IN_NAME = BulkEdit(
+    "english_name",
+    forms.ReplaceNameForm,
+    lambda data: Replace("english_name", Value(data["find"]), Value(data["replace"])),
+)
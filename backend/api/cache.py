@@ -0,0 +1,355 @@
+"""Tag-aware response cache for the api app.
+
+Cached entries are keyed on the endpoint name, the normalized query string and
+the current version of every tag the endpoint depends on. Invalidating a tag
+bumps its version, so only entries built against that tag stop matching; the
+stale entries simply age out of the backend.
+
+Tag versions always live in Django's cache framework so that every worker sees
+the same versions, while the entries themselves can be kept in a process-local
+LRU, in Django's cache or on disk (see ``API_CACHE`` in settings). That only
+holds when ``CACHES[CACHE_ALIAS]`` is shared between processes; a process-local
+cache such as ``LocMemCache`` fails the ``api.E001`` system check.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from . import routers
+from .responses import negotiate_encoding
+
+CATALOGUE_TAG = "catalogue"
+
+DEFAULT_SETTINGS = {
+    "BACKEND": "lru",
+    "TIMEOUT": 300,
+    "MAX_ENTRIES": 1024,
+    "LOCATION": os.path.join(tempfile.gettempdir(), "hellobirdie-api-cache"),
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "api",
+}
+
+
+def get_cache_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "API_CACHE", {})}
+
+
+class LRUBackend:
+    """Process-local cache that evicts the least recently used entry."""
+
+    def __init__(self, max_entries=1024, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Stores entries in one of the caches configured in ``CACHES``."""
+
+    def __init__(self, cache_alias="default", key_prefix="api", **options):
+        self.cache = caches[cache_alias]
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        return self.cache.get(f"{self.key_prefix}:entry:{key}")
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(f"{self.key_prefix}:entry:{key}", value, timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class FileBackend:
+    """Stores each entry as a pickle file named after its key."""
+
+    def __init__(self, location, **options):
+        self.location = location
+
+    def _path(self, key):
+        return os.path.join(self.location, f"{key}.cache")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at is not None and expires_at < time.time():
+            return None
+        return value
+
+    def set(self, key, value, timeout=None):
+        os.makedirs(self.location, exist_ok=True)
+        expires_at = time.time() + timeout if timeout else None
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.location)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((expires_at, value), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+
+    def clear(self):
+        if not os.path.isdir(self.location):
+            return
+        for name in os.listdir(self.location):
+            if name.endswith(".cache"):
+                os.remove(os.path.join(self.location, name))
+
+
+BACKENDS = {
+    "lru": LRUBackend,
+    "django": DjangoCacheBackend,
+    "file": FileBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured entry backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = get_cache_settings()
+                _backend = BACKENDS[config["BACKEND"]](
+                    max_entries=config["MAX_ENTRIES"],
+                    location=config["LOCATION"],
+                    cache_alias=config["CACHE_ALIAS"],
+                    key_prefix=config["KEY_PREFIX"],
+                )
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting in ("API_CACHE", "CACHES"):
+        _backend = None
+
+
+# Tag versions
+
+
+def _version_cache():
+    return caches[get_cache_settings()["CACHE_ALIAS"]]
+
+
+def _tag_key(tag):
+    return f"{get_cache_settings()['KEY_PREFIX']}:tag:{tag}"
+
+
+def get_tag_versions(tags):
+    """Return a dict mapping each tag to its current version."""
+    cache = _version_cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, tag in keys.items():
+        if tag not in versions:
+            # A missing version (never set, or evicted) starts from the clock so it
+            # can never collide with a version used before the eviction.
+            cache.add(key, time.time_ns(), None)
+            versions[tag] = cache.get(key)
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Bump the version of each tag, orphaning every entry built against it."""
+    cache = _version_cache()
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def catalogue_version():
+    """Version of the ``Bird`` catalogue, bumped on every write to it."""
+    return get_tag_versions([CATALOGUE_TAG])[CATALOGUE_TAG]
+
+
+def bump_catalogue_version():
+    invalidate_tags(CATALOGUE_TAG)
+
+
+# Hit-rate reporting
+
+
+class CacheStats:
+    """Per-endpoint hit and miss counters for the current process."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def report(self):
+        with self._lock:
+            return {
+                name: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses),
+                }
+                for name, (hits, misses) in sorted(self._counts.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+# Response caching
+
+
+def normalize_query(query_dict, ignore=()):
+    """Return the query parameters as a canonical, order-independent tuple."""
+    return tuple(
+        (key, tuple(sorted(query_dict.getlist(key))))
+        for key in sorted(query_dict)
+        if key not in ignore
+    )
+
+
+def make_key(name, query, tag_versions, extra=()):
+    raw = repr((name, query, sorted(tag_versions.items()), extra))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+ENTRY_HEADERS = ("Content-Type", "Content-Encoding", "Vary")
+
+
+def _entry_headers(response):
+    return tuple(
+        (header, response[header])
+        for header in ENTRY_HEADERS
+        if response.has_header(header)
+    )
+
+
+def _store_streaming(backend, key, response, timeout):
+    """Pass a streaming response through, caching its body once fully sent."""
+    headers = _entry_headers(response)
+    stream = response.streaming_content
+
+    def tee():
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        backend.set(key, (response.status_code, headers, b"".join(chunks)), timeout)
+
+    response.streaming_content = tee()
+
+
+def cache_response(
+    name, tags=(), timeout=None, ignore_params=(), vary_on_encoding=False
+):
+    """Cache successful GET responses of a view as serialized bytes.
+
+    ``tags`` is either an iterable of tag names or a callable taking the request
+    and returning one, for endpoints whose dependencies vary per request. Views
+    that compress their output according to ``Accept-Encoding`` should pass
+    ``vary_on_encoding=True`` so each content encoding gets its own entry.
+    Streaming responses are cached once the whole body has been sent, and
+    responses marked ``Cache-Control: no-store`` aren't cached.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+
+            config = get_cache_settings()
+            backend = get_backend()
+            request_tags = tags(request) if callable(tags) else tags
+            extra = (args, sorted(kwargs.items()))
+            if vary_on_encoding:
+                extra += (negotiate_encoding(request),)
+            key = make_key(
+                name,
+                normalize_query(request.GET, ignore_params),
+                get_tag_versions(request_tags),
+                extra,
+            )
+
+            entry = backend.get(key)
+            if entry is not None:
+                stats.record(name, hit=True)
+                status, headers, content = entry
+                response = HttpResponse(content, status=status)
+                for header, value in headers:
+                    response[header] = value
+                response["X-Cache"] = "HIT"
+                return response
+
+            stats.record(name, hit=False)
+            # The entry is stored under the current tag versions, which a
+            # lagging replica's rows may predate
+            routers.pin_to_primary()
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and "no-store" not in response.get(
+                "Cache-Control", ""
+            ):
+                entry_timeout = timeout if timeout is not None else config["TIMEOUT"]
+                if response.streaming:
+                    _store_streaming(backend, key, response, entry_timeout)
+                else:
+                    entry = (200, _entry_headers(response), response.content)
+                    backend.set(key, entry, entry_timeout)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
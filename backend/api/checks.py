@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Caches whose contents other processes can't see
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """The api cache's tag versions must be visible to every worker process."""
+    from .cache import get_cache_settings
+
+    alias = get_cache_settings()["CACHE_ALIAS"]
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend in PROCESS_LOCAL_CACHES:
+        return [
+            Error(
+                f"CACHES[{alias!r}] uses {backend.rsplit('.', 1)[-1]}, which "
+                "worker processes don't share.",
+                hint=(
+                    "Tag versions in api/cache.py would differ per process, so "
+                    "writes wouldn't invalidate other workers' cached responses. "
+                    "Use a shared backend such as FileBasedCache or RedisCache."
+                ),
+                id="api.E001",
+            )
+        ]
+    return []
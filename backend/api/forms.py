@@ -0,0 +1,16 @@
+from django import forms
+
+
+class SetFamilyForm(forms.Form):
+    family = forms.CharField(
+        max_length=50, required=False, help_text="Leave empty to clear the family."
+    )
+
+
+class RenameGenusForm(forms.Form):
+    genus = forms.CharField(max_length=50)
+
+
+class ReplaceNameForm(forms.Form):
+    find = forms.CharField(max_length=75, strip=False)
+    replace = forms.CharField(max_length=75, required=False, strip=False)
@@ -0,0 +1,110 @@
+"""Geohash encoding and helpers for location-quantized queries."""
+
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+DECODE_MAP = {c: i for i, c in enumerate(BASE32)}
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(lat, lng, precision=12):
+    """Return the geohash of a point with ``precision`` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            bounds, coordinate = lng_range, lng
+        else:
+            bounds, coordinate = lat_range, lat
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def bounds(geohash):
+    """Return ``(min_lat, min_lng, max_lat, max_lng)`` of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            bounds_ = lng_range if even else lat_range
+            mid = (bounds_[0] + bounds_[1]) / 2
+            if value >> shift & 1:
+                bounds_[0] = mid
+            else:
+                bounds_[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def cell_size_km(geohash):
+    """Return the ``(height, width)`` of a cell in km, measured at its narrowest."""
+    min_lat, min_lng, max_lat, max_lng = bounds(geohash)
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    height = (max_lat - min_lat) * KM_PER_DEGREE
+    width = (max_lng - min_lng) * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+    return height, width
+
+
+def neighbours(geohash):
+    """Return the cell and its (up to) eight neighbours at the same precision."""
+    min_lat, min_lng, max_lat, max_lng = bounds(geohash)
+    height = max_lat - min_lat
+    width = max_lng - min_lng
+    center_lat = (min_lat + max_lat) / 2
+    center_lng = (min_lng + max_lng) / 2
+    cells = []
+    for dy in (-1, 0, 1):
+        lat = center_lat + dy * height
+        if not -90 < lat < 90:
+            continue
+        for dx in (-1, 0, 1):
+            lng = (center_lng + dx * width + 180) % 360 - 180
+            cell = encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def precision_for_radius(lat, lng, radius_km, max_precision=7):
+    """Return the finest precision whose cell around the point spans ``radius_km``.
+
+    With cells at least as large as the radius, a circle centred anywhere in
+    a cell lies within that cell and its eight neighbours.
+    """
+    for precision in range(max_precision, 0, -1):
+        if min(cell_size_km(encode(lat, lng, precision))) >= radius_km:
+            return precision
+    return 1
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points (haversine)."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
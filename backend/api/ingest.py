@@ -0,0 +1,69 @@
+"""Ingestion of xeno-canto recordings as sightings."""
+
+import datetime
+
+from django.db import transaction
+
+from . import cache, rollups
+from .geohash import encode as encode_geohash
+from .models import Bird, Sighting
+from .sightings import location_tags
+
+
+def parse_recording(recording, birds):
+    """Turn a xeno-canto API recording into an unsaved ``Sighting``.
+
+    ``birds`` maps lowercase ``(genus, species)`` to bird ids. Returns ``None``
+    for recordings of unknown birds or without a usable location or date.
+    """
+    bird_id = birds.get(
+        (recording.get("gen", "").lower(), recording.get("sp", "").lower())
+    )
+    try:
+        latitude = float(recording["lat"])
+        longitude = float(recording["lng"])
+        observed_on = datetime.date.fromisoformat(recording["date"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if bird_id is None:
+        return None
+    return Sighting(
+        bird_id=bird_id,
+        latitude=latitude,
+        longitude=longitude,
+        observed_on=observed_on,
+        geohash=encode_geohash(latitude, longitude),
+        recording_id=f"XC{recording['id']}" if recording.get("id") else None,
+    )
+
+
+def ingest_recordings(recordings, batch_size=1000):
+    """Store xeno-canto recordings as sightings and update the rollups.
+
+    Sightings are bulk-inserted, so model signals do not fire; the rollups and
+    the cached cells of every affected location are updated here instead.
+    Returns the number of sightings created.
+    """
+    birds = {
+        (genus.lower(), species.lower()): pk
+        for pk, genus, species in Bird.objects.values_list("id", "genus", "species")
+    }
+    sightings = [
+        sighting
+        for sighting in (parse_recording(recording, birds) for recording in recordings)
+        if sighting is not None
+    ]
+
+    with transaction.atomic():
+        Sighting.objects.bulk_create(sightings, batch_size=batch_size)
+        rollups.apply_counts(
+            rollups.count_sightings(
+                (s.bird_id, s.latitude, s.longitude, s.observed_on) for s in sightings
+            )
+        )
+
+    tags = set()
+    for sighting in sightings:
+        tags.update(location_tags(sighting.latitude, sighting.longitude))
+    cache.invalidate_tags(*tags)
+    return len(sightings)
@@ -0,0 +1,314 @@
+"""A small job queue stored in the database.
+
+Jobs are ``Job`` rows naming a registered task and its keyword arguments.
+Workers claim the highest-priority due job with ``SELECT ... FOR UPDATE SKIP
+LOCKED``, so any number of workers can share the table without handing out a
+job twice. Failed jobs are retried with exponential backoff until they run out
+of attempts.
+
+On PostgreSQL, ``enqueue`` sends a ``NOTIFY`` that wakes idle workers
+immediately; they otherwise only poll every ``POLL_INTERVAL`` seconds to pick
+up retries that become due. Other databases have no ``NOTIFY``, so workers
+poll at that interval. Tasks are registered with ``@task`` in the ``tasks``
+module of an installed app.
+"""
+
+import datetime
+import logging
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "CHANNEL": "api_jobs",
+    "POLL_INTERVAL": 5,
+    # Seconds before the first retry; doubled for each further attempt
+    "RETRY_DELAY": 10,
+    # Running jobs older than this are requeued (or failed, if out of attempts)
+    "STALE_AFTER": 3600,
+    # Seconds between checks for stale jobs while workers run
+    "STALE_CHECK_INTERVAL": 60,
+    "METRICS_INTERVAL": 60,
+}
+
+TASKS = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def get_queue_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "JOB_QUEUE", {})}
+
+
+def task(func=None, *, name=None):
+    """Register ``func`` as a task, by default under its module and name."""
+
+    def register(func):
+        TASKS[name or f"{func.__module__}.{func.__name__}"] = func
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        return func
+
+    return register(func) if func is not None else register
+
+
+def autodiscover():
+    autodiscover_modules("tasks")
+
+
+def enqueue(task, priority=0, run_at=None, max_attempts=3, **kwargs):
+    """Queue ``task`` (a registered function or task name) with ``kwargs``."""
+    name = getattr(task, "task_name", task)
+    if name not in TASKS:
+        raise UnknownTask(name)
+    job = Job.objects.create(
+        task=name,
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+    if connection.vendor == "postgresql":
+        # Delivered when the enqueuing transaction commits
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [get_queue_settings()["CHANNEL"], name]
+            )
+    return job
+
+
+def claim():
+    """Mark the next due job as running and return it, or ``None``."""
+    while True:
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.QUEUED, run_at__lte=timezone.now())
+                .order_by("-priority", "run_at", "id")
+                .first()
+            )
+            if job is None:
+                return None
+            # Databases without row locks (SQLite) can hand the same row to
+            # two workers; only the one whose update matches gets the job
+            job.attempts += 1
+            job.started_at = timezone.now()
+            claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=job.attempts, started_at=job.started_at
+            )
+        if claimed:
+            job.status = Job.RUNNING
+            return job
+
+
+def run(job):
+    """Run a claimed job, then mark it done, queue a retry or mark it failed.
+
+    Returns the job's new status.
+    """
+    try:
+        func = TASKS.get(job.task)
+        if func is None:
+            raise UnknownTask(job.task)
+        func(**job.kwargs)
+    except Exception as error:
+        job.last_error = traceback.format_exc()
+        if isinstance(error, UnknownTask) or job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.error("Job %s failed: %s", job, error)
+        else:
+            delay = get_queue_settings()["RETRY_DELAY"] * 2 ** (job.attempts - 1)
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + datetime.timedelta(seconds=delay)
+            logger.warning("Job %s failed, retrying in %ss: %s", job, delay, error)
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+        job.last_error = ""
+    job.save(update_fields=["status", "run_at", "finished_at", "last_error"])
+    return job.status
+
+
+def requeue_stale(older_than=None):
+    """Requeue jobs left running by workers that died.
+
+    Jobs that have used up their attempts are marked failed instead, so a job
+    that kills its worker isn't retried forever. Returns ``(requeued, failed)``.
+    """
+    older_than = older_than or get_queue_settings()["STALE_AFTER"]
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING, started_at__lt=now - datetime.timedelta(seconds=older_than)
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED,
+        finished_at=now,
+        last_error=f"Worker stopped responding; running for over {older_than}s",
+    )
+    requeued = stale.update(status=Job.QUEUED, run_at=now)
+    if failed:
+        logger.error("Failed %d stale jobs that were out of attempts", failed)
+    if requeued:
+        logger.warning("Requeued %d stale jobs", requeued)
+    return requeued, failed
+
+
+def queue_depth():
+    """Return the number of jobs per status."""
+    counts = Job.objects.values_list("status").annotate(count=Count("id"))
+    return {status: count for status, count in counts.order_by()}
+
+
+class Metrics:
+    """Job counters and throughput of one worker process."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counts = {Job.DONE: 0, Job.QUEUED: 0, Job.FAILED: 0}
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, status, seconds):
+        with self._lock:
+            self.counts[status] += 1
+            self.busy_seconds += seconds
+
+    def report(self):
+        with self._lock:
+            processed = sum(self.counts.values())
+            elapsed = time.monotonic() - self.started
+            return {
+                "processed": processed,
+                "succeeded": self.counts[Job.DONE],
+                "retried": self.counts[Job.QUEUED],
+                "failed": self.counts[Job.FAILED],
+                "jobs_per_second": processed / elapsed if elapsed else 0.0,
+                "avg_seconds": self.busy_seconds / processed if processed else 0.0,
+            }
+
+
+class WorkerPool:
+    """Run jobs on ``concurrency`` threads until stopped.
+
+    With ``burst``, threads exit once no job is due instead of waiting for
+    more, which suits cron-style runs and tests.
+    """
+
+    def __init__(self, concurrency=1, burst=False):
+        self.concurrency = concurrency
+        self.burst = burst
+        self.metrics = Metrics()
+        self.stopping = threading.Event()
+        self._wakeup = threading.Condition()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake()
+
+    def wake(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def run(self):
+        autodiscover()
+        self._requeue_stale()
+        threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{index}")
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            if not self.burst:
+                self._listen()
+        finally:
+            if not self.burst:
+                self.stop()
+            for thread in threads:
+                thread.join()
+        return self.metrics.report()
+
+    def _requeue_stale(self):
+        try:
+            requeue_stale()
+        except DatabaseError as error:
+            logger.warning("Job queue database error: %s", error)
+
+    def _work(self):
+        options = get_queue_settings()
+        try:
+            while not self.stopping.is_set():
+                try:
+                    job = claim()
+                    if job is None:
+                        if self.burst:
+                            return
+                        with self._wakeup:
+                            self._wakeup.wait(options["POLL_INTERVAL"])
+                        continue
+                    start = time.monotonic()
+                    status = run(job)
+                except DatabaseError as error:
+                    # e.g. the database restarting; keep the worker alive. A job
+                    # whose result wasn't saved is requeued once it goes stale.
+                    logger.warning("Job queue database error: %s", error)
+                    connection.close()
+                    self.stopping.wait(options["POLL_INTERVAL"])
+                    continue
+                self.metrics.record(status, time.monotonic() - start)
+        finally:
+            connection.close()
+
+    def _listen(self):
+        """Wake workers on NOTIFY (or every POLL_INTERVAL), requeue stale jobs
+        and log metrics."""
+        options = get_queue_settings()
+        last_report = last_stale_check = time.monotonic()
+        listening = False
+        try:
+            while not self.stopping.is_set():
+                try:
+                    if connection.vendor == "postgresql" and not listening:
+                        with connection.cursor() as cursor:
+                            cursor.execute(f'LISTEN "{options["CHANNEL"]}"')
+                        listening = True
+                    if listening:
+                        # The raw connection's errors aren't Django's otherwise
+                        with connection.wrap_database_errors:
+                            notifies = connection.connection.notifies(
+                                timeout=options["POLL_INTERVAL"], stop_after=1
+                            )
+                            for _ in notifies:
+                                pass
+                    else:
+                        self.stopping.wait(options["POLL_INTERVAL"])
+                except DatabaseError as error:
+                    # e.g. the database restarting; LISTEN again once it's back
+                    logger.warning("Job queue database error: %s", error)
+                    connection.close()
+                    listening = False
+                    self.stopping.wait(options["POLL_INTERVAL"])
+                self.wake()
+                if (
+                    time.monotonic() - last_stale_check
+                    >= options["STALE_CHECK_INTERVAL"]
+                ):
+                    self._requeue_stale()
+                    last_stale_check = time.monotonic()
+                if time.monotonic() - last_report >= options["METRICS_INTERVAL"]:
+                    logger.info("Job metrics: %s", self.metrics.report())
+                    last_report = time.monotonic()
+        finally:
+            connection.close()
@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api import snapshots
+
+
+class Command(BaseCommand):
+    help = "Build a binary snapshot of the bird catalogue for offline clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delta-from",
+            action="append",
+            default=[],
+            metavar="DIGEST",
+            help="Also build the delta from this earlier snapshot (repeatable).",
+        )
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=None,
+            help="Delete all but this many of the most recent snapshots.",
+        )
+
+    def handle(self, *args, **options):
+        digest = snapshots.build_snapshot()
+        path = snapshots.snapshot_path(digest)
+        self.stdout.write(f"Snapshot {digest}: {os.path.getsize(path)} bytes")
+
+        for base in options["delta_from"]:
+            delta = snapshots.build_delta(base, digest)
+            if delta is None:
+                self.stderr.write(f"Snapshot {base} not found, no delta built")
+            else:
+                self.stdout.write(
+                    f"Delta {base} -> {digest}: {os.path.getsize(delta)} bytes"
+                )
+
+        if options["keep"] is not None:
+            for name in snapshots.prune_snapshots(options["keep"]):
+                self.stdout.write(f"Removed {name}")
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import audio, recordings, thumbnails
+
+
+class Command(BaseCommand):
+    help = "Render spectrogram and waveform thumbnails of cached recordings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "recording_ids",
+            nargs="*",
+            help="Recordings to render (default: every cached recording).",
+        )
+        parser.add_argument(
+            "--fetch",
+            action="store_true",
+            help="Download the audio of listed recordings that isn't cached yet.",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Re-render existing thumbnails."
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Worker processes (default: RECORDING_THUMBNAILS['PROCESSES']).",
+        )
+
+    def handle(self, *args, **options):
+        recording_ids = []
+        for value in options["recording_ids"]:
+            recording_id = recordings.normalize_id(value)
+            if recording_id is None:
+                raise CommandError(f"Invalid recording id {value!r}")
+            recording_ids.append(recording_id)
+
+        if options["fetch"] and recording_ids:
+            _, errors = audio.fetch_audio(recording_ids)
+            for recording_id, error in errors.items():
+                self.stderr.write(f"XC{recording_id}: {error}")
+
+        try:
+            rendered, errors = thumbnails.build_thumbnails(
+                recording_ids or None,
+                force=options["force"],
+                processes=options["processes"],
+            )
+        except audio.AudioUnavailable as error:
+            raise CommandError(str(error))
+        for recording_id, error in errors.items():
+            self.stderr.write(f"XC{recording_id}: {error}")
+        self.stdout.write(f"Rendered thumbnails of {len(rendered)} recordings")
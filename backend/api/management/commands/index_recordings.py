@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import audio, recordings, similarity
+
+
+class Command(BaseCommand):
+    help = "Add mel features of cached recordings to the similarity index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "recording_ids",
+            nargs="*",
+            help="Recordings to index (default: every cached recording).",
+        )
+        parser.add_argument(
+            "--fetch",
+            action="store_true",
+            help="Download the audio of listed recordings that isn't cached yet.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Clear the index first, e.g. after changing SIMILARITY settings.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Worker processes (default: SIMILARITY['PROCESSES']).",
+        )
+
+    def handle(self, *args, **options):
+        recording_ids = []
+        for value in options["recording_ids"]:
+            recording_id = recordings.normalize_id(value)
+            if recording_id is None:
+                raise CommandError(f"Invalid recording id {value!r}")
+            recording_ids.append(recording_id)
+
+        if options["fetch"] and recording_ids:
+            _, errors = audio.fetch_audio(recording_ids)
+            for recording_id, error in errors.items():
+                self.stderr.write(f"XC{recording_id}: {error}")
+
+        try:
+            if options["rebuild"]:
+                similarity.get_index().clear()
+            indexed, errors = similarity.index_recordings(
+                recording_ids or None, processes=options["processes"]
+            )
+        except (audio.AudioUnavailable, similarity.IndexMismatch) as error:
+            raise CommandError(str(error))
+        for recording_id, error in errors.items():
+            self.stderr.write(f"XC{recording_id}: {error}")
+        self.stdout.write(f"Indexed {indexed} recordings")
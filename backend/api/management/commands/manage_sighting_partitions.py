@@ -0,0 +1,55 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly sighting partitions and detach or drop old ones "
+        "(PostgreSQL only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Number of future months to create partitions for.",
+        )
+        parser.add_argument(
+            "--from",
+            dest="from_month",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="Also create partitions back to this month (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--retain",
+            type=int,
+            default=None,
+            help="Detach partitions older than this many months.",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop detached partitions instead of keeping them as archive tables.",
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            self.stdout.write("Sightings table is not partitioned, nothing to do")
+            return
+
+        this_month = partitions.month_start(datetime.date.today())
+        first = partitions.month_start(options["from_month"] or this_month)
+        last = partitions.add_months(this_month, options["ahead"])
+        for name in partitions.ensure_partitions(first, last):
+            self.stdout.write(f"Created {name}")
+
+        if options["retain"] is not None:
+            cutoff = partitions.add_months(this_month, -options["retain"])
+            for name in partitions.detach_partitions(cutoff, drop=options["drop"]):
+                action = "Dropped" if options["drop"] else "Detached"
+                self.stdout.write(f"{action} {name}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the species-per-area rollups from all sightings."
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild_rollups()
+        self.stdout.write(f"Rebuilt {created} rollups")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import taxonomy
+
+
+class Command(BaseCommand):
+    help = "Recompute the taxonomy tree from the bird catalogue."
+
+    def handle(self, *args, **options):
+        created = taxonomy.rebuild_tree()
+        self.stdout.write(f"Rebuilt taxonomy with {created} nodes")
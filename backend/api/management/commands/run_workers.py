@@ -0,0 +1,78 @@
+import multiprocessing
+import signal
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api import jobs
+
+
+def _run_process(burst):
+    # Needed when processes are spawned rather than forked
+    django.setup()
+    pool = jobs.WorkerPool(concurrency=1, burst=burst)
+    signal.signal(signal.SIGTERM, lambda *args: pool.stop())
+    try:
+        pool.run()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of jobs to run at once.",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Run each job slot in its own process instead of a thread.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for new ones.",
+        )
+
+    def handle(self, *args, **options):
+        if options["processes"]:
+            self._run_processes(options["concurrency"], options["burst"])
+            return
+
+        pool = jobs.WorkerPool(options["concurrency"], burst=options["burst"])
+        signal.signal(signal.SIGTERM, lambda *args: pool.stop())
+        self.stdout.write(f"Running {options['concurrency']} job worker thread(s)")
+        try:
+            metrics = pool.run()
+        except KeyboardInterrupt:
+            pool.stop()
+            metrics = pool.metrics.report()
+        self.stdout.write(
+            "Processed {processed} jobs ({succeeded} succeeded, {retried} retried, "
+            "{failed} failed) at {jobs_per_second:.2f} jobs/s, "
+            "{avg_seconds:.3f}s per job".format(**metrics)
+        )
+
+    def _run_processes(self, count, burst):
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_run_process, args=(burst,))
+            for _ in range(count)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Running {count} job worker process(es)")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+                process.join()
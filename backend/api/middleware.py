@@ -0,0 +1,114 @@
+import math
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.urls import reverse
+
+from . import profiling, querybudget, ratelimit, routers
+
+STICKY_COOKIE = "hb_use_primary"
+
+
+class ReplicaStickinessMiddleware:
+    """Keep a client's reads on the primary for a while after it writes.
+
+    A request that writes to an ``api`` model sets a cookie for
+    ``DATABASE_REPLICAS["STICKY_SECONDS"]``, which should exceed the replicas'
+    maximum lag; requests carrying the cookie read from the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Not reset afterwards: streaming responses read after this returns
+        routers.start_context(pinned=STICKY_COOKIE in request.COOKIES)
+        response = self.get_response(request)
+        if routers.has_written():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=routers.get_replica_settings()["STICKY_SECONDS"],
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class RateLimitMiddleware:
+    """Answer ``/api/`` requests over their route's limit with 429 Too Many Requests.
+
+    Limits come from ``API_RATE_LIMIT``; see ``api.ratelimit``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = ratelimit.get_rate_limit_settings()
+        if options["ENABLED"] and request.path_info.startswith("/api/"):
+            route = ratelimit.route_name(request.path_info)
+            rate = ratelimit.route_rate(route, options)
+            if rate is not None:
+                capacity, period = ratelimit.parse_rate(rate)
+                key = f"{route}:{ratelimit.client_address(request, options)}"
+                retry_after = ratelimit.get_backend().hit(key, capacity, period)
+                if retry_after:
+                    response = JsonResponse(
+                        {"errors": ["Rate limit exceeded"]}, status=429
+                    )
+                    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                    return response
+        return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """Profile requests from staff that ask for it; see ``api.profiling``.
+
+    Responses to profiled requests carry an ``X-Profile`` header with the
+    profile's admin URL. Unused when ``API_PROFILING["ENABLED"]`` is false, and
+    otherwise costs one lookup per request that doesn't ask to be profiled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = profiling.get_profiling_settings()
+        if not self.options["ENABLED"]:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if not (
+            self.options["HEADER"] in request.META
+            or self.options["QUERY_PARAM"] in request.GET
+        ) or not (request.user.is_active and request.user.is_staff):
+            return self.get_response(request)
+        if self.options["QUERY_PARAM"] in request.GET:
+            # Hidden from the view, which may reject unknown parameters (as
+            # admin changelists do) or include them in cache keys
+            request.GET = request.GET.copy()
+            del request.GET[self.options["QUERY_PARAM"]]
+        response, profile = profiling.profile_request(
+            request, self.get_response, self.options
+        )
+        response["X-Profile"] = reverse(
+            "admin:api_requestprofile_change", args=[profile.pk]
+        )
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Check each request's queries against its budget; see ``api.querybudget``.
+
+    Over-budget requests are logged, or raise ``QueryBudgetExceeded`` when
+    ``QUERY_BUDGET["MODE"]`` is ``"raise"``. Unused when
+    ``QUERY_BUDGET["ENABLED"]`` is false, as it should be in production.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = querybudget.get_query_budget_settings()
+        if not self.options["ENABLED"]:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        return querybudget.check_request(request, self.get_response, self.options)
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_bird_family"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bird",
+            name="english_name",
+            field=models.CharField(max_length=75, verbose_name="English Name"),
+        ),
+        migrations.CreateModel(
+            name="Sighting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("observed_on", models.DateField()),
+                ("geohash", models.CharField(editable=False, max_length=12)),
+                ("recording_id", models.CharField(max_length=20, null=True)),
+                (
+                    "bird",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sightings",
+                        to="api.bird",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["geohash"],
+                        name="api_sighting_geohash_idx",
+                        opclasses=["varchar_pattern_ops"],
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Partition api_sighting by month of observed_on on PostgreSQL.
+#
+# Django has no notion of partitioned tables, so the model state is unchanged
+# and only the database is altered. PostgreSQL requires the partition key in
+# the primary key, which becomes (id, observed_on); ids still come from a
+# sequence so they stay unique. Other databases keep the plain table.
+
+from django.db import migrations
+
+COLUMNS = "id, latitude, longitude, observed_on, geohash, recording_id, bird_id"
+
+CREATE_PARTITIONED = """
+CREATE SEQUENCE api_sighting_id_seq;
+CREATE TABLE api_sighting (
+    id bigint NOT NULL DEFAULT nextval('api_sighting_id_seq'),
+    latitude double precision NOT NULL,
+    longitude double precision NOT NULL,
+    observed_on date NOT NULL,
+    geohash varchar(12) NOT NULL,
+    recording_id varchar(20) NULL,
+    bird_id bigint NOT NULL
+        REFERENCES api_bird (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, observed_on)
+) PARTITION BY RANGE (observed_on);
+ALTER SEQUENCE api_sighting_id_seq OWNED BY api_sighting.id;
+CREATE TABLE api_sighting_default PARTITION OF api_sighting DEFAULT;
+"""
+
+CREATE_PLAIN = """
+CREATE TABLE api_sighting (
+    id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    latitude double precision NOT NULL,
+    longitude double precision NOT NULL,
+    observed_on date NOT NULL,
+    geohash varchar(12) NOT NULL,
+    recording_id varchar(20) NULL,
+    bird_id bigint NOT NULL
+        REFERENCES api_bird (id) DEFERRABLE INITIALLY DEFERRED
+);
+"""
+
+
+def _rebuild_table(schema_editor, create_sql):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = 'api_sighting' AND indexname <> 'api_sighting_pkey'"
+        )
+        index_definitions = [
+            row[0].replace(" ON ONLY ", " ON ") for row in cursor.fetchall()
+        ]
+
+        cursor.execute(
+            "CREATE TEMPORARY TABLE api_sighting_copy AS SELECT * FROM api_sighting"
+        )
+        cursor.execute("DROP TABLE api_sighting CASCADE")
+        cursor.execute(create_sql)
+        cursor.execute(
+            f"INSERT INTO api_sighting ({COLUMNS}) "
+            f"SELECT {COLUMNS} FROM api_sighting_copy"
+        )
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('api_sighting', 'id'), "
+            "COALESCE(MAX(id), 0) + 1, false) FROM api_sighting"
+        )
+        cursor.execute("DROP TABLE api_sighting_copy")
+        for definition in index_definitions:
+            cursor.execute(definition)
+
+
+def partition(apps, schema_editor):
+    _rebuild_table(schema_editor, CREATE_PARTITIONED)
+
+
+def unpartition(apps, schema_editor):
+    _rebuild_table(schema_editor, CREATE_PLAIN)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_sighting"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_partition_sighting"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpeciesCellRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cell", models.CharField(max_length=12)),
+                ("month", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "bird",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="api.bird",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["cell"],
+                        name="api_rollup_cell_idx",
+                        opclasses=["varchar_pattern_ops"],
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("cell", "bird", "month"),
+                        name="api_rollup_cell_bird_month",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_speciescellrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaxonNode",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=255, unique=True)),
+                ("rank", models.CharField(max_length=10)),
+                ("name", models.CharField(max_length=75)),
+                ("depth", models.PositiveSmallIntegerField()),
+                ("bird_count", models.PositiveIntegerField()),
+                ("child_count", models.PositiveIntegerField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["path"],
+                        name="api_taxon_path_idx",
+                        opclasses=["varchar_pattern_ops"],
+                    ),
+                    models.Index(
+                        fields=["depth", "path"], name="api_taxon_depth_path_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
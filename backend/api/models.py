@@ -1,5 +1,10 @@
+import datetime
+
+from django.conf import settings
 from django.db import models
 
+from .geohash import encode as encode_geohash
+
 
 class Bird(models.Model):
     # required fields
@@ -51,3 +56,187 @@ class Bird(models.Model):
             common_name = " ".join(fixed_names)
 
         return f"{common_name} ({scientific_name})"
+
+
+class SightingQuerySet(models.QuerySet):
+    """Date filters written so PostgreSQL can prune month partitions.
+
+    Bounds are computed in Python and compared directly against
+    ``observed_on``; wrapping the column in a function or comparing it with
+    ``now()`` would stop the planner from pruning at plan time.
+    """
+
+    def observed_between(self, start, end):
+        """Sightings observed on or after ``start`` and before ``end``."""
+        return self.filter(observed_on__gte=start, observed_on__lt=end)
+
+    def recent(self, days, today=None):
+        """Sightings observed in the last ``days`` days, including today."""
+        today = today or datetime.date.today()
+        return self.observed_between(
+            today - datetime.timedelta(days=days - 1),
+            today + datetime.timedelta(days=1),
+        )
+
+
+class Sighting(models.Model):
+    """A dated, located observation of a bird (e.g. a xeno-canto recording)."""
+
+    # required fields
+    bird = models.ForeignKey(Bird, on_delete=models.CASCADE, related_name="sightings")
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    observed_on = models.DateField()
+
+    # full-precision geohash of the location, derived on save
+    geohash = models.CharField(max_length=12, editable=False)
+
+    # optional fields
+    recording_id = models.CharField(max_length=20, null=True)
+
+    objects = SightingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL use the index for prefix matches
+            models.Index(
+                fields=["geohash"],
+                name="api_sighting_geohash_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.bird.english_name} on {self.observed_on} ({self.geohash[:6]})"
+
+
+class SpeciesCellRollup(models.Model):
+    """Number of sightings of a bird in a geohash cell during one month.
+
+    Maintained incrementally from sighting writes (see ``api/rollups.py``) and
+    rebuildable in bulk with ``manage.py rebuild_species_rollups``.
+    """
+
+    cell = models.CharField(max_length=12)
+    bird = models.ForeignKey(Bird, on_delete=models.CASCADE, related_name="rollups")
+    month = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cell", "bird", "month"], name="api_rollup_cell_bird_month"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["cell"],
+                name="api_rollup_cell_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bird.english_name} in {self.cell} ({self.month:%Y-%m}): {self.count}"
+
+
+class TaxonNode(models.Model):
+    """A family, genus, species or subspecies in the precomputed taxonomy tree.
+
+    ``path`` holds the names from the family down, joined by ``/``, so a
+    subtree is one indexed prefix query. Rebuilt from ``Bird`` whenever the
+    catalogue changes (see ``api/taxonomy.py``).
+    """
+
+    path = models.CharField(max_length=255, unique=True)
+    rank = models.CharField(max_length=10)
+    name = models.CharField(max_length=75)
+    depth = models.PositiveSmallIntegerField()
+    # birds in the subtree, and direct children
+    bird_count = models.PositiveIntegerField()
+    child_count = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["path"],
+                name="api_taxon_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            models.Index(fields=["depth", "path"], name="api_taxon_depth_path_idx"),
+        ]
+
+    def __str__(self):
+        return self.path
+
+
+class Job(models.Model):
+    """A background task queued for ``manage.py run_workers`` (see ``api/jobs.py``)."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # higher runs first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Only queued jobs are claimed, so the index stays small
+            models.Index(
+                fields=["-priority", "run_at", "id"],
+                condition=models.Q(status="queued"),
+                name="api_job_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class RequestProfile(models.Model):
+    """A staff request profiled by ``ProfilingMiddleware`` (see ``api/profiling.py``)."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL
+    )
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    sample_interval = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    # "frame;frame;frame count" lines, as read by flamegraph.pl and speedscope
+    stacks = models.TextField(blank=True)
+    # [{"alias", "start_ms", "duration_ms", "sql"}] in execution order
+    queries = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
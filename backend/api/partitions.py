@@ -0,0 +1,124 @@
+"""Monthly range partitions of the sightings table on PostgreSQL.
+
+Migration 0008 turns ``api_sighting`` into a table partitioned by
+``observed_on`` with a default partition for rows outside every month
+partition. The helpers here create month partitions ahead of time and detach
+(or drop) old ones. On other databases the table stays a plain table and the
+helpers do nothing.
+"""
+
+import datetime
+
+from django.db import connection as default_connection
+from django.db import transaction
+
+TABLE = "api_sighting"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def is_partitioned(connection=default_connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def add_months(date, months):
+    month = date.month - 1 + months
+    return datetime.date(date.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def list_partitions(connection=default_connection):
+    """Return the month of every attached month partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{TABLE}_p"
+    return sorted(
+        datetime.datetime.strptime(name[len(prefix) :], "%Y%m").date()
+        for name in names
+        if name.startswith(prefix)
+    )
+
+
+def create_partition(month, connection=default_connection):
+    """Create the partition for ``month``, moving any rows out of the default.
+
+    PostgreSQL refuses to attach a partition whose range already has rows in
+    the default partition, so the default is detached while they are moved.
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE observed_on >= %s AND observed_on < %s)",
+            [start, end],
+        )
+        (has_rows,) = cursor.fetchone()
+        if has_rows:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        # Partition bounds must be literals; DDL takes no bind parameters
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        if has_rows:
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE observed_on >= %s AND observed_on < %s RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved",
+                [start, end],
+            )
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+            )
+    return name
+
+
+def ensure_partitions(first_month, last_month, connection=default_connection):
+    """Create every missing month partition from ``first_month`` to ``last_month``."""
+    existing = set(list_partitions(connection))
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if month not in existing:
+            created.append(create_partition(month, connection))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(before, drop=False, connection=default_connection):
+    """Detach month partitions ending on or before ``before``.
+
+    Detached partitions are left as standalone archive tables unless ``drop``.
+    """
+    detached = []
+    with connection.cursor() as cursor:
+        for month in list_partitions(connection):
+            if add_months(month, 1) > before:
+                continue
+            name = partition_name(month)
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            if drop:
+                cursor.execute(f"DROP TABLE {name}")
+            detached.append(name)
+    return detached
@@ -0,0 +1,162 @@
+"""On-demand profiling of single requests.
+
+Staff can profile a request by sending the ``X-Profile`` header or the
+``_profile`` query parameter (see ``API_PROFILING``). The request runs under a
+sampling profiler, which snapshots the request thread's stack every
+``SAMPLE_INTERVAL`` seconds from a background thread, so the view runs at
+close to full speed. Every SQL query is timed as well. The result is stored as
+a ``RequestProfile`` whose stacks are in the "collapsed" format read by
+``flamegraph.pl``, speedscope and similar tools.
+"""
+
+import collections
+import contextlib
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import RequestProfile
+
+DEFAULT_SETTINGS = {
+    "ENABLED": True,
+    "HEADER": "HTTP_X_PROFILE",
+    "QUERY_PARAM": "_profile",
+    "SAMPLE_INTERVAL": 0.001,
+    # Longest SQL text kept per query
+    "MAX_SQL_LENGTH": 2000,
+    # Older profiles are deleted when a new one is stored
+    "KEEP": 200,
+}
+
+
+def get_profiling_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "API_PROFILING", {})}
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+class Sampler:
+    """Count the stacks of ``thread_id`` every ``interval`` seconds."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Return the stacks as ``frame;frame;frame count`` lines."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items())
+
+
+class QueryTimeline:
+    """``execute_wrapper`` recording each query's start offset and duration."""
+
+    def __init__(self, started, max_sql_length):
+        self.started = started
+        self.max_sql_length = max_sql_length
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        alias = context["connection"].alias
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append(
+                {
+                    "alias": alias,
+                    "start_ms": round((start - self.started) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                    "sql": sql[: self.max_sql_length],
+                }
+            )
+
+    def wrapping(self):
+        stack = contextlib.ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def profile_request(request, get_response, options):
+    """Run ``get_response(request)`` under the profiler and store the result.
+
+    A streaming response's body is produced after this returns, so its profile
+    is stored now and completed once the body has been sent.
+
+    Returns ``(response, profile)``.
+    """
+    started = time.perf_counter()
+    timeline = QueryTimeline(started, options["MAX_SQL_LENGTH"])
+    sampler = Sampler(threading.get_ident(), options["SAMPLE_INTERVAL"])
+    with timeline.wrapping(), sampler:
+        response = get_response(request)
+
+    profile = RequestProfile(
+        method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=response.status_code,
+        user=request.user,
+        sample_interval=options["SAMPLE_INTERVAL"],
+    )
+    _save_profile(profile, started, timeline, sampler)
+    profiles = RequestProfile.objects.using(DEFAULT_DB_ALIAS)
+    stale = profiles.order_by("-created_at", "-id")[options["KEEP"] :]
+    profiles.filter(pk__in=list(stale.values_list("pk", flat=True))).delete()
+
+    if response.streaming and not response.is_async:
+        response.streaming_content = _profile_stream(
+            response.streaming_content, profile, started, timeline, sampler, options
+        )
+    return response, profile
+
+
+def _profile_stream(stream, profile, started, timeline, sampler, options):
+    """Yield ``stream`` under the profiler, then update ``profile``."""
+    stream_sampler = Sampler(threading.get_ident(), options["SAMPLE_INTERVAL"])
+    try:
+        with timeline.wrapping(), stream_sampler:
+            yield from stream
+    finally:
+        sampler.stacks.update(stream_sampler.stacks)
+        _save_profile(profile, started, timeline, sampler)
+
+
+def _save_profile(profile, started, timeline, sampler):
+    profile.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    profile.query_count = len(timeline.queries)
+    profile.sql_ms = round(sum(query["duration_ms"] for query in timeline.queries), 3)
+    profile.sample_count = sum(sampler.stacks.values())
+    profile.stacks = sampler.collapsed()
+    profile.queries = timeline.queries
+    # Written straight to the primary so storing the profile doesn't count as
+    # the request writing (which would pin the client's reads to the primary)
+    profile.save(using=DEFAULT_DB_ALIAS)
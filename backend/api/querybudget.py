@@ -0,0 +1,161 @@
+"""Query budgets and N+1 query detection.
+
+Every query a request makes is grouped by its *shape*: its SQL with literals,
+placeholders and ``IN`` lists normalized, so ``WHERE id = 1`` and ``WHERE id =
+2`` are one shape. A shape that runs many times in one request is almost always
+an N+1 pattern, such as a related object fetched for each row of a list instead
+of with ``select_related`` or ``prefetch_related``.
+
+A budget limits a request's total queries (``MAX_QUERIES``) and how often any
+one shape may repeat (``MAX_REPEATS``). ``QUERY_BUDGET`` sets the default
+budget, ``ROUTES`` overrides it by URL name, and the ``query_budget`` decorator
+overrides it for one view. ``QueryBudgetMiddleware`` checks every request and
+logs a warning or raises ``QueryBudgetExceeded`` depending on ``MODE``; tests
+can check a block of code with ``QueryBudgetMixin.assertQueryBudget``.
+Budgets cover every query of a request, including the session and user
+lookups of middleware.
+
+Queries run while a streaming response is consumed, after the middleware
+returns, are not counted.
+"""
+
+import collections
+import contextlib
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "ENABLED": False,
+    # "warn" logs requests over budget, "raise" raises QueryBudgetExceeded
+    "MODE": "warn",
+    # None for no limit
+    "MAX_QUERIES": None,
+    "MAX_REPEATS": 5,
+    # Budgets by URL name, e.g. {"admin:api_bird_changelist": {"MAX_QUERIES": 10}}
+    "ROUTES": {},
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?(?![\w\"])")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    """A request or block of code made more queries than its budget allows."""
+
+
+def get_query_budget_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "QUERY_BUDGET", {})}
+
+
+def query_shape(sql):
+    """Return ``sql`` with literals and value lists replaced by placeholders."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryLog:
+    """``execute_wrapper`` counting the queries of each shape."""
+
+    def __init__(self):
+        self.shapes = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def wrapping(self):
+        stack = contextlib.ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def problems(self, max_queries=None, max_repeats=None):
+        """Return a message for each way the queries exceed the budget."""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} queries, budget {max_queries}")
+        if max_repeats is not None:
+            for shape, count in self.shapes.most_common():
+                if count <= max_repeats:
+                    break
+                problems.append(
+                    f"{count} queries of one shape, budget {max_repeats}"
+                    f" (possible N+1): {shape}"
+                )
+        return problems
+
+
+def query_budget(max_queries=None, max_repeats=None):
+    """Decorator declaring the query budget of a view.
+
+    Either limit may be left out to keep the configured default.
+    """
+    budget = {}
+    if max_queries is not None:
+        budget["MAX_QUERIES"] = max_queries
+    if max_repeats is not None:
+        budget["MAX_REPEATS"] = max_repeats
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+
+    return decorator
+
+
+def view_budget(resolver_match, options):
+    """Return ``(max_queries, max_repeats)`` for the view of a request."""
+    budget = {key: options[key] for key in ("MAX_QUERIES", "MAX_REPEATS")}
+    if resolver_match is not None:
+        budget.update(options["ROUTES"].get(resolver_match.view_name, {}))
+        budget.update(getattr(resolver_match.func, "query_budget", {}))
+    return budget["MAX_QUERIES"], budget["MAX_REPEATS"]
+
+
+def check_request(request, get_response, options):
+    """Run ``get_response(request)`` and check its queries against the budget."""
+    log = QueryLog()
+    with log.wrapping():
+        response = get_response(request)
+    problems = log.problems(*view_budget(request.resolver_match, options))
+    if problems:
+        message = "\n".join(
+            [f"{request.method} {request.path} is over its query budget:", *problems]
+        )
+        if options["MODE"] == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return response
+
+
+class QueryBudgetMixin:
+    """``TestCase`` mixin adding ``assertQueryBudget``."""
+
+    @contextlib.contextmanager
+    def assertQueryBudget(self, max_queries=None, max_repeats=None):
+        """Fail if the block makes more queries, or repeats a query shape
+        more often, than allowed. The block gets the ``QueryLog``.
+        """
+        log = QueryLog()
+        with log.wrapping():
+            yield log
+        problems = log.problems(max_queries, max_repeats)
+        if problems:
+            self.fail("Query budget exceeded:\n" + "\n".join(problems))
@@ -0,0 +1,247 @@
+"""Token-bucket rate limiting for the api.
+
+Buckets are keyed on the route (URL name) and client address. The default
+``mmap`` backend keeps them in a fixed-size hash table in a memory-mapped file,
+so every worker process on the host shares the same buckets without a network
+round trip; each check locks only the few slots its key can occupy. The
+``django`` backend stores counters in Django's cache for deployments spanning
+several hosts. Its ``incr`` is atomic on memcached and Redis, so it counts
+fixed windows of the route's period rather than refilling a bucket.
+
+Limits are strings such as ``"120/m"`` (requests per second, minute, hour or
+day); ``None`` disables limiting for a route. See ``API_RATE_LIMIT`` in
+settings.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import Resolver404, resolve
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DEFAULT_SETTINGS = {
+    "ENABLED": True,
+    "BACKEND": "mmap",
+    "LOCATION": os.path.join(tempfile.gettempdir(), "hellobirdie-ratelimit"),
+    "SLOTS": 65536,
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "ratelimit",
+    "CLIENT_IP_HEADER": None,
+    # Proxies in front of the app that append to CLIENT_IP_HEADER
+    "TRUSTED_PROXIES": 1,
+    "DEFAULT": "120/m",
+    "ROUTES": {},
+}
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def get_rate_limit_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "API_RATE_LIMIT", {})}
+
+
+@lru_cache(maxsize=64)
+def parse_rate(rate):
+    """Return ``(count, period_seconds)`` for a rate such as ``"120/m"``."""
+    count, _, unit = rate.partition("/")
+    try:
+        return int(count), PERIODS[unit]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. '120/m'") from None
+
+
+def key_hash(key):
+    """Stable 64-bit hash of a bucket key; never 0, which marks an empty slot."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") | 1
+
+
+class MmapBackend:
+    """Token buckets in a memory-mapped hash table shared between processes.
+
+    The file holds a header and ``slots`` records of ``(key hash, tokens,
+    updated at)``. A key lives in one group of ``GROUP_SIZE`` adjacent slots;
+    when the group is full, the least recently updated bucket is replaced.
+    """
+
+    MAGIC = b"HBRL"
+    HEADER = struct.Struct("<4sII")
+    RECORD = struct.Struct("<Qdd")
+    GROUP_SIZE = 8
+    VERSION = 1
+
+    def __init__(self, location, slots=65536, **options):
+        self.groups = max(1, slots // self.GROUP_SIZE)
+        self.slots = self.groups * self.GROUP_SIZE
+        size = self.HEADER.size + self.slots * self.RECORD.size
+        os.makedirs(os.path.dirname(os.path.abspath(location)), exist_ok=True)
+        self._fd = os.open(location, os.O_RDWR | os.O_CREAT, 0o600)
+        # fcntl locks are per process, so threads also need a local lock
+        self._lock = threading.Lock()
+        with self._locked(0, self.HEADER.size):
+            header = os.pread(self._fd, self.HEADER.size, 0)
+            if header != self.HEADER.pack(self.MAGIC, self.VERSION, self.slots):
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(
+                    self._fd, self.HEADER.pack(self.MAGIC, self.VERSION, self.slots), 0
+                )
+        self._map = mmap.mmap(self._fd, size)
+
+    def _locked(self, start, length):
+        return _RangeLock(self._fd, self._lock, start, length)
+
+    def hit(self, key, capacity, period, now=None):
+        """Take a token from ``key``'s bucket; return seconds to wait or 0."""
+        now = time.time() if now is None else now
+        rate = capacity / period
+        hashed = key_hash(key)
+        record = self.RECORD
+        first = (
+            self.HEADER.size + (hashed % self.groups) * self.GROUP_SIZE * record.size
+        )
+
+        with self._locked(first, self.GROUP_SIZE * record.size):
+            target = None
+            oldest = None
+            for offset in range(
+                first, first + self.GROUP_SIZE * record.size, record.size
+            ):
+                slot_hash, tokens, updated_at = record.unpack_from(self._map, offset)
+                if slot_hash == hashed:
+                    target = offset
+                    break
+                if oldest is None or updated_at < oldest[1]:
+                    oldest = (offset, updated_at)
+            if target is None:
+                target, tokens = oldest[0], capacity
+            else:
+                # Clamp in case the clock went backwards
+                elapsed = max(now - updated_at, 0)
+                tokens = min(capacity, tokens + elapsed * rate)
+
+            if tokens >= 1:
+                record.pack_into(self._map, target, hashed, tokens - 1, now)
+                return 0
+            record.pack_into(self._map, target, hashed, tokens, now)
+            return (1 - tokens) / rate
+
+    def clear(self):
+        with self._locked(0, 0):
+            self._map[self.HEADER.size :] = bytes(len(self._map) - self.HEADER.size)
+
+
+class _RangeLock:
+    def __init__(self, fd, thread_lock, start, length):
+        self.fd = fd
+        self.thread_lock = thread_lock
+        self.start = start
+        self.length = length
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.length, self.start)
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, self.length, self.start)
+        self.thread_lock.release()
+
+
+class DjangoCacheBackend:
+    """Fixed-window counters in Django's cache, shared between hosts."""
+
+    def __init__(self, cache_alias="default", key_prefix="ratelimit", **options):
+        self.cache = caches[cache_alias]
+        self.key_prefix = key_prefix
+
+    def hit(self, key, capacity, period, now=None):
+        now = time.time() if now is None else now
+        window = int(now // period)
+        cache_key = f"{self.key_prefix}:{key_hash(key):x}:{window}"
+        # add() is a no-op if the window's counter exists; incr() is atomic
+        self.cache.add(cache_key, 0, timeout=period + 1)
+        try:
+            count = self.cache.incr(cache_key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.add(cache_key, 1, timeout=period + 1)
+            count = 1
+        if count <= capacity:
+            return 0
+        return (window + 1) * period - now
+
+
+BACKENDS = {"mmap": MmapBackend, "django": DjangoCacheBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                options = get_rate_limit_settings()
+                backend_class = BACKENDS[options["BACKEND"]]
+                _backend = backend_class(
+                    location=options["LOCATION"],
+                    slots=options["SLOTS"],
+                    cache_alias=options["CACHE_ALIAS"],
+                    key_prefix=options["KEY_PREFIX"],
+                )
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting in ("API_RATE_LIMIT", "CACHES"):
+        _backend = None
+        route_name.cache_clear()
+
+
+@lru_cache(maxsize=1024)
+def route_name(path):
+    """Return the URL name ``path`` resolves to, or ``None``."""
+    try:
+        return resolve(path).url_name
+    except Resolver404:
+        return None
+
+
+def route_rate(route, options):
+    return options["ROUTES"].get(route, options["DEFAULT"])
+
+
+def client_address(request, options):
+    """Return the address of the client as seen by the outermost trusted proxy.
+
+    Clients can send any ``X-Forwarded-For`` they like, and each proxy appends
+    the address it received the request from. So the client's address is the
+    ``TRUSTED_PROXIES``-th entry from the right; entries left of it are
+    untrusted.
+    """
+    header = options["CLIENT_IP_HEADER"]
+    hops = options["TRUSTED_PROXIES"]
+    if header and hops > 0 and header in request.META:
+        addresses = [address.strip() for address in request.META[header].split(",")]
+        if len(addresses) >= hops and addresses[-hops]:
+            return addresses[-hops]
+    return request.META.get("REMOTE_ADDR", "")
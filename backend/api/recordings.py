@@ -0,0 +1,133 @@
+"""Cached access to xeno-canto recording details.
+
+Recordings rarely change upstream, so each one is cached for
+``XENO_CANTO["CACHE_TIMEOUT"]`` seconds in the api cache backend. A batch
+serves what it can from the cache and fetches the misses from xeno-canto
+concurrently, reporting failures per recording rather than failing the batch.
+"""
+
+import http.client
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import cache
+
+DEFAULT_SETTINGS = {
+    "API_URL": "https://xeno-canto.org/api/2/recordings",
+    "TIMEOUT": 5,
+    "CACHE_TIMEOUT": 86400,
+    "MAX_WORKERS": 8,
+}
+
+STATS_NAME = "recordings"
+
+# Upstream fields passed on to clients
+FIELDS = (
+    "id",
+    "gen",
+    "sp",
+    "ssp",
+    "en",
+    "cnt",
+    "loc",
+    "lat",
+    "lng",
+    "type",
+    "file",
+    "url",
+    "q",
+    "length",
+    "date",
+)
+
+
+class RecordingNotFound(Exception):
+    pass
+
+
+class UpstreamError(Exception):
+    pass
+
+
+def get_xeno_canto_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "XENO_CANTO", {})}
+
+
+def is_ascii_digits(value):
+    """Whether ``value`` is ``0``-``9`` only; ``str.isdigit`` also accepts "²"."""
+    return value.isascii() and value.isdecimal()
+
+
+def normalize_id(value):
+    """Return the numeric id of ``"123"`` or ``"XC123"``, or ``None``."""
+    value = value.strip().upper().removeprefix("XC")
+    return value if is_ascii_digits(value) else None
+
+
+def fetch_recording(recording_id):
+    """Fetch one recording's details from the xeno-canto API."""
+    options = get_xeno_canto_settings()
+    query = urllib.parse.urlencode({"query": f"nr:{recording_id}"})
+    try:
+        with urllib.request.urlopen(
+            f"{options['API_URL']}?{query}", timeout=options["TIMEOUT"]
+        ) as response:
+            body = json.load(response)
+    except (OSError, http.client.HTTPException, ValueError) as error:
+        # URLError and TimeoutError are OSErrors; failures while reading the
+        # body (RemoteDisconnected, IncompleteRead, ConnectionResetError) aren't
+        # wrapped in URLError
+        raise UpstreamError(str(error) or type(error).__name__) from error
+
+    for recording in body.get("recordings", []):
+        if str(recording.get("id")) == recording_id:
+            return {field: recording.get(field) for field in FIELDS}
+    raise RecordingNotFound(recording_id)
+
+
+def _key(recording_id):
+    return cache.make_key(STATS_NAME, recording_id, {})
+
+
+def get_recordings(recording_ids):
+    """Return ``(recordings, errors)`` for numeric recording ids.
+
+    ``recordings`` maps ids to details; ``errors`` maps ids that could not be
+    loaded to a message.
+    """
+    options = get_xeno_canto_settings()
+    backend = cache.get_backend()
+    recordings = {}
+    misses = []
+    for recording_id in recording_ids:
+        recording = backend.get(_key(recording_id))
+        cache.stats.record(STATS_NAME, hit=recording is not None)
+        if recording is None:
+            misses.append(recording_id)
+        else:
+            recordings[recording_id] = recording
+
+    errors = {}
+    if misses:
+        workers = min(len(misses), options["MAX_WORKERS"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                recording_id: executor.submit(fetch_recording, recording_id)
+                for recording_id in misses
+            }
+        for recording_id, future in futures.items():
+            try:
+                recording = future.result()
+            except RecordingNotFound:
+                errors[recording_id] = "not found"
+            except UpstreamError as error:
+                errors[recording_id] = f"upstream error: {error}"
+            else:
+                backend.set(_key(recording_id), recording, options["CACHE_TIMEOUT"])
+                recordings[recording_id] = recording
+    return recordings, errors
@@ -0,0 +1,183 @@
+"""JSON responses for large api payloads.
+
+``FastJsonResponse`` is a drop-in replacement for ``JsonResponse`` that encodes
+with orjson when it is installed. ``JsonRowStreamingResponse`` streams rows
+straight from ``values_list()`` tuples as ``{"meta": {"fields": [...]}, "data":
+[[...], ...]}`` without building a dict per row, optionally compressing the
+stream with gzip or brotli.
+"""
+
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+class StdlibEncoder:
+    name = "stdlib"
+
+    def __init__(self):
+        self._encoder = DjangoJSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj).encode("utf-8")
+
+
+class OrjsonEncoder:
+    name = "orjson"
+
+    def __init__(self):
+        self._default = DjangoJSONEncoder().default
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=self._default)
+
+
+ENCODERS = {
+    "stdlib": StdlibEncoder,
+    "orjson": OrjsonEncoder,
+}
+
+
+def get_encoder(name=None):
+    """Return the encoder named by ``name`` or the ``API_JSON_ENCODER`` setting.
+
+    ``"auto"`` picks orjson when it is installed and the stdlib otherwise.
+    """
+    name = name or getattr(settings, "API_JSON_ENCODER", "auto")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name == "orjson" and orjson is None:
+        raise ImportError("API_JSON_ENCODER is 'orjson' but orjson is not installed")
+    return ENCODERS[name]()
+
+
+# Compression
+
+
+def available_encodings():
+    """Content encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(request):
+    """Pick the content encoding for a response from ``Accept-Encoding``."""
+    accepted = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    for encoding in available_encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def _compressor(encoding):
+    if encoding == "gzip":
+        # wbits=31 selects the gzip container rather than raw zlib
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        return compressor.compress, flush, compressor.flush
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.flush, compressor.finish
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compress_stream(chunks, encoding, flush_bytes=64 * 1024):
+    """Compress an iterable of byte chunks, flushing every ``flush_bytes`` input."""
+    compress, flush, finish = _compressor(encoding)
+    pending = 0
+    for chunk in chunks:
+        out = compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            out += flush()
+            pending = 0
+        if out:
+            yield out
+    yield finish()
+
+
+# Responses
+
+
+class FastJsonResponse(HttpResponse):
+    """``JsonResponse`` equivalent that uses the configured encoder."""
+
+    def __init__(self, data, encoder=None, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=(encoder or get_encoder()).dumps(data), **kwargs)
+
+
+def encode_rows(rows, fields, encoder=None, chunk_size=1000, meta=None):
+    """Yield the JSON document for ``rows`` in chunks of ``chunk_size`` rows.
+
+    Each chunk is encoded with a single ``dumps`` call on the list of tuples, so
+    no per-row dicts or per-row encoder calls are needed.
+    """
+    encoder = encoder or get_encoder()
+    meta = {**(meta or {}), "fields": list(fields)}
+    yield b'{"meta":' + encoder.dumps(meta) + b',"data":['
+    separator = b""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield separator + encoder.dumps(batch)[1:-1]
+            separator = b","
+            batch = []
+    if batch:
+        yield separator + encoder.dumps(batch)[1:-1]
+    yield b"]}"
+
+
+class JsonRowStreamingResponse(StreamingHttpResponse):
+    """Stream ``values_list()`` rows as JSON, optionally compressed.
+
+    Pass ``compress=negotiate_encoding(request)`` to compress the stream with
+    whatever the client accepts.
+    """
+
+    def __init__(
+        self,
+        rows,
+        fields,
+        encoder=None,
+        chunk_size=1000,
+        meta=None,
+        compress=None,
+        **kwargs,
+    ):
+        kwargs.setdefault("content_type", "application/json")
+        content = encode_rows(rows, fields, encoder, chunk_size, meta)
+        if compress:
+            content = compress_stream(content, compress)
+        super().__init__(content, **kwargs)
+        if compress:
+            self["Content-Encoding"] = compress
+        patch_vary_headers(self, ("Accept-Encoding",))
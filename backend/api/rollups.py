@@ -0,0 +1,181 @@
+"""Species-per-area rollups for "what birds are near me" rankings.
+
+Sightings are counted per (geohash cell, bird, month) at ``ROLLUP_PRECISION``
+(cells of roughly 5 x 5 km). A ranking query loads the rollups of the 3 x 3
+block of coarser cells covering the radius, cached per coarse cell like the
+sightings themselves, and merges the rollup cells overlapping the radius in
+memory. Counts are per cell, so sightings up to one cell beyond the radius may
+be included.
+"""
+
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Substr, TruncMonth
+
+from . import cache, geohash
+from .models import SpeciesCellRollup, Sighting
+from .partitions import add_months, month_start
+from .sightings import MAX_CELL_PRECISION, cell_rows
+
+ROLLUP_PRECISION = 5
+ROLLUP_STATS_NAME = "rollup-cell"
+# Invalidated when every rollup may have changed, e.g. after a rebuild
+ROLLUP_TAG = "rollups"
+
+
+def rollup_key(latitude, longitude, observed_on):
+    return (
+        geohash.encode(latitude, longitude, ROLLUP_PRECISION),
+        month_start(observed_on),
+    )
+
+
+def apply_counts(counts, attempts=3):
+    """Add ``{(cell, bird_id, month): delta}`` to the stored rollups."""
+    counts = {key: delta for key, delta in counts.items() if delta}
+    if not counts:
+        return
+    for attempt in range(attempts):
+        try:
+            _apply_counts(counts)
+            return
+        except IntegrityError:
+            # A concurrent transaction created one of the rows after they were
+            # looked up; the retry finds it and adds to it instead
+            if attempt == attempts - 1:
+                raise
+
+
+def _locked_rollups(counts):
+    cells, bird_ids, months = (set(values) for values in zip(*counts))
+    candidates = SpeciesCellRollup.objects.select_for_update().filter(
+        cell__in=cells, bird_id__in=bird_ids, month__in=months
+    )
+    return {
+        (rollup.cell, rollup.bird_id, rollup.month): rollup for rollup in candidates
+    }
+
+
+@transaction.atomic
+def _apply_counts(counts):
+    existing = _locked_rollups(counts)
+    updated = []
+    created = []
+    emptied = []
+    for key, delta in counts.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            if delta > 0:
+                cell, bird_id, month = key
+                created.append(
+                    SpeciesCellRollup(
+                        cell=cell, bird_id=bird_id, month=month, count=delta
+                    )
+                )
+            continue
+        rollup.count = max(rollup.count + delta, 0)
+        (updated if rollup.count else emptied).append(rollup)
+
+    SpeciesCellRollup.objects.bulk_create(created)
+    SpeciesCellRollup.objects.bulk_update(updated, ["count"])
+    SpeciesCellRollup.objects.filter(pk__in=[rollup.pk for rollup in emptied]).delete()
+
+
+def count_sightings(sightings, sign=1):
+    """Return rollup deltas for sightings given as ``(bird_id, lat, lng, date)``."""
+    counts = Counter()
+    for bird_id, latitude, longitude, observed_on in sightings:
+        cell, month = rollup_key(latitude, longitude, observed_on)
+        counts[cell, bird_id, month] += sign
+    return counts
+
+
+def rebuild_rollups(batch_size=5000):
+    """Recompute every rollup from the sightings table."""
+    rows = (
+        Sighting.objects.annotate(
+            cell=Substr("geohash", 1, ROLLUP_PRECISION),
+            month=TruncMonth("observed_on"),
+        )
+        .values("cell", "bird_id", "month")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        SpeciesCellRollup.objects.all().delete()
+        batch = []
+        created = 0
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(SpeciesCellRollup(**row))
+            if len(batch) >= batch_size:
+                SpeciesCellRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        SpeciesCellRollup.objects.bulk_create(batch)
+        created += len(batch)
+    cache.invalidate_tags(ROLLUP_TAG)
+    return created
+
+
+def load_rollup_cells(cells):
+    """Return a dict of coarse cell to its rollup tuples.
+
+    Tuples are ``(cell, bird_id, english_name, month, count)``.
+    """
+    precision = len(cells[0])
+    prefixes = Q()
+    for cell in cells:
+        prefixes |= Q(cell__startswith=cell)
+
+    rows = {cell: [] for cell in cells}
+    queryset = SpeciesCellRollup.objects.filter(prefixes).values_list(
+        "cell", "bird_id", "bird__english_name", "month", "count"
+    )
+    for row in queryset:
+        rows[row[0][:precision]].append(row)
+    return rows
+
+
+def species_near(lat, lng, radius_km, months=12, limit=50, today=None):
+    """Rank birds by sightings in the rollup cells overlapping ``radius_km``.
+
+    Returns ``(bird_id, english_name, count)`` tuples, most sighted first,
+    counting the last ``months`` months including the current one.
+    """
+    precision = min(
+        geohash.precision_for_radius(lat, lng, radius_km, MAX_CELL_PRECISION),
+        ROLLUP_PRECISION,
+    )
+    cell = geohash.encode(lat, lng, precision)
+    first_month = add_months(month_start(today or datetime.date.today()), 1 - months)
+
+    overlapping = {}
+    totals = defaultdict(int)
+    names = {}
+    rows = cell_rows(
+        geohash.neighbours(cell), load_rollup_cells, ROLLUP_STATS_NAME, [ROLLUP_TAG]
+    )
+    for rollup_cell, bird_id, english_name, month, count in rows:
+        if month < first_month:
+            continue
+        within = overlapping.get(rollup_cell)
+        if within is None:
+            # Distance to the nearest point of the cell, which is zero for the
+            # cell containing the query point however small the radius
+            min_lat, min_lng, max_lat, max_lng = geohash.bounds(rollup_cell)
+            distance = geohash.distance_km(
+                lat,
+                lng,
+                min(max(lat, min_lat), max_lat),
+                min(max(lng, min_lng), max_lng),
+            )
+            within = overlapping[rollup_cell] = distance <= radius_km
+        if within:
+            totals[bird_id] += count
+            names[bird_id] = english_name
+
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], names[item[0]]))
+    return [(bird_id, names[bird_id], count) for bird_id, count in ranked[:limit]]
@@ -0,0 +1,172 @@
+"""Primary/replica database routing for the api app.
+
+Reads of ``api`` models go to a healthy replica from
+``DATABASE_REPLICAS["ALIASES"]``, writes always go to the primary. Once a
+context has written, its reads stay on the primary so a client sees its own
+writes: for the rest of the request (or management command) and, through
+``ReplicaStickinessMiddleware``, for ``STICKY_SECONDS`` of the client's
+following requests. Reads inside a transaction on the primary stay there too.
+
+Data stored under a cache tag version (cache misses, the taxonomy tree, the
+suggest index and catalogue snapshots) is read from the primary, because a
+lagging replica could hold rows older than the version.
+
+Replica health is checked at most every ``CHECK_INTERVAL`` seconds per alias.
+A replica that cannot be reached or lags more than ``MAX_LAG`` seconds behind
+is skipped until the next check; with no healthy replica, reads fail over to
+the primary.
+"""
+
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "ALIASES": [],
+    "MAX_LAG": 5,
+    "CHECK_INTERVAL": 5,
+    "STICKY_SECONDS": 10,
+}
+
+ROUTED_APP_LABELS = {"api"}
+
+_pinned = contextvars.ContextVar("pinned_to_primary", default=False)
+_written = contextvars.ContextVar("written_to_primary", default=False)
+
+
+def get_replica_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "DATABASE_REPLICAS", {})}
+
+
+def start_context(pinned=False):
+    """Start routing a new unit of work such as a request, unwritten."""
+    _pinned.set(pinned)
+    _written.set(False)
+
+
+def pin_to_primary():
+    """Send the rest of the current context's reads to the primary."""
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def has_written():
+    """Whether the current context wrote to an ``api`` model."""
+    return _written.get()
+
+
+def replica_lag(alias):
+    """Return how many seconds ``alias`` lags behind its primary.
+
+    Only PostgreSQL reports replication lag; other databases count as
+    up to date once they answer a query.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != "postgresql":
+            cursor.execute("SELECT 1")
+            return 0.0
+        # An idle primary sends no new WAL, so a replica that has replayed
+        # everything it received is current however old its last replay is
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - "
+            "pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaHealth:
+    """Cached health of each replica alias, rechecked every ``CHECK_INTERVAL``."""
+
+    def __init__(self, check=replica_lag):
+        self.check = check
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        options = get_replica_settings()
+        now = time.monotonic()
+        with self._lock:
+            status = self._status.get(alias)
+            if status is not None and now - status[0] < options["CHECK_INTERVAL"]:
+                return status[1]
+            # Other threads keep the previous verdict while this one checks
+            self._status[alias] = (now, status[1] if status else True)
+
+        try:
+            lag = self.check(alias)
+        except DatabaseError as error:
+            logger.warning("Replica %s is unavailable: %s", alias, error)
+            healthy = False
+        else:
+            healthy = lag <= options["MAX_LAG"]
+            if not healthy:
+                logger.warning("Replica %s lags %.1fs behind", alias, lag)
+        with self._lock:
+            self._status[alias] = (time.monotonic(), healthy)
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._status.clear()
+
+
+health = ReplicaHealth()
+
+
+@receiver(setting_changed)
+def _reset_health(setting, **kwargs):
+    if setting == "DATABASE_REPLICAS":
+        health.reset()
+
+
+class ReplicaRouter:
+    """Route ``api`` reads to healthy replicas and everything else to the primary."""
+
+    def _routed(self, model):
+        return model._meta.app_label in ROUTED_APP_LABELS
+
+    def db_for_read(self, model, **hints):
+        if not self._routed(model):
+            return None
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = [
+            alias
+            for alias in get_replica_settings()["ALIASES"]
+            if health.is_healthy(alias)
+        ]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not self._routed(model):
+            return None
+        _pinned.set(True)
+        _written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replica_settings()["ALIASES"]}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas receive their schema through replication
+        if db in get_replica_settings()["ALIASES"]:
+            return False
+        return None
@@ -0,0 +1,148 @@
+"""Location-quantized sighting queries.
+
+Incoming coordinates are snapped to a geohash cell at least as large as the
+requested radius. The sightings of that cell and its eight neighbours are
+loaded once per cell, cached with a TTL under the cell's tag, and trimmed to
+the exact radius in memory. Every user in the same area therefore shares the
+same cache entries, and raw coordinates never become cache keys.
+"""
+
+import math
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import cache, geohash, routers
+from .models import Sighting
+
+CELL_STATS_NAME = "sightings-cell"
+MAX_CELL_PRECISION = 7
+
+SIGHTING_FIELDS = (
+    "id",
+    "bird_id",
+    "bird__english_name",
+    "latitude",
+    "longitude",
+    "observed_on",
+    "recording_id",
+)
+# Field names in responses; distance_km is appended when trimming
+RESPONSE_FIELDS = (
+    "id",
+    "bird_id",
+    "english_name",
+    "latitude",
+    "longitude",
+    "observed_on",
+    "recording_id",
+    "distance_km",
+)
+
+
+def cell_tag(cell):
+    return f"cell:{cell}"
+
+
+def location_tags(lat, lng):
+    """Tags of every cell, at every cached precision, containing the point."""
+    full = geohash.encode(lat, lng, MAX_CELL_PRECISION)
+    return [cell_tag(full[:precision]) for precision in range(1, len(full) + 1)]
+
+
+def invalidate_location(lat, lng):
+    """Drop cached cells containing the point, e.g. after a new sighting."""
+    cache.invalidate_tags(*location_tags(lat, lng))
+
+
+def load_cells(cells):
+    """Return a dict of cell to its sightings as ``SIGHTING_FIELDS`` tuples.
+
+    All cells must have the same precision; they are loaded in one query.
+    """
+    precision = len(cells[0])
+    prefixes = Q()
+    for cell in cells:
+        prefixes |= Q(geohash__startswith=cell)
+
+    rows = {cell: [] for cell in cells}
+    queryset = Sighting.objects.all()
+    window = getattr(settings, "SIGHTING_WINDOW_DAYS", None)
+    if window:
+        queryset = queryset.recent(window)
+    queryset = (
+        queryset.filter(prefixes)
+        .order_by("id")
+        .values_list(*SIGHTING_FIELDS, "geohash")
+    )
+    for row in queryset:
+        rows[row[-1][:precision]].append(row[:-1])
+    return rows
+
+
+def cell_rows(cells, loader=load_cells, name=CELL_STATS_NAME, tags=()):
+    """Return the rows of all cells, loading and caching the ones not cached.
+
+    ``loader`` takes a list of cells and returns a dict of cell to rows;
+    ``name`` namespaces the cache entries and hit-rate stats. Entries depend on
+    their cell's tag, the catalogue and any extra ``tags``.
+    """
+    backend = cache.get_backend()
+    timeout = getattr(settings, "SIGHTING_CELL_TIMEOUT", 600)
+    shared_tags = [cache.CATALOGUE_TAG, *tags]
+    versions = cache.get_tag_versions([cell_tag(cell) for cell in cells] + shared_tags)
+
+    rows = []
+    missing = {}
+    for cell in cells:
+        key = cache.make_key(
+            name,
+            cell,
+            {
+                cell: versions[cell_tag(cell)],
+                **{tag: versions[tag] for tag in shared_tags},
+            },
+        )
+        cell_data = backend.get(key)
+        cache.stats.record(name, hit=cell_data is not None)
+        if cell_data is None:
+            missing[cell] = key
+        else:
+            rows.extend(cell_data)
+
+    if missing:
+        # Loaded from the primary, as the entries are stored under the current
+        # tag versions
+        routers.pin_to_primary()
+        for cell, cell_data in loader(list(missing)).items():
+            backend.set(missing[cell], cell_data, timeout)
+            rows.extend(cell_data)
+    return rows
+
+
+def nearby_sightings(lat, lng, radius_km, loader=load_cells):
+    """Return ``(cell, rows)`` for sightings within ``radius_km`` of the point.
+
+    Rows are ``RESPONSE_FIELDS`` tuples sorted by distance. ``cell`` is the
+    snapped cell the query was answered from.
+    """
+    precision = geohash.precision_for_radius(lat, lng, radius_km, MAX_CELL_PRECISION)
+    cell = geohash.encode(lat, lng, precision)
+
+    # Cheap bounding-box comparisons discard most rows before the haversine
+    lat_delta = radius_km / geohash.KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 90)))
+    lng_delta = lat_delta / cos_lat if cos_lat > 1e-9 else 360
+    min_lat, max_lat = lat - lat_delta, lat + lat_delta
+
+    nearby = []
+    for row in cell_rows(geohash.neighbours(cell), loader):
+        if not min_lat <= row[3] <= max_lat:
+            continue
+        if abs((row[4] - lng + 180) % 360 - 180) > lng_delta:
+            continue
+        distance = geohash.distance_km(lat, lng, row[3], row[4])
+        if distance <= radius_km:
+            nearby.append(row + (round(distance, 1),))
+    nearby.sort(key=lambda row: row[-1])
+    return cell, nearby
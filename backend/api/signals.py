@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import rollups
+from .cache import bump_catalogue_version
+from .models import Bird, Sighting
+from .sightings import invalidate_location
+
+
+@receiver(post_save, sender=Bird)
+@receiver(post_delete, sender=Bird)
+def invalidate_catalogue(sender, **kwargs):
+    """Any write to the catalogue orphans the responses built from it."""
+    # After commit, or another worker could cache the old row under the new
+    # version
+    transaction.on_commit(bump_catalogue_version)
+
+
+def deleting_bird(origin):
+    """Whether a sighting is being deleted because its bird is.
+
+    The bird's rollups are deleted along with it, and bumping the catalogue
+    drops every cached cell, so such sightings need no handling one by one.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, Bird)
+
+
+@receiver(post_save, sender=Sighting)
+@receiver(post_delete, sender=Sighting)
+def invalidate_sighting_cells(sender, instance, origin=None, **kwargs):
+    """A sighting write only orphans the cached cells containing it."""
+    if origin is not None and deleting_bird(origin):
+        return
+    latitude, longitude = instance.latitude, instance.longitude
+    transaction.on_commit(lambda: invalidate_location(latitude, longitude))
+
+
+@receiver(post_save, sender=Sighting)
+def count_created_sighting(sender, instance, created, **kwargs):
+    # Edits to an existing sighting's location or date need a rollup rebuild
+    if created:
+        update_rollups(instance, 1)
+
+
+@receiver(post_delete, sender=Sighting)
+def uncount_deleted_sighting(sender, instance, origin, **kwargs):
+    if not deleting_bird(origin):
+        update_rollups(instance, -1)
+
+
+def update_rollups(sighting, sign):
+    rollups.apply_counts(
+        rollups.count_sightings(
+            [
+                (
+                    sighting.bird_id,
+                    sighting.latitude,
+                    sighting.longitude,
+                    sighting.observed_on,
+                )
+            ],
+            sign,
+        )
+    )
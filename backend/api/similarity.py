@@ -0,0 +1,311 @@
+"""Acoustic similarity search across cached recordings.
+
+Each recording in the audio cache (see ``api.audio``) is summarized as the
+mean and standard deviation of its log mel-band energies, ``2 * N_MELS``
+float32 values scaled to unit length, so the cosine similarity of two
+recordings is the dot product of their vectors.
+
+Vectors are stored in ``SIMILARITY["DIR"]`` as rows of a float32 matrix
+(``features.f32``, after a small header) with the matching recording ids in
+``ids.i64``. New recordings are appended to both files; readers map the
+matrix with ``numpy.memmap`` and pick up appended rows when ``ids.i64``
+grows, so the index never has to be rebuilt while serving. A query scores
+every row in chunks of ``CHUNK_ROWS``, which stays fast well past hundreds of
+thousands of recordings.
+"""
+
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import audio
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DEFAULT_SETTINGS = {
+    "DIR": os.path.join(tempfile.gettempdir(), "hellobirdie-similarity"),
+    "N_MELS": 32,
+    "MIN_FREQUENCY": 500,
+    "MAX_FREQUENCY": 12000,
+    "N_FFT": 1024,
+    "HOP": 512,
+    "BATCH_SIZE": 8,
+    # Pool size; None uses every core
+    "PROCESSES": None,
+    # Rows scored at a time, bounding memory per query
+    "CHUNK_ROWS": 65536,
+}
+
+MAGIC = b"HBFX"
+HEADER = struct.Struct("<4sII4x")
+FORMAT_VERSION = 1
+
+
+class IndexMismatch(Exception):
+    """The feature file was built with a different vector width."""
+
+
+def get_similarity_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "SIMILARITY", {})}
+
+
+# Feature extraction
+
+
+def mel_filterbank(rate, n_fft, n_mels, min_frequency, max_frequency):
+    """Return an (n_mels, n_fft // 2 + 1) matrix of triangular mel filters."""
+    np = audio.np
+    max_frequency = min(max_frequency, rate / 2)
+
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    mels = np.linspace(to_mel(min_frequency), to_mel(max_frequency), n_mels + 2)
+    edges = 700 * (10 ** (mels / 2595) - 1)
+    frequencies = np.fft.rfftfreq(n_fft, 1 / rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (frequencies - lower) / (center - lower)
+    falling = (upper - frequencies) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def feature_vector(samples, rate, options):
+    """Return the unit-length mel summary of ``samples`` as float32."""
+    np = audio.np
+    power = audio.stft_magnitudes(samples, options["N_FFT"], options["HOP"]) ** 2
+    filters = mel_filterbank(
+        rate,
+        options["N_FFT"],
+        options["N_MELS"],
+        options["MIN_FREQUENCY"],
+        options["MAX_FREQUENCY"],
+    )
+    log_mel = np.log(power @ filters.T + 1e-10)
+    vector = np.concatenate([log_mel.mean(axis=0), log_mel.std(axis=0)])
+    # Centre before scaling, or the (large, negative) mean log energy would
+    # dominate every cosine
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(np.float32)
+
+
+def extract_batch(batch, options):
+    """Return ``(ids, vectors, errors)`` for ``(recording_id, path)`` pairs."""
+    ids = []
+    vectors = []
+    errors = {}
+    for recording_id, path in batch:
+        try:
+            samples, rate = audio.decode(path, options["MAX_SECONDS"])
+            vectors.append(feature_vector(samples, rate, options))
+        except (audio.AudioUnavailable, OSError, ValueError) as error:
+            errors[recording_id] = str(error)
+        else:
+            ids.append(recording_id)
+    return ids, vectors, errors
+
+
+# Storage
+
+
+class FeatureIndex:
+    """Append-only matrix of feature vectors shared between processes."""
+
+    def __init__(self, directory, dimensions):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.features_path = os.path.join(directory, "features.f32")
+        self.ids_path = os.path.join(directory, "ids.i64")
+        self._lock = threading.Lock()
+        self._loaded = (None, None, None)
+
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return _FileLock(os.path.join(self.directory, "lock"))
+
+    def append(self, ids, vectors):
+        """Add vectors of recordings not in the index yet; return how many."""
+        np = audio.np
+        with self._lock, self._file_lock():
+            known = set(self._read_ids().tolist())
+            rows = [
+                (int(recording_id), vector)
+                for recording_id, vector in zip(ids, vectors)
+                if int(recording_id) not in known
+            ]
+            if not rows:
+                return 0
+            # Each row lands in both files; the ids file is written last, so a
+            # reader (or a crash) never sees an id without its vector
+            count = self._row_count()
+            with open(self.features_path, "r+b" if count else "wb") as f:
+                if not count:
+                    f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.dimensions))
+                f.seek(HEADER.size + count * self.dimensions * 4)
+                f.truncate()
+                f.write(
+                    np.stack([vector for _, vector in rows]).astype("<f4").tobytes()
+                )
+            with open(self.ids_path, "ab") as f:
+                f.write(np.array([pk for pk, _ in rows], "<i8").tobytes())
+        return len(rows)
+
+    def _read_ids(self):
+        try:
+            with open(self.ids_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return audio.np.zeros(0, "<i8")
+        # Ignore a partly written id at the end
+        return audio.np.frombuffer(data[: len(data) // 8 * 8], "<i8")
+
+    def _row_count(self):
+        try:
+            return os.path.getsize(self.ids_path) // 8
+        except FileNotFoundError:
+            return 0
+
+    def load(self):
+        """Return ``(ids, matrix)``, remapping the files after appends."""
+        np = audio.np
+        with self._lock:
+            rows, ids, matrix = self._loaded
+            if rows == self._row_count():
+                return ids, matrix
+            ids = self._read_ids()
+            if not len(ids):
+                matrix = np.zeros((0, self.dimensions), np.float32)
+            else:
+                with open(self.features_path, "rb") as f:
+                    magic, version, dimensions = HEADER.unpack(f.read(HEADER.size))
+                if (magic, version, dimensions) != (
+                    MAGIC,
+                    FORMAT_VERSION,
+                    self.dimensions,
+                ):
+                    raise IndexMismatch(
+                        f"{self.features_path} holds {dimensions}-wide vectors, "
+                        f"expected {self.dimensions}"
+                    )
+                matrix = np.memmap(
+                    self.features_path,
+                    dtype="<f4",
+                    mode="r",
+                    offset=HEADER.size,
+                    shape=(len(ids), self.dimensions),
+                )
+            self._loaded = (len(ids), ids, matrix)
+            return ids, matrix
+
+    def clear(self):
+        """Remove every vector, e.g. after changing the feature settings."""
+        with self._lock, self._file_lock():
+            for path in (self.ids_path, self.features_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+            self._loaded = (None, None, None)
+
+    def similar(self, recording_id, limit, chunk_rows=DEFAULT_SETTINGS["CHUNK_ROWS"]):
+        """Return up to ``limit`` ``(recording_id, score)`` pairs, best first.
+
+        Returns ``None`` when ``recording_id`` isn't indexed.
+        """
+        np = audio.np
+        ids, matrix = self.load()
+        positions = np.flatnonzero(ids == int(recording_id))
+        if not len(positions):
+            return None
+        query = np.array(matrix[positions[0]])
+        scores = np.empty(len(ids), np.float32)
+        for start in range(0, len(ids), chunk_rows):
+            scores[start : start + chunk_rows] = (
+                matrix[start : start + chunk_rows] @ query
+            )
+        scores[positions] = -np.inf
+        limit = min(limit, len(ids) - len(positions))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(str(ids[row]), float(scores[row])) for row in top]
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                options = get_similarity_settings()
+                _index = FeatureIndex(options["DIR"], 2 * options["N_MELS"])
+    return _index
+
+
+@receiver(setting_changed)
+def _reset_index(setting, **kwargs):
+    global _index
+    if setting == "SIMILARITY":
+        _index = None
+
+
+def index_recordings(recording_ids=None, processes=None):
+    """Extract and append features of cached recordings not indexed yet.
+
+    Defaults to every recording in the audio cache. Returns ``(indexed,
+    errors)``: the number of vectors appended, and messages by recording id.
+    """
+    if audio.np is None:
+        raise audio.AudioUnavailable("NumPy is not installed")
+    audio_options = audio.get_audio_settings()
+    options = {
+        **get_similarity_settings(),
+        "MAX_SECONDS": audio_options["MAX_SECONDS"],
+    }
+    if processes is None:
+        processes = options["PROCESSES"]
+    index = get_index()
+    known = set(index.load()[0].tolist())
+
+    errors = {}
+    pending = []
+    for recording_id in recording_ids or audio.cached_recording_ids():
+        path = audio.audio_path(recording_id, audio_options["DIR"])
+        if path is None:
+            errors[recording_id] = "audio not cached"
+        elif int(recording_id) not in known:
+            pending.append((recording_id, path))
+
+    indexed = 0
+    # Batches are appended as they finish, and only from this process
+    for ids, vectors, batch_errors in audio.map_batches(
+        extract_batch, pending, options, processes
+    ):
+        indexed += index.append(ids, vectors)
+        errors.update(batch_errors)
+    return indexed, errors
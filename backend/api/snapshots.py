@@ -0,0 +1,343 @@
+"""Compact binary snapshots of the bird catalogue for offline clients.
+
+A snapshot file is laid out as::
+
+    b"HBCS" | uint32 header length (little-endian) | JSON header | deflate body
+
+The JSON header describes the file (``kind`` is ``"full"`` or ``"delta"``, the
+content ``digest``, the ``base`` digest of a delta, the row count) and lists the
+columns stored one after another in the decompressed body, each with its
+``size`` in bytes and its ``encoding``:
+
+``id``
+    little-endian int64 values, delta-encoded against the previous row.
+``dict``
+    a string table (``strings`` NUL-separated UTF-8 values taking
+    ``table_size`` bytes) followed by one little-endian code per row of
+    ``width`` bytes; the largest code of that width marks a null.
+``str``
+    NUL-separated UTF-8 values, one per row.
+
+Full snapshots store every row ordered by id. Deltas store the rows added or
+changed since ``base`` in the same columns, plus a ``deleted_id`` column.
+"""
+
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import catalogue_version
+from .models import Bird
+
+MAGIC = b"HBCS"
+FORMAT_VERSION = 1
+
+COLUMNS = (
+    ("id", "id"),
+    ("genus", "dict"),
+    ("species", "dict"),
+    ("subspecies", "dict"),
+    ("english_name", "str"),
+    ("family", "dict"),
+)
+FIELDS = tuple(name for name, _ in COLUMNS)
+
+POINTER_NAME = "current.json"
+DIGEST_RE = re.compile(r"[0-9a-f]{16}")
+
+
+def get_snapshot_dir():
+    return str(settings.CATALOGUE_SNAPSHOT_DIR)
+
+
+def snapshot_path(digest, directory=None):
+    return os.path.join(directory or get_snapshot_dir(), f"catalogue-{digest}.hbcs")
+
+
+def delta_path(base, digest, directory=None):
+    return os.path.join(
+        directory or get_snapshot_dir(), f"catalogue-{base}-{digest}.hbcs"
+    )
+
+
+# Column encoding
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_id(values):
+    deltas = array("q")
+    previous = 0
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return {}, _little_endian(deltas)
+
+
+def _decode_id(meta, data):
+    values = []
+    current = 0
+    for delta in _from_little_endian("q", data):
+        current += delta
+        values.append(current)
+    return values
+
+
+def _encode_dict(values):
+    table = []
+    codes_by_value = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(None)
+            continue
+        code = codes_by_value.get(value)
+        if code is None:
+            code = codes_by_value[value] = len(table)
+            table.append(value)
+        codes.append(code)
+
+    typecode, width = ("H", 2) if len(table) < 0xFFFF else ("I", 4)
+    null_code = (1 << (8 * width)) - 1
+    packed = array(typecode, (null_code if c is None else c for c in codes))
+    strings = "\0".join(table).encode("utf-8")
+    meta = {"strings": len(table), "table_size": len(strings), "width": width}
+    return meta, strings + _little_endian(packed)
+
+
+def _decode_dict(meta, data):
+    strings = data[: meta["table_size"]]
+    table = strings.decode("utf-8").split("\0") if meta["strings"] else []
+    typecode = "H" if meta["width"] == 2 else "I"
+    null_code = (1 << (8 * meta["width"])) - 1
+    codes = _from_little_endian(typecode, data[meta["table_size"] :])
+    return [None if code == null_code else table[code] for code in codes]
+
+
+def _encode_str(values):
+    return {}, "\0".join(values).encode("utf-8")
+
+
+def _decode_str(meta, data, rows):
+    return data.decode("utf-8").split("\0") if rows else []
+
+
+ENCODERS = {"id": _encode_id, "dict": _encode_dict, "str": _encode_str}
+
+
+def encode_columns(rows, columns):
+    """Return the column metadata and concatenated body for ``rows``."""
+    metas = []
+    sections = []
+    for index, (name, encoding) in enumerate(columns):
+        meta, data = ENCODERS[encoding]([row[index] for row in rows])
+        metas.append({"name": name, "encoding": encoding, "size": len(data), **meta})
+        sections.append(data)
+    return metas, b"".join(sections)
+
+
+def decode_columns(metas, body, rows):
+    """Return a dict of column name to list of values."""
+    columns = {}
+    offset = 0
+    for meta in metas:
+        data = body[offset : offset + meta["size"]]
+        offset += meta["size"]
+        if meta["encoding"] == "id":
+            columns[meta["name"]] = _decode_id(meta, data)
+        elif meta["encoding"] == "dict":
+            columns[meta["name"]] = _decode_dict(meta, data)
+        else:
+            columns[meta["name"]] = _decode_str(meta, data, rows)
+    return columns
+
+
+# Files
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _pack(header, body):
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return (
+        MAGIC
+        + struct.pack("<I", len(header_bytes))
+        + header_bytes
+        + zlib.compress(body, 9)
+    )
+
+
+def read_snapshot(path):
+    """Return ``(header, columns)`` for a snapshot or delta file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a catalogue snapshot")
+    (header_length,) = struct.unpack("<I", data[4:8])
+    header = json.loads(data[8 : 8 + header_length])
+    body = zlib.decompress(data[8 + header_length :])
+    return header, decode_columns(header["columns"], body, header["rows"])
+
+
+def snapshot_rows(columns, fields=FIELDS):
+    """Turn decoded columns back into row tuples in ``fields`` order."""
+    return list(zip(*(columns[name] for name in fields)))
+
+
+def build_snapshot(directory=None):
+    """Write a full snapshot of the catalogue and return its digest.
+
+    Snapshots are content-addressed, so rebuilding an unchanged catalogue
+    reuses the existing file.
+    """
+    directory = directory or get_snapshot_dir()
+    version = catalogue_version()
+    # From the primary, which can't be older than ``version``
+    rows = list(
+        Bird.objects.using(DEFAULT_DB_ALIAS).order_by("id").values_list(*FIELDS)
+    )
+    metas, body = encode_columns(rows, COLUMNS)
+    digest = hashlib.sha256(body).hexdigest()[:16]
+
+    path = snapshot_path(digest, directory)
+    if not os.path.exists(path):
+        header = {
+            "format": FORMAT_VERSION,
+            "kind": "full",
+            "digest": digest,
+            "rows": len(rows),
+            "columns": metas,
+        }
+        _write_atomic(path, _pack(header, body))
+    else:
+        # Keep reused snapshots from being pruned as old
+        os.utime(path)
+
+    # A slower build that started before the latest catalogue change must not
+    # replace the pointer a newer build wrote
+    pointer = _read_pointer(directory)
+    if pointer is None or pointer["catalogue_version"] <= version:
+        pointer = {"digest": digest, "catalogue_version": version}
+        _write_atomic(
+            os.path.join(directory, POINTER_NAME),
+            json.dumps(pointer).encode("utf-8"),
+        )
+    return digest
+
+
+def _read_pointer(directory):
+    try:
+        with open(os.path.join(directory, POINTER_NAME), "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_snapshot(directory=None):
+    """Return the digest of a snapshot matching the current catalogue version.
+
+    The snapshot is rebuilt only when the catalogue version has moved on since
+    the last build. The version comes from the shared cache (see
+    ``api.cache``), so every worker agrees on whether the pointer is current.
+    """
+    directory = directory or get_snapshot_dir()
+    pointer = _read_pointer(directory)
+
+    if (
+        pointer
+        and pointer["catalogue_version"] == catalogue_version()
+        and os.path.exists(snapshot_path(pointer["digest"], directory))
+    ):
+        return pointer["digest"]
+    return build_snapshot(directory)
+
+
+def build_delta(base, digest, directory=None):
+    """Write the delta from snapshot ``base`` to ``digest`` and return its path.
+
+    Returns ``None`` when ``base`` is not a snapshot digest still on disk.
+    """
+    directory = directory or get_snapshot_dir()
+    if not DIGEST_RE.fullmatch(base):
+        return None
+    path = delta_path(base, digest, directory)
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(snapshot_path(base, directory)):
+        return None
+
+    _, base_columns = read_snapshot(snapshot_path(base, directory))
+    _, columns = read_snapshot(snapshot_path(digest, directory))
+    base_rows = {row[0]: row for row in snapshot_rows(base_columns)}
+    rows = snapshot_rows(columns)
+
+    upserts = [row for row in rows if base_rows.get(row[0]) != row]
+    current_ids = {row[0] for row in rows}
+    deleted = sorted(set(base_rows) - current_ids)
+
+    metas, body = encode_columns(upserts, COLUMNS)
+    deleted_meta, deleted_body = encode_columns(
+        [(i,) for i in deleted], (("deleted_id", "id"),)
+    )
+    header = {
+        "format": FORMAT_VERSION,
+        "kind": "delta",
+        "base": base,
+        "digest": digest,
+        "rows": len(upserts),
+        "deleted": len(deleted),
+        "columns": metas + deleted_meta,
+    }
+    _write_atomic(path, _pack(header, body + deleted_body))
+    return path
+
+
+def prune_snapshots(keep, directory=None):
+    """Delete all but the ``keep`` most recent snapshots and their deltas."""
+    directory = directory or get_snapshot_dir()
+    if not os.path.isdir(directory):
+        return []
+    full = []
+    for name in os.listdir(directory):
+        parts = name[len("catalogue-") : -len(".hbcs")].split("-")
+        if name.startswith("catalogue-") and name.endswith(".hbcs") and len(parts) == 1:
+            full.append((os.path.getmtime(os.path.join(directory, name)), parts[0]))
+    kept = {digest for _, digest in sorted(full, reverse=True)[:keep]}
+
+    removed = []
+    for name in os.listdir(directory):
+        if not (name.startswith("catalogue-") and name.endswith(".hbcs")):
+            continue
+        digests = name[len("catalogue-") : -len(".hbcs")].split("-")
+        if not kept.issuperset(digests):
+            os.remove(os.path.join(directory, name))
+            removed.append(name)
+    return removed
@@ -0,0 +1,128 @@
+"""In-memory prefix index for bird name autocomplete.
+
+Every bird contributes a handful of normalized keys: the English name starting
+at each of its words ("great grey owl", "grey owl", "owl"), the binomial
+("strix nebulosa") and the species epithet. The keys are kept in one sorted
+list, so a query is a ``bisect`` to the first key starting with the normalized
+query followed by a scan over the matching range.
+"""
+
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import catalogue_version
+from .models import Bird
+
+# Rank classes, best first
+NAME_START = 0
+NAME_WORD = 1
+SCIENTIFIC = 2
+
+# Results are memoized for prefixes matching at least this many keys, which
+# bounds the memo to a few entries per prefix length
+MEMO_MIN_MATCHES = 256
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse everything but letters and digits."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in stripped).split())
+
+
+class SuggestIndex:
+    """Sorted-key prefix index over ``(id, english_name, genus, species)`` rows."""
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.birds = []
+        entries = []
+        for bird_index, (pk, english_name, genus, species) in enumerate(rows):
+            self.birds.append(
+                {
+                    "id": pk,
+                    "english_name": english_name,
+                    "genus": genus,
+                    "species": species,
+                }
+            )
+            words = normalize(english_name).split()
+            for position in range(len(words)):
+                rank = NAME_START if position == 0 else NAME_WORD
+                entries.append((" ".join(words[position:]), rank, bird_index))
+            entries.append((normalize(f"{genus} {species}"), SCIENTIFIC, bird_index))
+            entries.append((normalize(species), SCIENTIFIC, bird_index))
+
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        # Postings carry their own sort key so ranking needs no lookups
+        self.postings = [
+            (rank, len(self.birds[i]["english_name"]), self.birds[i]["english_name"], i)
+            for _, rank, i in entries
+        ]
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.birds)
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` birds whose keys start with ``query``."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        results = []
+        seen = set()
+        # A bird can match through several keys; its best posting sorts first
+        for posting in heapq.nsmallest(limit * 2, self.postings[start:end]):
+            if posting[3] not in seen:
+                seen.add(posting[3])
+                results.append(self.birds[posting[3]])
+        if len(results) < limit and end - start > limit * 2:
+            results = self._search_distinct(start, end, limit)
+        else:
+            results = results[:limit]
+
+        if end - start >= MEMO_MIN_MATCHES:
+            self._memo[memo_key] = results
+        return results
+
+    def _search_distinct(self, start, end, limit):
+        best = {}
+        for posting in self.postings[start:end]:
+            if posting[3] not in best or posting < best[posting[3]]:
+                best[posting[3]] = posting
+        matches = heapq.nsmallest(limit, best.values())
+        return [self.birds[posting[3]] for posting in matches]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return the process-wide index, rebuilding it if the catalogue changed.
+
+    Checking freshness only reads the catalogue version from the cache, so a
+    query against an up-to-date index never touches the database.
+    """
+    global _index
+    version = catalogue_version()
+    if _index is None or _index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                # From the primary, which can't be older than ``version``
+                rows = Bird.objects.using(DEFAULT_DB_ALIAS).values_list(
+                    "id", "english_name", "genus", "species"
+                )
+                _index = SuggestIndex(rows.iterator(), version=version)
+    return _index
@@ -0,0 +1,48 @@
+"""Background tasks run by ``manage.py run_workers`` (see ``api/jobs.py``)."""
+
+from . import (
+    audio,
+    ingest,
+    rollups,
+    similarity,
+    snapshots,
+    taxonomy,
+    thumbnails,
+)
+from .jobs import task
+
+
+@task
+def build_catalogue_snapshot(keep=None):
+    snapshots.build_snapshot()
+    if keep is not None:
+        snapshots.prune_snapshots(keep)
+
+
+@task
+def ingest_recordings(recordings):
+    ingest.ingest_recordings(recordings)
+
+
+@task
+def rebuild_species_rollups():
+    rollups.rebuild_rollups()
+
+
+@task
+def rebuild_taxonomy():
+    taxonomy.rebuild_tree()
+
+
+@task
+def build_recording_thumbnails(recording_ids=None, fetch=False):
+    if fetch and recording_ids:
+        audio.fetch_audio(recording_ids)
+    thumbnails.build_thumbnails(recording_ids)
+
+
+@task
+def index_recordings(recording_ids=None, fetch=False):
+    if fetch and recording_ids:
+        audio.fetch_audio(recording_ids)
+    similarity.index_recordings(recording_ids)
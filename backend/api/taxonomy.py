@@ -0,0 +1,133 @@
+"""Precomputed family > genus > species > subspecies tree of the catalogue.
+
+The tree is stored as ``TaxonNode`` rows with materialized paths and subtree
+bird counts. It is rebuilt from one aggregate query over ``Bird`` the first
+time it is read after the catalogue version changes, so reading a subtree
+never scans the birds table.
+"""
+
+from collections import defaultdict
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Q
+
+from . import cache
+from .models import Bird, TaxonNode
+
+RANKS = ("family", "genus", "species", "subspecies")
+SEPARATOR = "/"
+# Path component of birds without a family
+UNASSIGNED = "(unassigned)"
+
+VERSION_KEY = "taxonomy:version"
+LOCK_KEY = "taxonomy:rebuild"
+LOCK_TIMEOUT = 300
+
+FIELDS = ("path", "rank", "name", "depth", "bird_count", "child_count")
+
+
+def _component(name):
+    """Return ``name`` as a path component, percent-escaping ``/`` and ``%``.
+
+    Escaping keeps names such as "A/B" and "A B" on different paths.
+    """
+    if not name:
+        return UNASSIGNED
+    return name.replace("%", "%25").replace(SEPARATOR, "%2F")
+
+
+def build_nodes(leaves):
+    """Return unsaved ``TaxonNode`` objects for ``(names, count)`` leaves.
+
+    ``names`` are ``(family, genus, species, subspecies)``; a bird without a
+    subspecies counts towards its species node only.
+    """
+    counts = defaultdict(int)
+    children = defaultdict(set)
+    display_names = {}
+    for names, count in leaves:
+        if not names[-1]:
+            names = names[:-1]
+        path = ()
+        for name in names:
+            parent, path = path, path + (_component(name),)
+            counts[path] += count
+            children[parent].add(path)
+            display_names[path] = name or UNASSIGNED
+
+    return [
+        TaxonNode(
+            path=SEPARATOR.join(path),
+            rank=RANKS[len(path) - 1],
+            name=display_names[path],
+            depth=len(path) - 1,
+            bird_count=count,
+            child_count=len(children[path]),
+        )
+        for path, count in counts.items()
+    ]
+
+
+def rebuild_tree(version=None, batch_size=2000):
+    """Recompute the tree from ``Bird`` and return the number of nodes.
+
+    Reads and writes the primary: a lagging replica could give an older
+    catalogue than ``version``, and routed writes would make the request that
+    triggered the rebuild stick to the primary.
+    """
+    leaves = (
+        Bird.objects.using(DEFAULT_DB_ALIAS)
+        .values_list(*RANKS)
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    nodes = build_nodes((row[:-1], row[-1]) for row in leaves.iterator())
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        TaxonNode.objects.using(DEFAULT_DB_ALIAS).all().delete()
+        TaxonNode.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            nodes, batch_size=batch_size
+        )
+    _version_cache().set(VERSION_KEY, version or cache.catalogue_version(), None)
+    return len(nodes)
+
+
+def _version_cache():
+    return caches[cache.get_cache_settings()["CACHE_ALIAS"]]
+
+
+def ensure_fresh():
+    """Rebuild the tree if the catalogue changed since it was built.
+
+    Returns whether the tree is up to date. Only one process rebuilds at a
+    time; the others return ``False`` and keep serving the previous tree until
+    it is done.
+    """
+    version = cache.catalogue_version()
+    versions = _version_cache()
+    if versions.get(VERSION_KEY) == version:
+        return True
+    if not versions.add(LOCK_KEY, True, LOCK_TIMEOUT):
+        return False
+    try:
+        rebuild_tree(version)
+    finally:
+        versions.delete(LOCK_KEY)
+    return True
+
+
+def subtree(path=None, depth=1):
+    """Return the node at ``path`` and its descendants down ``depth`` levels.
+
+    Without ``path``, returns the top ``depth`` levels. Rows are ``FIELDS``
+    tuples ordered by path, so parents precede their children.
+    """
+    if path:
+        top = path.count(SEPARATOR)
+        nodes = TaxonNode.objects.filter(
+            Q(path=path) | Q(path__startswith=path + SEPARATOR),
+            depth__lte=top + depth,
+        )
+    else:
+        nodes = TaxonNode.objects.filter(depth__lt=depth)
+    return list(nodes.order_by("path").values_list(*FIELDS))
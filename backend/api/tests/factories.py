@@ -0,0 +1,61 @@
+import datetime
+import random
+
+import factory
+
+from api.geohash import encode as encode_geohash
+from api.models import Bird, Sighting
+
+GENERA = ("Falco", "Strix", "Accipiter", "Corvus", "Passer", "Lanius", "Anser")
+FAMILIES = ("Falconidae", "Strigidae", "Accipitridae", "Corvidae", "Passeridae")
+
+
+class BirdFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Bird
+
+    genus = factory.Iterator(GENERA)
+    species = factory.Sequence(lambda n: f"species{n}")
+    english_name = factory.Sequence(lambda n: f"Test Bird {n}")
+    subspecies = factory.Sequence(lambda n: f"subspecies{n}" if n % 2 else None)
+    family = factory.Iterator(FAMILIES)
+
+
+class SightingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Sighting
+
+    bird = factory.SubFactory(BirdFactory)
+    # Spread sightings over central Europe
+    latitude = factory.Sequence(lambda n: 45 + random.Random(n).random() * 10)
+    longitude = factory.Sequence(lambda n: 5 + random.Random(-n).random() * 15)
+    observed_on = factory.Sequence(
+        lambda n: datetime.date(2025, 1, 1) - datetime.timedelta(days=n % 730)
+    )
+    recording_id = factory.Sequence(lambda n: f"XC{n}")
+
+
+def create_birds(count, batch_size=5000):
+    """Insert ``count`` birds with ``bulk_create``, for large benchmark datasets."""
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        Bird.objects.bulk_create(BirdFactory.build_batch(size), batch_size=size)
+        created += size
+    return created
+
+
+def create_sightings(count, batch_size=5000):
+    """Insert ``count`` sightings of existing birds with ``bulk_create``."""
+    bird_ids = list(Bird.objects.values_list("id", flat=True)) or [BirdFactory().id]
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        batch = SightingFactory.build_batch(size, bird=None)
+        for offset, sighting in enumerate(batch):
+            sighting.bird_id = bird_ids[(created + offset) % len(bird_ids)]
+            # bulk_create skips save(), which normally derives the geohash
+            sighting.geohash = encode_geohash(sighting.latitude, sighting.longitude)
+        Sighting.objects.bulk_create(batch, batch_size=size)
+        created += size
+    return created
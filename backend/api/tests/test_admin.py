@@ -1,23 +1,31 @@
+import json
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
+from api import bulk_edits, cache
 from api.models import Bird
+from api.querybudget import QueryBudgetMixin
 
 
-class BirdAdminTestCase(TestCase):
-    def setUp(self):
-        self.client.force_login(
-            User.objects.get_or_create(
-                username="admin", is_staff=True, is_superuser=True
-            )[0]
+class BirdAdminTestCase(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create(
+            username="admin", is_staff=True, is_superuser=True
         )
 
-        self.bird = Bird.objects.create(
+        cls.bird = Bird.objects.create(
             genus="Falco",
             species="subbuteo",
             english_name="Eurasian Hobby",
         )
 
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
     def _get_admin_url(self, query_parameters=None):
         url = reverse("admin:api_bird_changelist")
         if query_parameters:
@@ -337,3 +345,281 @@ class BirdAdminTestCase(TestCase):
             self.assertNotIn("Passer", results_table)
         else:
             self.fail("Results table not found in response")
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """The changelist, filtered or searched, makes no per-row queries."""
+        Bird.objects.bulk_create(
+            Bird(genus=f"Genus{i % 5}", species=f"species{i}", english_name=f"Bird {i}")
+            for i in range(40)
+        )
+        for query_parameters in (None, "genus=Genus1", "q=Bird"):
+            with self.assertQueryBudget(max_queries=10, max_repeats=2):
+                response = self.client.get(self._get_admin_url(query_parameters))
+            self.assertEqual(response.status_code, 200)
+
+
+class BirdAdminExportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create(
+            username="admin", is_staff=True, is_superuser=True
+        )
+        cls.hobby = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+        cls.shrike = Bird.objects.create(
+            genus="Lanius",
+            species="excubitor",
+            english_name="Great Grey Shrike, northern",
+            family="Laniidae",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_selected_as_csv(self):
+        """The CSV action streams the selected birds with a header row."""
+        with self.assertLogs("api.exports", "INFO") as logs:
+            response = self.client.post(
+                reverse("admin:api_bird_changelist"),
+                {"action": "export_csv", "_selected_action": [self.shrike.pk]},
+            )
+            content = self._content(response)
+
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="birds.csv"'
+        )
+        self.assertEqual(
+            content.splitlines(),
+            [
+                "id,genus,species,subspecies,english_name,family",
+                f'{self.shrike.pk},Lanius,excubitor,,"Great Grey Shrike, northern",'
+                "Laniidae",
+            ],
+        )
+        self.assertIn("exported 1 rows", logs.output[-1])
+
+    def test_export_selected_as_ndjson(self):
+        """The NDJSON action streams one JSON object per line."""
+        response = self.client.post(
+            reverse("admin:api_bird_changelist"),
+            {
+                "action": "export_ndjson",
+                "_selected_action": [self.hobby.pk, self.shrike.pk],
+            },
+        )
+        lines = [json.loads(line) for line in self._content(response).splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            sorted(line["english_name"] for line in lines),
+            ["Eurasian Hobby", "Great Grey Shrike, northern"],
+        )
+        self.assertIsNone(lines[0]["subspecies"])
+
+    def test_export_all_matching_filter(self):
+        """The export view applies the changelist's filters and search."""
+        url = reverse("admin:api_bird_export", args=["csv"])
+        content = self._content(self.client.get(url, {"genus": "Falco"}))
+        self.assertEqual(len(content.splitlines()), 2)
+        self.assertIn("Eurasian Hobby", content)
+
+        content = self._content(self.client.get(url, {"q": "Shrike"}))
+        self.assertNotIn("Eurasian Hobby", content)
+
+    def test_export_runs_no_count_queries(self):
+        """The export doesn't paginate, so it doesn't count the changelist."""
+        url = reverse("admin:api_bird_export", args=["csv"])
+        with CaptureQueriesContext(connection) as queries:
+            self._content(self.client.get(url, {"genus": "Falco"}))
+        self.assertFalse(
+            [query for query in queries.captured_queries if "COUNT(" in query["sql"]]
+        )
+
+    def test_export_with_invalid_lookup_redirects(self):
+        url = reverse("admin:api_bird_export", args=["csv"])
+        response = self.client.get(url, {"no_such_field": "1"})
+        self.assertRedirects(response, reverse("admin:api_bird_changelist") + "?e=1")
+
+    def test_changelist_links_to_filtered_export(self):
+        response = self.client.get(
+            reverse("admin:api_bird_changelist"), {"genus": "Falco"}
+        )
+        export_url = reverse("admin:api_bird_export", args=["ndjson"])
+        self.assertContains(response, f"{export_url}?genus=Falco")
+
+    def test_unknown_export_format(self):
+        url = reverse("admin:api_bird_export", args=["xml"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class BirdAdminBulkEditTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create(
+            username="admin", is_staff=True, is_superuser=True
+        )
+        cls.birds = [
+            Bird.objects.create(
+                genus="Lanius", species="excubitor", english_name="Great Grey Shrike"
+            ),
+            Bird.objects.create(
+                genus="Lanius",
+                species="collurio",
+                english_name="Red-backed Shrike",
+                family="Laniidae",
+            ),
+            Bird.objects.create(
+                genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+            ),
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def _post(self, action, birds=None, query="", follow=False, **data):
+        return self.client.post(
+            reverse("admin:api_bird_changelist") + query,
+            {
+                "action": action,
+                "index": 0,
+                "_selected_action": [bird.pk for bird in birds or self.birds],
+                **data,
+            },
+            follow=follow,
+        )
+
+    def test_first_step_shows_form(self):
+        response = self._post("set_family")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="family"')
+        self.assertNotContains(response, 'name="apply"')
+
+    def test_preview_counts_without_writing(self):
+        """A dry run reports matched and changing rows and writes nothing."""
+        response = self._post("set_family", bulk_edit=1, family="Laniidae")
+
+        self.assertEqual(response.context["preview"]["matched"], 3)
+        self.assertEqual(response.context["preview"]["changing"], 2)
+        self.assertContains(response, 'name="apply"')
+        self.assertEqual(Bird.objects.filter(family="Laniidae").count(), 1)
+
+    def test_set_family_in_one_update(self):
+        """Applying runs a single UPDATE and bumps the catalogue version once."""
+        version = cache.catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                response = self._post(
+                    "set_family",
+                    birds=self.birds[:2],
+                    bulk_edit=1,
+                    apply=1,
+                    family="Laniidae",
+                )
+
+        writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if not query["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith("UPDATE"))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(cache.catalogue_version(), version)
+        self.assertEqual(
+            list(Bird.objects.order_by("pk").values_list("family", flat=True)),
+            ["Laniidae", "Laniidae", None],
+        )
+
+    def test_rename_genus_across_filtered_selection(self):
+        """With select_across, the edit applies to every bird matching the filter."""
+        self._post(
+            "rename_genus",
+            birds=self.birds[:1],
+            query="?genus=Lanius",
+            select_across=1,
+            bulk_edit=1,
+            apply=1,
+            genus="Laniarius",
+        )
+        self.assertEqual(
+            list(Bird.objects.order_by("pk").values_list("genus", flat=True)),
+            ["Laniarius", "Laniarius", "Falco"],
+        )
+
+    def test_replace_in_english_name(self):
+        """Find and replace is case-sensitive and previews sample renames."""
+        response = self._post(
+            "replace_in_english_name", bulk_edit=1, find="Shrike", replace="Butcherbird"
+        )
+        self.assertEqual(response.context["preview"]["changing"], 2)
+        self.assertIn(
+            ("Great Grey Shrike", "Great Grey Butcherbird"),
+            response.context["preview"]["samples"],
+        )
+
+        self._post(
+            "replace_in_english_name",
+            bulk_edit=1,
+            apply=1,
+            find="shrike",
+            replace="Butcherbird",
+        )
+        self.assertFalse(Bird.objects.filter(english_name__contains="Butcherbird"))
+
+    def test_replace_skips_names_that_would_be_too_long(self):
+        """Names the replacement would push past max_length are left alone."""
+        southern = Bird.objects.create(
+            genus="Lanius",
+            species="meridionalis",
+            english_name="Southern Grey Shrike",
+        )
+        birds = [*self.birds, southern]
+        replace = "S" * 62
+        response = self._post(
+            "replace_in_english_name",
+            birds=birds,
+            bulk_edit=1,
+            find="Shrike",
+            replace=replace,
+        )
+        preview = response.context["preview"]
+        self.assertEqual((preview["changing"], preview["too_long"]), (2, 1))
+        self.assertContains(response, "1 will be skipped")
+        self.assertNotIn("Southern Grey Shrike", dict(preview["samples"]))
+
+        response = self._post(
+            "replace_in_english_name",
+            birds=birds,
+            bulk_edit=1,
+            apply=1,
+            find="Shrike",
+            replace=replace,
+            follow=True,
+        )
+        self.assertContains(response, "Updated 2 birds.")
+        self.assertContains(response, "Skipped 1 birds")
+        southern.refresh_from_db()
+        self.assertEqual(southern.english_name, "Southern Grey Shrike")
+        self.assertEqual(Bird.objects.filter(english_name__endswith=replace).count(), 2)
+
+    def test_replace_counts_too_long_names_before_updating(self):
+        """Renamed birds aren't counted as too long by a second replacement."""
+        too_long = Bird.objects.create(
+            genus="Anas", species="a", english_name="a" * 36 + "b" * 4
+        )
+        fits = Bird.objects.create(
+            genus="Anas", species="b", english_name="a" * 13 + "b" * 37
+        )
+        queryset = Bird.objects.filter(pk__in=[too_long.pk, fits.pk])
+        self.assertEqual(
+            bulk_edits.REPLACE_IN_NAME.apply(queryset, {"find": "a", "replace": "aa"}),
+            (1, 1),
+        )
+        fits.refresh_from_db()
+        self.assertEqual(fits.english_name, "a" * 26 + "b" * 37)
@@ -0,0 +1,165 @@
+import http.client
+import json
+import threading
+from unittest import mock
+
+from django.core.cache import cache as default_cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import cache, recordings
+from api.models import Bird
+
+
+class BirdBatchTestCase(TestCase):
+    def setUp(self):
+        cache.get_backend().clear()
+        default_cache.clear()
+        self.hobby = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+        self.shrike = Bird.objects.create(
+            genus="Lanius", species="excubitor", english_name="Great Grey Shrike"
+        )
+
+    def _get(self, ids):
+        return self.client.get(reverse("bird-list"), {"ids": ids})
+
+    def test_returns_requested_birds_in_one_query(self):
+        """Birds come back in the requested order from a single IN query."""
+        with self.assertNumQueries(1):
+            response = self._get(f"{self.shrike.pk},{self.hobby.pk},{self.shrike.pk}")
+        body = response.json()
+
+        self.assertEqual(
+            [row[0] for row in body["data"]], [self.shrike.pk, self.hobby.pk]
+        )
+        self.assertEqual(body["meta"]["fields"][0], "id")
+        self.assertEqual(body["errors"], [])
+
+    def test_reports_errors_per_item(self):
+        body = self._get(f"{self.hobby.pk},abc,999999").json()
+
+        self.assertEqual([row[0] for row in body["data"]], [self.hobby.pk])
+        self.assertEqual(
+            body["errors"],
+            [
+                {"id": "abc", "error": "invalid id"},
+                {"id": 999999, "error": "not found"},
+            ],
+        )
+
+    def test_non_ascii_digits_are_invalid_ids(self):
+        """``"²".isdigit()`` is true but ``int("²")`` fails."""
+        body = self._get(f"{self.hobby.pk},²,١").json()
+        self.assertEqual([row[0] for row in body["data"]], [self.hobby.pk])
+        self.assertEqual(
+            body["errors"],
+            [{"id": "²", "error": "invalid id"}, {"id": "١", "error": "invalid id"}],
+        )
+
+    def test_ids_too_large_for_bigint_are_invalid(self):
+        too_large = str(2**63)
+        body = self._get(f"{self.hobby.pk},{too_large}").json()
+        self.assertEqual([row[0] for row in body["data"]], [self.hobby.pk])
+        self.assertEqual(body["errors"], [{"id": too_large, "error": "invalid id"}])
+
+    @override_settings(API_MAX_BATCH_SIZE=2)
+    def test_rejects_oversized_batches(self):
+        self.assertEqual(self._get("1,2,3").status_code, 400)
+        self.assertEqual(self._get("").status_code, 400)
+
+
+def upstream_recording(recording_id):
+    return {
+        "id": recording_id,
+        "gen": "Falco",
+        "sp": "subbuteo",
+        "en": "Eurasian Hobby",
+    }
+
+
+class RecordingBatchTestCase(TestCase):
+    def setUp(self):
+        cache.get_backend().clear()
+        default_cache.clear()
+
+    def _fetch(self, recording_id):
+        if recording_id == "404":
+            raise recordings.RecordingNotFound(recording_id)
+        if recording_id == "500":
+            raise recordings.UpstreamError("HTTP Error 500")
+        return upstream_recording(recording_id)
+
+    def test_serves_cached_entries_and_fetches_misses(self):
+        """Only misses reach upstream; their results are cached for next time."""
+        with mock.patch.object(
+            recordings, "fetch_recording", side_effect=self._fetch
+        ) as fetch:
+            response = self.client.get(reverse("recording-list"), {"ids": "XC1,2"})
+            self.assertEqual(
+                [recording["id"] for recording in response.json()["data"]], ["1", "2"]
+            )
+            self.client.get(reverse("recording-list"), {"ids": "1,2,3"})
+
+        self.assertEqual(
+            sorted(call.args[0] for call in fetch.call_args_list), ["1", "2", "3"]
+        )
+
+    def test_misses_are_fetched_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def fetch(recording_id):
+            # Only returns if all three fetches are in flight at once
+            barrier.wait()
+            return upstream_recording(recording_id)
+
+        with mock.patch.object(recordings, "fetch_recording", side_effect=fetch):
+            found, errors = recordings.get_recordings(["1", "2", "3"])
+        self.assertEqual(len(found), 3)
+        self.assertEqual(errors, {})
+
+    def test_reports_errors_per_item(self):
+        with mock.patch.object(recordings, "fetch_recording", side_effect=self._fetch):
+            body = self.client.get(
+                reverse("recording-list"), {"ids": "1,404,500,x"}
+            ).json()
+
+        self.assertEqual([recording["id"] for recording in body["data"]], ["1"])
+        self.assertEqual(
+            body["errors"],
+            [
+                {"id": "x", "error": "invalid id"},
+                {"id": "404", "error": "not found"},
+                {"id": "500", "error": "upstream error: HTTP Error 500"},
+            ],
+        )
+
+    def test_detail(self):
+        with mock.patch.object(recordings, "fetch_recording", side_effect=self._fetch):
+            response = self.client.get(reverse("recording-detail", args=["XC7"]))
+            self.assertEqual(response.json()["data"]["id"], "7")
+            response = self.client.get(reverse("recording-detail", args=["404"]))
+            self.assertEqual(response.status_code, 404)
+            response = self.client.get(reverse("recording-detail", args=["500"]))
+            self.assertEqual(response.status_code, 502)
+            response = self.client.get(reverse("recording-detail", args=["XC²"]))
+            self.assertEqual(response.status_code, 400)
+        self.assertIsNone(recordings.normalize_id("١٢"))
+
+    def test_fetch_parses_upstream_response(self):
+        body = json.dumps({"recordings": [{"id": "7", "en": "Eurasian Hobby"}]})
+        with mock.patch("urllib.request.urlopen", mock.mock_open(read_data=body)):
+            self.assertEqual(recordings.fetch_recording("7")["en"], "Eurasian Hobby")
+            with self.assertRaises(recordings.RecordingNotFound):
+                recordings.fetch_recording("8")
+
+    def test_fetch_wraps_errors_while_reading(self):
+        for error in (
+            http.client.RemoteDisconnected("Remote end closed connection"),
+            http.client.IncompleteRead(b"{"),
+            ConnectionResetError(),
+        ):
+            with mock.patch("urllib.request.urlopen", side_effect=error):
+                with self.assertRaises(recordings.UpstreamError):
+                    recordings.fetch_recording("7")
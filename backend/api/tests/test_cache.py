@@ -0,0 +1,193 @@
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache as default_cache
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from api import cache, checks
+from api.models import Bird
+
+
+class CacheBackendTestCase(TestCase):
+
+    def test_lru_backend_evicts_least_recently_used(self):
+        backend = cache.LRUBackend(max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+
+        self.assertEqual(backend.get("a"), 1)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("c"), 3)
+
+    def test_lru_backend_expires_entries(self):
+        backend = cache.LRUBackend()
+        backend.set("a", 1, timeout=-1)
+        self.assertIsNone(backend.get("a"))
+
+    def test_file_backend_round_trip(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = cache.FileBackend(location)
+            backend.set("key", (200, "application/json", b"{}"))
+            self.assertEqual(backend.get("key"), (200, "application/json", b"{}"))
+
+            backend.clear()
+            self.assertIsNone(backend.get("key"))
+
+    def test_django_cache_backend_round_trip(self):
+        backend = cache.DjangoCacheBackend()
+        backend.set("key", b"payload")
+        self.assertEqual(backend.get("key"), b"payload")
+
+
+class TagVersionTestCase(TestCase):
+    def setUp(self):
+        default_cache.clear()
+
+    def test_invalidating_a_tag_only_changes_that_tag(self):
+        before = cache.get_tag_versions(["catalogue", "cell:u33d"])
+        cache.invalidate_tags("cell:u33d")
+        after = cache.get_tag_versions(["catalogue", "cell:u33d"])
+
+        self.assertEqual(before["catalogue"], after["catalogue"])
+        self.assertNotEqual(before["cell:u33d"], after["cell:u33d"])
+
+    def test_bird_writes_bump_catalogue_version(self):
+        version = cache.catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bird = Bird.objects.create(
+                genus="Falco", species="tinnunculus", english_name="Common Kestrel"
+            )
+            # Not until the write commits
+            self.assertEqual(cache.catalogue_version(), version)
+        self.assertNotEqual(cache.catalogue_version(), version)
+
+        version = cache.catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bird.delete()
+        self.assertNotEqual(cache.catalogue_version(), version)
+
+    def test_process_local_version_cache_fails_system_check(self):
+        self.assertEqual(
+            [error.id for error in checks.check_shared_cache(None)], ["api.E001"]
+        )
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": directory,
+                }
+            }
+        ):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+
+class CacheResponseTestCase(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        cache.get_backend().clear()
+        cache.stats.reset()
+        self.factory = RequestFactory()
+        self.calls = 0
+
+        @cache.cache_response("test-view", tags=["catalogue"])
+        def view(request):
+            self.calls += 1
+            return JsonResponse({"calls": self.calls})
+
+        self.view = view
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.view(self.factory.get("/api/test/"))
+        second = self.view(self.factory.get("/api/test/"))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], "application/json")
+
+    def test_query_parameter_order_does_not_matter(self):
+        self.view(self.factory.get("/api/test/?a=1&b=2"))
+        response = self.view(self.factory.get("/api/test/?b=2&a=1"))
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_different_query_parameters_miss(self):
+        self.view(self.factory.get("/api/test/?a=1"))
+        response = self.view(self.factory.get("/api/test/?a=2"))
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_invalidating_tag_misses(self):
+        self.view(self.factory.get("/api/test/"))
+        cache.invalidate_tags("catalogue")
+        self.view(self.factory.get("/api/test/"))
+        self.assertEqual(self.calls, 2)
+
+    def test_unrelated_tag_does_not_invalidate(self):
+        self.view(self.factory.get("/api/test/"))
+        cache.invalidate_tags("cell:u33d")
+        self.view(self.factory.get("/api/test/"))
+        self.assertEqual(self.calls, 1)
+
+    def test_stats_report_hit_rate_per_endpoint(self):
+        for _ in range(4):
+            self.view(self.factory.get("/api/test/"))
+
+        report = cache.stats.report()["test-view"]
+        self.assertEqual(report, {"hits": 3, "misses": 1, "hit_rate": 0.75})
+
+    def test_file_backend_serves_cached_response(self):
+        with tempfile.TemporaryDirectory() as location:
+            with self.settings(API_CACHE={"BACKEND": "file", "LOCATION": location}):
+                self.view(self.factory.get("/api/test/"))
+                response = self.view(self.factory.get("/api/test/"))
+        self.assertEqual(response["X-Cache"], "HIT")
+
+
+class BirdListTestCase(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        cache.get_backend().clear()
+
+    def test_bird_list_returns_catalogue(self):
+        Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+
+        response = self.client.get(reverse("bird-list"))
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(b"".join(response.streaming_content))
+        english_name = body["meta"]["fields"].index("english_name")
+        self.assertEqual(len(body["data"]), 1)
+        self.assertEqual(body["data"][0][english_name], "Eurasian Hobby")
+
+    def test_bird_list_is_cached_once_streamed(self):
+        response = self.client.get(reverse("bird-list"))
+        streamed = b"".join(response.streaming_content)
+
+        response = self.client.get(reverse("bird-list"))
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.content, streamed)
+
+    def test_bird_write_invalidates_cached_list(self):
+        self.client.get(reverse("bird-list"))
+        Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+
+        response = self.client.get(reverse("bird-list"))
+        self.assertEqual(response["X-Cache"], "MISS")
+        body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(body["data"]), 1)
+
+    def test_cache_stats_requires_staff(self):
+        response = self.client.get(reverse("cache-stats"))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(User.objects.create(username="admin", is_staff=True))
+        response = self.client.get(reverse("cache-stats"))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from api import geohash
+
+
+class GeohashTestCase(SimpleTestCase):
+
+    def test_encode_known_value(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_bounds_contain_point(self):
+        min_lat, min_lng, max_lat, max_lng = geohash.bounds("u4pruydqqvj")
+        self.assertTrue(min_lat <= 57.64911 <= max_lat)
+        self.assertTrue(min_lng <= 10.40744 <= max_lng)
+
+    def test_neighbours(self):
+        cells = geohash.neighbours("u4pru")
+        self.assertEqual(len(cells), 9)
+        self.assertIn("u4pru", cells)
+        self.assertTrue(all(len(cell) == 5 for cell in cells))
+
+    def test_neighbours_wrap_antimeridian(self):
+        cells = geohash.neighbours(geohash.encode(0, 179.99, 4))
+        self.assertEqual(len(cells), 9)
+        self.assertTrue(any(geohash.bounds(cell)[1] < 0 for cell in cells))
+
+    def test_precision_for_radius(self):
+        precision = geohash.precision_for_radius(52.52, 13.40, 50)
+        self.assertEqual(precision, 3)
+        self.assertTrue(
+            min(geohash.cell_size_km(geohash.encode(52.52, 13.40, precision))) >= 50
+        )
+
+    def test_distance(self):
+        # Berlin to Paris is roughly 878 km
+        self.assertAlmostEqual(
+            geohash.distance_km(52.52, 13.405, 48.8566, 2.3522), 878, delta=5
+        )
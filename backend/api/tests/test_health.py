@@ -1,8 +1,10 @@
 from django.test import TestCase
 from django.urls import reverse
 
+from api.querybudget import QueryBudgetMixin
 
-class HealthCheckTestCase(TestCase):
+
+class HealthCheckTestCase(QueryBudgetMixin, TestCase):
 
     def test_health_check_returns_ok_status(self):
         response = self.client.get(reverse("health-check"))
@@ -12,3 +14,7 @@ class HealthCheckTestCase(TestCase):
 
         data = response.json()
         self.assertEqual(data, {"status": "ok"})
+
+    def test_health_check_makes_no_queries(self):
+        with self.assertQueryBudget(max_queries=0):
+            self.client.get(reverse("health-check"))
@@ -0,0 +1,179 @@
+import datetime
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api import jobs
+from api.models import Job
+
+calls = []
+calls_lock = threading.Lock()
+
+
+@jobs.task(name="tests.record")
+def record(value):
+    with calls_lock:
+        calls.append(value)
+
+
+@jobs.task(name="tests.fail")
+def fail():
+    raise RuntimeError("boom")
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claims_by_priority_then_due_time(self):
+        """Higher priorities run first; jobs scheduled in the future wait."""
+        now = timezone.now()
+        jobs.enqueue("tests.record", value="late", run_at=now - datetime.timedelta(1))
+        jobs.enqueue("tests.record", value="urgent", priority=10)
+        jobs.enqueue("tests.record", value="future", run_at=now + datetime.timedelta(1))
+
+        claimed = [jobs.claim().kwargs["value"], jobs.claim().kwargs["value"]]
+        self.assertEqual(claimed, ["urgent", "late"])
+        self.assertIsNone(jobs.claim())
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING).count(), 2)
+
+    def test_claimed_job_is_not_handed_out_again(self):
+        jobs.enqueue(record, value=1)
+        job = jobs.claim()
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(jobs.claim())
+
+    def test_successful_run(self):
+        jobs.enqueue(record, value=1)
+        self.assertEqual(jobs.run(jobs.claim()), Job.DONE)
+        self.assertEqual(calls, [1])
+        self.assertIsNotNone(Job.objects.get().finished_at)
+
+    @override_settings(JOB_QUEUE={"RETRY_DELAY": 10})
+    def test_failures_retry_with_backoff_then_fail(self):
+        """Failed jobs are rescheduled 10s, 20s... later until out of attempts."""
+        job = jobs.enqueue(fail, max_attempts=2)
+        self.assertEqual(jobs.run(jobs.claim()), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + datetime.timedelta(seconds=9))
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(jobs.run(jobs.claim()), Job.FAILED)
+
+    def test_unknown_tasks(self):
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue("tests.missing")
+        Job.objects.create(task="tests.missing", run_at=timezone.now())
+        with self.assertLogs("api.jobs", "ERROR"):
+            self.assertEqual(jobs.run(jobs.claim()), Job.FAILED)
+
+    def test_stale_running_jobs_are_requeued(self):
+        jobs.enqueue(record, value=1)
+        jobs.claim()
+        Job.objects.update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        with self.assertLogs("api.jobs", "WARNING"):
+            self.assertEqual(jobs.requeue_stale(), (1, 0))
+        self.assertEqual(jobs.queue_depth(), {Job.QUEUED: 1})
+
+    def test_stale_jobs_out_of_attempts_fail(self):
+        """A job that keeps killing its worker isn't requeued forever."""
+        jobs.enqueue(record, value=1, max_attempts=1)
+        jobs.enqueue(record, value=2, max_attempts=2)
+        jobs.claim()
+        jobs.claim()
+        Job.objects.update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        with self.assertLogs("api.jobs", "WARNING"):
+            self.assertEqual(jobs.requeue_stale(), (1, 1))
+        failed = Job.objects.get(status=Job.FAILED)
+        self.assertEqual(failed.kwargs, {"value": 1})
+        self.assertIn("Worker stopped responding", failed.last_error)
+
+
+@override_settings(JOB_QUEUE={"POLL_INTERVAL": 0.05})
+class WorkerPoolTestCase(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_workers_run_every_job_once(self):
+        for value in range(20):
+            jobs.enqueue(record, value=value)
+
+        # SQLite's shared in-memory test database can't take concurrent writers
+        concurrency = 3 if connection.vendor == "postgresql" else 1
+        metrics = jobs.WorkerPool(concurrency, burst=True).run()
+
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertEqual(metrics["succeeded"], 20)
+        self.assertEqual(jobs.queue_depth(), {Job.DONE: 20})
+
+    @override_settings(JOB_QUEUE={"POLL_INTERVAL": 0.05, "STALE_CHECK_INTERVAL": 0.05})
+    def test_stale_jobs_are_requeued_while_workers_run(self):
+        job = jobs.enqueue(record, value=1)
+        Job.objects.update(status=Job.RUNNING, attempts=1, started_at=timezone.now())
+        checked = threading.Event()
+        requeue_stale = jobs.requeue_stale
+
+        def check(*args, **kwargs):
+            result = requeue_stale(*args, **kwargs)
+            checked.set()
+            return result
+
+        pool = jobs.WorkerPool()
+        thread = threading.Thread(target=pool.run)
+        with mock.patch("api.jobs.requeue_stale", side_effect=check):
+            thread.start()
+            try:
+                # Goes stale only after the startup check
+                self.assertTrue(checked.wait(5))
+                Job.objects.update(
+                    started_at=timezone.now() - datetime.timedelta(hours=2)
+                )
+                deadline = time.monotonic() + 5
+                while not calls and time.monotonic() < deadline:
+                    time.sleep(0.05)
+            finally:
+                pool.stop()
+                thread.join()
+        self.assertEqual(calls, [1])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_listener_survives_database_errors(self):
+        """A lost connection is logged, closed and LISTENed on again."""
+        fake = mock.MagicMock(vendor="postgresql")
+        cursor = fake.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = [OperationalError("server closed"), None]
+        fake.connection.notifies.return_value = []
+        pool = jobs.WorkerPool()
+        thread = threading.Thread(target=pool._listen)
+        with mock.patch("api.jobs.connection", fake):
+            with self.assertLogs("api.jobs", "WARNING") as logs:
+                thread.start()
+                deadline = time.monotonic() + 5
+                while (
+                    not fake.connection.notifies.called and time.monotonic() < deadline
+                ):
+                    time.sleep(0.01)
+                pool.stop()
+                thread.join()
+        self.assertIn("server closed", logs.output[0])
+        self.assertEqual(cursor.execute.call_count, 2)
+        self.assertTrue(fake.close.called)
+        self.assertTrue(fake.connection.notifies.called)
+
+    def test_run_workers_command(self):
+        jobs.enqueue(record, value=1)
+        jobs.enqueue(fail, max_attempts=1)
+        with self.assertLogs("api.jobs", "ERROR"):
+            out = StringIO()
+            call_command("run_workers", "--burst", stdout=out)
+        self.assertIn(
+            "Processed 2 jobs (1 succeeded, 0 retried, 1 failed)", out.getvalue()
+        )
@@ -0,0 +1,136 @@
+import datetime
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from api import partitions
+from api.models import Bird, Sighting
+
+postgresql_only = unittest.skipUnless(
+    connection.vendor == "postgresql", "Sighting partitions require PostgreSQL"
+)
+
+
+class MonthHelpersTestCase(SimpleTestCase):
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(
+            partitions.add_months(datetime.date(2025, 11, 1), 3),
+            datetime.date(2026, 2, 1),
+        )
+        self.assertEqual(
+            partitions.add_months(datetime.date(2025, 1, 1), -1),
+            datetime.date(2024, 12, 1),
+        )
+
+    def test_partition_name(self):
+        self.assertEqual(
+            partitions.partition_name(datetime.date(2025, 3, 1)), "api_sighting_p202503"
+        )
+
+
+class SightingDateFilterTestCase(TestCase):
+    def setUp(self):
+        bird = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+        for day in (
+            datetime.date(2025, 5, 31),
+            datetime.date(2025, 6, 1),
+            datetime.date(2025, 6, 30),
+        ):
+            Sighting.objects.create(
+                bird=bird, latitude=52.5, longitude=13.4, observed_on=day
+            )
+
+    def test_observed_between_excludes_end(self):
+        sightings = Sighting.objects.observed_between(
+            datetime.date(2025, 6, 1), datetime.date(2025, 6, 30)
+        )
+        self.assertEqual([s.observed_on.day for s in sightings], [1])
+
+    def test_recent_includes_today(self):
+        sightings = Sighting.objects.recent(30, today=datetime.date(2025, 6, 30))
+        self.assertEqual(sightings.count(), 2)
+
+
+class PartitionCommandTestCase(TestCase):
+    @unittest.skipIf(connection.vendor == "postgresql", "Table is partitioned")
+    def test_command_is_a_no_op_on_plain_table(self):
+        out = StringIO()
+        call_command("manage_sighting_partitions", stdout=out)
+        self.assertIn("not partitioned", out.getvalue())
+
+    @postgresql_only
+    def test_command_creates_upcoming_partitions(self):
+        out = StringIO()
+        call_command("manage_sighting_partitions", ahead=2, stdout=out)
+        this_month = partitions.month_start(datetime.date.today())
+        self.assertIn(this_month, partitions.list_partitions())
+        self.assertIn(
+            partitions.add_months(this_month, 2), partitions.list_partitions()
+        )
+
+
+@postgresql_only
+class PartitionPruningTestCase(TestCase):
+    def setUp(self):
+        self.bird = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+        partitions.ensure_partitions(
+            datetime.date(2025, 1, 1), datetime.date(2025, 6, 1)
+        )
+
+    def _explain(self, queryset):
+        return queryset.explain()
+
+    def test_table_is_partitioned(self):
+        self.assertTrue(partitions.is_partitioned())
+
+    def test_date_bounded_query_scans_only_matching_partitions(self):
+        plan = self._explain(
+            Sighting.objects.observed_between(
+                datetime.date(2025, 3, 1), datetime.date(2025, 4, 1)
+            )
+        )
+        self.assertIn("api_sighting_p202503", plan)
+        self.assertNotIn("api_sighting_p202502", plan)
+        self.assertNotIn("api_sighting_p202504", plan)
+        self.assertNotIn("api_sighting_default", plan)
+
+    def test_recent_query_prunes_old_partitions(self):
+        plan = self._explain(
+            Sighting.objects.recent(10, today=datetime.date(2025, 6, 5))
+        )
+        self.assertIn("api_sighting_p202505", plan)
+        self.assertIn("api_sighting_p202506", plan)
+        self.assertNotIn("api_sighting_p202501", plan)
+
+    def test_unbounded_query_scans_every_partition(self):
+        plan = self._explain(Sighting.objects.all())
+        self.assertIn("api_sighting_p202501", plan)
+        self.assertIn("api_sighting_default", plan)
+
+    def test_creating_partition_moves_rows_from_default(self):
+        sighting = Sighting.objects.create(
+            bird=self.bird,
+            latitude=52.5,
+            longitude=13.4,
+            observed_on=datetime.date(2024, 7, 4),
+        )
+        partitions.create_partition(datetime.date(2024, 7, 1))
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id FROM api_sighting_p202407")
+            self.assertEqual(cursor.fetchall(), [(sighting.id,)])
+            cursor.execute("SELECT count(*) FROM api_sighting_default")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_detach_old_partitions(self):
+        detached = partitions.detach_partitions(datetime.date(2025, 3, 1))
+        self.assertEqual(detached, ["api_sighting_p202501", "api_sighting_p202502"])
+        self.assertEqual(partitions.list_partitions()[0], datetime.date(2025, 3, 1))
@@ -0,0 +1,138 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse, reverse_lazy
+
+from api import cache, profiling
+from api.middleware import ProfilingMiddleware
+from api.models import Bird, RequestProfile
+from api.querybudget import QueryBudgetMixin
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SamplerTestCase(SimpleTestCase):
+    def test_collapsed_stacks_name_the_running_function(self):
+        with profiling.Sampler(threading.get_ident(), 0.001) as sampler:
+            _busy(0.05)
+        self.assertGreater(sum(sampler.stacks.values()), 0)
+        for line in sampler.collapsed().splitlines():
+            stack, _, count = line.rpartition(" ")
+            self.assertTrue(count.isdigit())
+        self.assertIn("api.tests.test_profiling:_busy", sampler.collapsed())
+
+
+class ProfilingMiddlewareTestCase(TestCase):
+    url = reverse_lazy("admin:api_bird_changelist")
+
+    @classmethod
+    def setUpTestData(cls):
+        Bird.objects.create(genus="Falco", species="subbuteo", english_name="Hobby")
+        cls.staff = User.objects.create(
+            username="staff", is_staff=True, is_superuser=True
+        )
+
+    def test_staff_request_with_flag_is_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {"_profile": "1"})
+        self.assertEqual(response.status_code, 200)
+
+        profile = RequestProfile.objects.get()
+        self.assertEqual(
+            response["X-Profile"],
+            reverse("admin:api_requestprofile_change", args=[profile.pk]),
+        )
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual(profile.status_code, 200)
+        self.assertTrue(profile.path.startswith(str(self.url)))
+        self.assertEqual(profile.query_count, len(profile.queries))
+        self.assertTrue(any("api_bird" in query["sql"] for query in profile.queries))
+        starts = [query["start_ms"] for query in profile.queries]
+        self.assertEqual(starts, sorted(starts))
+
+    def test_streaming_response_is_profiled_until_sent(self):
+        """Queries run while the body streams are part of the profile."""
+        cache.get_backend().clear()
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("bird-list"), {"_profile": "1"})
+        self.assertTrue(response.streaming)
+        b"".join(response.streaming_content)
+        response.close()
+
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.query_count, len(profile.queries))
+        self.assertTrue(
+            any('FROM "api_bird"' in query["sql"] for query in profile.queries)
+        )
+
+    def test_header_also_enables_profiling(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, HTTP_X_PROFILE="1")
+        self.assertIn("X-Profile", response)
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_requests_without_flag_or_from_non_staff_are_not_profiled(self):
+        self.client.force_login(self.staff)
+        self.assertNotIn("X-Profile", self.client.get(self.url))
+
+        api_url = reverse("health-check")
+        self.client.force_login(User.objects.create(username="visitor"))
+        self.assertNotIn("X-Profile", self.client.get(api_url, {"_profile": "1"}))
+        self.client.logout()
+        self.assertNotIn("X-Profile", self.client.get(api_url, {"_profile": "1"}))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(API_PROFILING={**profiling.DEFAULT_SETTINGS, "KEEP": 2})
+    def test_only_newest_profiles_are_kept(self):
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.client.get(self.url, {"_profile": "1"})
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    @override_settings(API_PROFILING={"ENABLED": False})
+    def test_disabled_middleware_is_unused(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+
+
+class RequestProfileAdminTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        )
+        self.client.get(reverse("admin:api_bird_changelist"), {"_profile": "1"})
+        self.profile = RequestProfile.objects.get()
+
+    def test_profile_pages_show_sql_timeline(self):
+        response = self.client.get(reverse("admin:api_requestprofile_changelist"))
+        self.assertContains(response, self.profile.path)
+
+        response = self.client.get(
+            reverse("admin:api_requestprofile_change", args=[self.profile.pk])
+        )
+        self.assertContains(response, "SQL timeline")
+        self.assertContains(response, "api_bird")
+
+    def test_changelist_fetches_users_with_profiles(self):
+        for number in range(10):
+            self.profile.pk = None
+            self.profile.user = User.objects.create(username=f"staff{number}")
+            self.profile.save()
+        with self.assertQueryBudget(max_repeats=2):
+            response = self.client.get(reverse("admin:api_requestprofile_changelist"))
+        self.assertContains(response, "staff9")
+
+    def test_stacks_download(self):
+        response = self.client.get(
+            reverse("admin:api_requestprofile_stacks", args=[self.profile.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertEqual(response.content.decode(), self.profile.stacks)
@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from api import querybudget
+from api.middleware import QueryBudgetMiddleware
+from api.models import Bird
+
+
+class QueryShapeTestCase(SimpleTestCase):
+    def test_literals_and_value_lists_are_normalized(self):
+        self.assertEqual(
+            querybudget.query_shape(
+                'SELECT "api_bird"."id" FROM "api_bird"\n'
+                'WHERE "api_bird"."genus" = \'Falco\' AND "api_bird"."id" > 12 '
+                "LIMIT 21"
+            ),
+            'SELECT "api_bird"."id" FROM "api_bird" '
+            'WHERE "api_bird"."genus" = ? AND "api_bird"."id" > ? LIMIT ?',
+        )
+        self.assertEqual(
+            querybudget.query_shape("SELECT 1 FROM t2 WHERE id IN (%s, %s, %s)"),
+            querybudget.query_shape("SELECT 1 FROM t2 WHERE id IN (%s)"),
+        )
+        self.assertEqual(
+            querybudget.query_shape("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+            "INSERT INTO t (a, b) VALUES (...)",
+        )
+
+    def test_problems(self):
+        log = querybudget.QueryLog()
+        log.shapes.update({"SELECT a WHERE id = ?": 6, "SELECT b": 2})
+        self.assertEqual(log.count, 8)
+        self.assertEqual(log.problems(), [])
+        self.assertEqual(log.problems(max_queries=8, max_repeats=6), [])
+        problems = log.problems(max_queries=7, max_repeats=1)
+        self.assertEqual(len(problems), 3)
+        self.assertEqual(problems[0], "8 queries, budget 7")
+        self.assertIn("6 queries of one shape", problems[1])
+        self.assertTrue(problems[1].endswith("SELECT a WHERE id = ?"))
+
+    def test_view_budget(self):
+        @querybudget.query_budget(max_repeats=1)
+        def view(request):
+            pass
+
+        options = {
+            **querybudget.DEFAULT_SETTINGS,
+            "MAX_QUERIES": 20,
+            "ROUTES": {"birds": {"MAX_QUERIES": 5, "MAX_REPEATS": 3}},
+        }
+        match = SimpleNamespace(view_name="birds", func=view)
+        self.assertEqual(querybudget.view_budget(match, options), (5, 1))
+        match = SimpleNamespace(view_name="other", func=lambda request: None)
+        self.assertEqual(querybudget.view_budget(match, options), (20, 5))
+        self.assertEqual(querybudget.view_budget(None, options), (20, 5))
+
+
+class QueryBudgetMiddlewareTestCase(querybudget.QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create(
+            username="admin", is_staff=True, is_superuser=True
+        )
+        Bird.objects.create(genus="Falco", species="subbuteo", english_name="Hobby")
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+        self.url = reverse("admin:api_bird_changelist")
+
+    def _budget(self, **options):
+        return override_settings(
+            QUERY_BUDGET={**querybudget.DEFAULT_SETTINGS, "ENABLED": True, **options}
+        )
+
+    def test_over_budget_requests_raise(self):
+        with self._budget(MODE="raise", MAX_QUERIES=2):
+            with self.assertRaisesMessage(
+                querybudget.QueryBudgetExceeded, "/admin/api/bird/ is over its"
+            ):
+                self.client.get(self.url)
+
+    def test_over_budget_requests_are_logged(self):
+        with self._budget(
+            MODE="warn", ROUTES={"admin:api_bird_changelist": {"MAX_REPEATS": 0}}
+        ), self.assertLogs("api.querybudget", "WARNING") as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("possible N+1", logs.output[0])
+
+    def test_disabled_middleware_is_unused(self):
+        with self._budget(ENABLED=False), self.assertRaises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(lambda request: None)
+
+    def test_assert_query_budget(self):
+        with self.assertQueryBudget(max_queries=1) as log:
+            Bird.objects.count()
+        self.assertEqual(log.count, 1)
+        with self.assertRaisesMessage(AssertionError, "possible N+1"):
+            with self.assertQueryBudget(max_repeats=2):
+                for _ in range(3):
+                    Bird.objects.filter(pk=1).exists()
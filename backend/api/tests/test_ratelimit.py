@@ -0,0 +1,131 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api import ratelimit
+
+
+class MmapBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, "buckets")
+
+    def test_bucket_empties_and_refills(self):
+        backend = ratelimit.MmapBackend(self.location, slots=64)
+        for _ in range(3):
+            self.assertEqual(backend.hit("a", 3, 60, now=1000), 0)
+        self.assertAlmostEqual(backend.hit("a", 3, 60, now=1000), 20)
+        self.assertEqual(backend.hit("b", 3, 60, now=1000), 0)
+
+        self.assertAlmostEqual(backend.hit("a", 3, 60, now=1010), 10)
+        self.assertEqual(backend.hit("a", 3, 60, now=1020), 0)
+
+    def test_buckets_are_shared_through_the_file(self):
+        """Backends mapping the same file, as in separate workers, share buckets."""
+        first = ratelimit.MmapBackend(self.location, slots=64)
+        second = ratelimit.MmapBackend(self.location, slots=64)
+        self.assertEqual(first.hit("a", 1, 60, now=1000), 0)
+        self.assertGreater(second.hit("a", 1, 60, now=1000), 0)
+
+        second.clear()
+        self.assertEqual(first.hit("a", 1, 60, now=1000), 0)
+
+    def test_full_group_replaces_least_recent_bucket(self):
+        backend = ratelimit.MmapBackend(self.location, slots=8)
+        for index in range(8):
+            backend.hit(f"key{index}", 1, 3600, now=1000 + index)
+        backend.hit("new", 1, 3600, now=1010)
+
+        # key0 lost its (empty) bucket, key7 kept it
+        self.assertEqual(backend.hit("key0", 1, 3600, now=1010), 0)
+        self.assertGreater(backend.hit("key7", 1, 3600, now=1010), 0)
+
+
+class DjangoCacheBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        default_cache.clear()
+
+    def test_counts_fixed_windows(self):
+        backend = ratelimit.DjangoCacheBackend()
+        self.assertEqual(backend.hit("a", 2, 60, now=1200), 0)
+        self.assertEqual(backend.hit("a", 2, 60, now=1210), 0)
+        self.assertEqual(backend.hit("a", 2, 60, now=1230), 30)
+        self.assertEqual(backend.hit("a", 2, 60, now=1260), 0)
+
+
+class RateLimitMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            API_RATE_LIMIT={
+                "ENABLED": True,
+                "LOCATION": os.path.join(directory.name, "buckets"),
+                "SLOTS": 64,
+                "DEFAULT": "1/m",
+                "ROUTES": {"health-check": "2/m", "sighting-list": None},
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_limits_per_route_with_retry_after(self):
+        """Each route has its own bucket; exhausted buckets answer 429."""
+        url = reverse("health-check")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(response.json(), {"errors": ["Rate limit exceeded"]})
+
+        # Clients are limited separately
+        response = self.client.get(url, REMOTE_ADDR="192.0.2.1")
+        self.assertEqual(response.status_code, 200)
+
+    def test_unlimited_routes_and_other_paths_pass(self):
+        """Routes limited to None and paths outside /api/ are never limited."""
+        url = reverse("sighting-list")
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 400)
+            self.assertNotEqual(self.client.get("/admin/login/").status_code, 429)
+
+    def test_forwarded_for_uses_address_appended_by_trusted_proxy(self):
+        """Spoofed X-Forwarded-For entries don't give clients a fresh bucket."""
+        url = reverse("health-check")
+        with override_settings(
+            API_RATE_LIMIT={
+                **settings.API_RATE_LIMIT,
+                "CLIENT_IP_HEADER": "HTTP_X_FORWARDED_FOR",
+            }
+        ):
+            for spoofed in ("198.51.100.1", "198.51.100.2"):
+                response = self.client.get(
+                    url, HTTP_X_FORWARDED_FOR=f"{spoofed}, 203.0.113.7"
+                )
+                self.assertEqual(response.status_code, 200)
+            response = self.client.get(url, HTTP_X_FORWARDED_FOR="203.0.113.7")
+            self.assertEqual(response.status_code, 429)
+
+        options = {
+            **ratelimit.DEFAULT_SETTINGS,
+            "CLIENT_IP_HEADER": "HTTP_X_FORWARDED_FOR",
+        }
+        request = RequestFactory().get(
+            "/", HTTP_X_FORWARDED_FOR="198.51.100.1, 203.0.113.7, 10.0.0.2"
+        )
+        self.assertEqual(ratelimit.client_address(request, options), "10.0.0.2")
+        options["TRUSTED_PROXIES"] = 2
+        self.assertEqual(ratelimit.client_address(request, options), "203.0.113.7")
+        options["TRUSTED_PROXIES"] = 4
+        self.assertEqual(ratelimit.client_address(request, options), "127.0.0.1")
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate("10 per minute")
@@ -0,0 +1,92 @@
+import datetime
+import gzip
+import json
+import unittest
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api import responses
+
+
+class EncoderTestCase(SimpleTestCase):
+
+    def test_stdlib_encoder_is_compact(self):
+        encoder = responses.get_encoder("stdlib")
+        self.assertEqual(encoder.dumps({"a": [1, "é"]}), '{"a":[1,"é"]}'.encode())
+
+    def test_stdlib_encoder_handles_django_types(self):
+        encoder = responses.get_encoder("stdlib")
+        self.assertEqual(encoder.dumps([datetime.date(2025, 1, 2)]), b'["2025-01-02"]')
+
+    @unittest.skipIf(responses.orjson is None, "orjson is not installed")
+    def test_orjson_matches_stdlib(self):
+        data = {"data": [(1, "Falco", None), (2, "Ptéruthius", "tahanensis")]}
+        self.assertEqual(
+            responses.get_encoder("orjson").dumps(data),
+            responses.get_encoder("stdlib").dumps(data),
+        )
+
+    @override_settings(API_JSON_ENCODER="stdlib")
+    def test_encoder_is_configurable(self):
+        self.assertIsInstance(responses.get_encoder(), responses.StdlibEncoder)
+
+    def test_fast_json_response(self):
+        response = responses.FastJsonResponse({"status": "ok"})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), {"status": "ok"})
+
+
+class RowStreamingTestCase(SimpleTestCase):
+    fields = ("id", "genus", "species")
+    rows = [(i, "Falco", f"species{i}") for i in range(25)]
+
+    def test_rows_stream_as_valid_json(self):
+        for chunk_size in (1, 7, 25, 100):
+            response = responses.JsonRowStreamingResponse(
+                iter(self.rows), self.fields, chunk_size=chunk_size
+            )
+            body = json.loads(b"".join(response.streaming_content))
+            self.assertEqual(body["meta"], {"fields": list(self.fields)})
+            self.assertEqual([tuple(row) for row in body["data"]], self.rows)
+
+    def test_empty_rows(self):
+        response = responses.JsonRowStreamingResponse(iter([]), self.fields)
+        body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(body["data"], [])
+
+    def test_gzip_compressed_stream(self):
+        response = responses.JsonRowStreamingResponse(
+            iter(self.rows), self.fields, chunk_size=5, compress="gzip"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        body = json.loads(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(len(body["data"]), 25)
+
+    @unittest.skipIf(responses.brotli is None, "brotli is not installed")
+    def test_brotli_compressed_stream(self):
+        response = responses.JsonRowStreamingResponse(
+            iter(self.rows), self.fields, chunk_size=5, compress="br"
+        )
+        compressed = b"".join(response.streaming_content)
+        body = json.loads(responses.brotli.decompress(compressed))
+        self.assertEqual(len(body["data"]), 25)
+
+
+class NegotiateEncodingTestCase(SimpleTestCase):
+    def _negotiate(self, accept_encoding):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return responses.negotiate_encoding(request)
+
+    def test_no_accept_encoding(self):
+        self.assertIsNone(self._negotiate(""))
+
+    def test_gzip(self):
+        self.assertEqual(self._negotiate("gzip, deflate"), "gzip")
+
+    def test_rejected_encoding_is_skipped(self):
+        self.assertIsNone(self._negotiate("gzip;q=0, identity"))
+
+    @unittest.skipIf(responses.brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        self.assertEqual(self._negotiate("gzip, br"), "br")
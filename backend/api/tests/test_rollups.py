@@ -0,0 +1,187 @@
+import datetime
+import json
+from unittest import mock
+
+from django.core.cache import cache as default_cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from api import cache, rollups
+from api.ingest import ingest_recordings
+from api.models import Bird, Sighting, SpeciesCellRollup
+
+TODAY = datetime.date(2025, 6, 15)
+# Brandenburg Gate and Potsdam, roughly 27 km apart
+BERLIN = (52.5163, 13.3777)
+POTSDAM = (52.3906, 13.0645)
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        cache.get_backend().clear()
+        default_cache.clear()
+        self.hobby = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+        self.kite = Bird.objects.create(
+            genus="Milvus", species="milvus", english_name="Red Kite"
+        )
+
+    def _sight(self, bird, location=BERLIN, observed_on=TODAY):
+        return Sighting.objects.create(
+            bird=bird,
+            latitude=location[0],
+            longitude=location[1],
+            observed_on=observed_on,
+        )
+
+    def _counts(self):
+        return {
+            (rollup.cell, rollup.bird_id, rollup.month): rollup.count
+            for rollup in SpeciesCellRollup.objects.all()
+        }
+
+    def test_sighting_writes_update_counts(self):
+        """Creating and deleting sightings adjusts their rollup incrementally."""
+        first = self._sight(self.hobby)
+        self._sight(self.hobby)
+        cell, month = rollups.rollup_key(*BERLIN, TODAY)
+        self.assertEqual(self._counts(), {(cell, self.hobby.id, month): 2})
+
+        first.delete()
+        self.assertEqual(self._counts(), {(cell, self.hobby.id, month): 1})
+        Sighting.objects.get().delete()
+        self.assertEqual(self._counts(), {})
+
+    def test_deleting_a_bird_skips_per_sighting_updates(self):
+        """Cascaded sightings are deleted as a set, with their bird's rollups."""
+        for _ in range(20):
+            self._sight(self.hobby)
+        self._sight(self.kite)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(4):
+                self.hobby.delete()
+        self.assertEqual(list(self._counts().values()), [1])
+        self.assertEqual(Sighting.objects.get().bird, self.kite)
+
+    def test_concurrently_created_rollup_is_incremented(self):
+        """A row inserted by another transaction after the lookup is retried."""
+        self._sight(self.hobby)
+        cell, month = rollups.rollup_key(*BERLIN, TODAY)
+        locked = rollups._locked_rollups
+        lookups = []
+
+        def lookup(counts):
+            # The first lookup misses the row, as if another transaction had
+            # created it just after
+            lookups.append(counts)
+            return {} if len(lookups) == 1 else locked(counts)
+
+        with mock.patch.object(rollups, "_locked_rollups", side_effect=lookup):
+            self._sight(self.hobby)
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(self._counts(), {(cell, self.hobby.id, month): 2})
+
+    def test_rebuild_matches_incremental_counts(self):
+        """A full rebuild reproduces the incrementally maintained rollups."""
+        self._sight(self.hobby)
+        self._sight(self.hobby, POTSDAM)
+        self._sight(self.kite, observed_on=datetime.date(2025, 1, 3))
+        incremental = self._counts()
+
+        SpeciesCellRollup.objects.all().delete()
+        call_command("rebuild_species_rollups", stdout=open("/dev/null", "w"))
+        self.assertEqual(self._counts(), incremental)
+
+    def test_ingest_counts_bulk_created_sightings(self):
+        """Recordings ingested in bulk are counted although signals don't fire."""
+        created = ingest_recordings(
+            [
+                {
+                    "id": "1",
+                    "gen": "Falco",
+                    "sp": "subbuteo",
+                    "lat": "52.5163",
+                    "lng": "13.3777",
+                    "date": "2025-06-01",
+                },
+                {
+                    "id": "2",
+                    "gen": "Milvus",
+                    "sp": "milvus",
+                    "lat": "52.5163",
+                    "lng": "13.3777",
+                    "date": "2025-06-02",
+                },
+                {
+                    "id": "3",
+                    "gen": "Unknown",
+                    "sp": "bird",
+                    "lat": "1",
+                    "lng": "1",
+                    "date": "2025-06-02",
+                },
+                {
+                    "id": "4",
+                    "gen": "Falco",
+                    "sp": "subbuteo",
+                    "lat": "",
+                    "lng": "",
+                    "date": "2025-06-02",
+                },
+            ]
+        )
+
+        self.assertEqual(created, 2)
+        self.assertEqual(Sighting.objects.get(bird=self.hobby).recording_id, "XC1")
+        self.assertEqual(sum(self._counts().values()), 2)
+
+    def test_ranks_species_within_radius_and_window(self):
+        """Birds are ranked by sightings in range and in the month window."""
+        self._sight(self.kite)
+        self._sight(self.hobby)
+        self._sight(self.hobby)
+        self._sight(self.kite, POTSDAM)
+        self._sight(self.kite, observed_on=datetime.date(2023, 1, 1))
+
+        ranked = rollups.species_near(52.52, 13.40, 10, today=TODAY)
+        self.assertEqual(
+            ranked,
+            [(self.hobby.id, "Eurasian Hobby", 2), (self.kite.id, "Red Kite", 1)],
+        )
+        ranked = rollups.species_near(52.52, 13.40, 10, months=36, today=TODAY)
+        self.assertIn((self.kite.id, "Red Kite", 2), ranked)
+
+    def test_small_radius_includes_the_cell_of_the_query_point(self):
+        """A radius smaller than a rollup cell still counts sightings right here."""
+        self._sight(self.hobby, (50.0, 12.0))
+        ranked = rollups.species_near(50.0, 12.0, 1, today=TODAY)
+        self.assertEqual(ranked, [(self.hobby.id, "Eurasian Hobby", 1)])
+
+    def test_new_sightings_invalidate_cached_rankings(self):
+        """Cached rollup cells are dropped when a sighting lands in them."""
+        self._sight(self.hobby)
+        rollups.species_near(52.52, 13.40, 10, today=TODAY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._sight(self.kite)
+            self._sight(self.kite)
+
+        ranked = rollups.species_near(52.52, 13.40, 10, today=TODAY)
+        self.assertEqual(ranked[0], (self.kite.id, "Red Kite", 2))
+
+    def test_endpoint(self):
+        """The endpoint returns ranked rows and validates its parameters."""
+        self._sight(self.hobby, observed_on=datetime.date.today())
+        response = self.client.get(
+            reverse("species-nearby"), {"lat": 52.52, "lng": 13.40, "radius": 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body["meta"]["fields"], ["bird_id", "english_name", "count"])
+        self.assertEqual(body["data"], [[self.hobby.id, "Eurasian Hobby", 1]])
+
+        response = self.client.get(
+            reverse("species-nearby"), {"lat": 52.52, "lng": 13.40, "months": 0}
+        )
+        self.assertEqual(response.status_code, 400)
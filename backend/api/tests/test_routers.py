@@ -0,0 +1,140 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api import cache, routers, snapshots, suggest, taxonomy
+from api.middleware import STICKY_COOKIE, ReplicaStickinessMiddleware
+from api.models import Bird
+
+REPLICAS = {"ALIASES": ["replica"], "MAX_LAG": 5, "CHECK_INTERVAL": 60}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        routers.start_context()
+        routers.health.reset()
+        patcher = mock.patch.object(routers.health, "check", return_value=0.0)
+        self.check = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(routers.health.reset)
+        self.addCleanup(routers.start_context)
+
+    def test_api_reads_go_to_replica(self):
+        """Reads of api models use the replica, other apps stay on default."""
+        self.assertEqual(Bird.objects.all().db, "replica")
+        self.assertEqual(User.objects.all().db, "default")
+
+    def test_write_pins_reads_to_primary(self):
+        """After a write, the same context reads its own writes from default."""
+        self.assertEqual(Bird.objects.all().db, "replica")
+        routers.ReplicaRouter().db_for_write(Bird)
+
+        self.assertTrue(routers.has_written())
+        self.assertEqual(Bird.objects.all().db, "default")
+        routers.start_context()
+        self.assertEqual(Bird.objects.all().db, "replica")
+
+    def test_lagging_replica_fails_over_to_primary(self):
+        """A replica lagging more than MAX_LAG seconds is skipped."""
+        self.check.return_value = 30.0
+        with self.assertLogs("api.routers", "WARNING"):
+            self.assertEqual(Bird.objects.all().db, "default")
+
+    def test_unreachable_replica_fails_over_to_primary(self):
+        """A replica that cannot be queried is skipped until the next check."""
+        self.check.side_effect = OperationalError("connection refused")
+        with self.assertLogs("api.routers", "WARNING"):
+            self.assertEqual(Bird.objects.all().db, "default")
+
+        self.check.side_effect = None
+        self.assertEqual(Bird.objects.all().db, "default")
+        with override_settings(DATABASE_REPLICAS={**REPLICAS, "CHECK_INTERVAL": 0}):
+            self.assertEqual(Bird.objects.all().db, "replica")
+
+    def test_health_checks_are_cached(self):
+        """Each replica is checked at most once per CHECK_INTERVAL."""
+        for _ in range(5):
+            Bird.objects.all().db
+        self.assertEqual(self.check.call_count, 1)
+
+    def test_sticky_cookie_set_after_write(self):
+        """A writing request sets the sticky cookie, which pins later reads."""
+        factory = RequestFactory()
+
+        def write(request):
+            routers.ReplicaRouter().db_for_write(Bird)
+            return HttpResponse()
+
+        response = ReplicaStickinessMiddleware(write)(factory.post("/api/"))
+        self.assertEqual(response.cookies[STICKY_COOKIE]["max-age"], 10)
+
+        databases = []
+
+        def read(request):
+            databases.append(Bird.objects.all().db)
+            return HttpResponse()
+
+        request = factory.get("/api/")
+        response = ReplicaStickinessMiddleware(read)(request)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        request.COOKIES[STICKY_COOKIE] = "1"
+        ReplicaStickinessMiddleware(read)(request)
+        self.assertEqual(databases, ["replica", "default"])
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaQueryTestCase(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        routers.start_context()
+        routers.health.reset()
+        self.addCleanup(routers.start_context)
+
+    def test_reads_are_served_by_replica_alias(self):
+        """Queries run on the replica connection, here a mirror of default."""
+        Bird.objects.create(genus="Falco", species="subbuteo", english_name="Hobby")
+        self.assertEqual(Bird.objects.all().db, "default")
+
+        routers.start_context()
+        bird = Bird.objects.get()
+        self.assertEqual(bird._state.db, "replica")
+        self.assertEqual(bird.english_name, "Hobby")
+
+    def test_cached_response_is_built_from_primary(self):
+        """A cache miss is stored under the current catalogue version, which a
+        lagging replica's rows may predate. The client doesn't become sticky."""
+        cache.get_backend().clear()
+        Bird.objects.create(genus="Falco", species="subbuteo", english_name="Hobby")
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = self.client.get(reverse("bird-list"))
+            content = b"".join(response.streaming_content)
+
+        self.assertIn(b"Hobby", content)
+        self.assertFalse(replica_queries.captured_queries)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_versioned_rebuilds_use_primary(self):
+        """Data stamped with the catalogue version is read from the primary,
+        and rebuilding the taxonomy doesn't count as the client writing."""
+        Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Hobby", family="Falconidae"
+        )
+        routers.start_context()
+        with tempfile.TemporaryDirectory() as directory:
+            with CaptureQueriesContext(connections["replica"]) as replica_queries:
+                taxonomy.rebuild_tree()
+                suggest.get_index()
+                snapshots.build_snapshot(directory)
+
+        self.assertFalse(replica_queries.captured_queries)
+        self.assertFalse(routers.has_written())
+        self.assertFalse(routers.is_pinned())
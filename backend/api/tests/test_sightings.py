@@ -0,0 +1,127 @@
+import datetime
+import json
+
+from django.core.cache import cache as default_cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from api import cache, sightings
+from api.models import Bird, Sighting
+
+
+class NearbySightingsTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.get_backend().clear()
+        default_cache.clear()
+        self.loaded = []
+
+    def _loader(self, cells):
+        self.loaded.extend(cells)
+        # One sighting at the Brandenburg Gate, one in Potsdam (~27 km away)
+        rows = [
+            (1, 1, "Eurasian Hobby", 52.5163, 13.3777, None, None),
+            (2, 1, "Eurasian Hobby", 52.3906, 13.0645, None, None),
+        ]
+        return {
+            cell: [
+                row
+                for row in rows
+                if sightings.geohash.encode(row[3], row[4]).startswith(cell)
+            ]
+            for cell in cells
+        }
+
+    def test_trims_to_exact_radius_and_sorts_by_distance(self):
+        _, rows = sightings.nearby_sightings(52.52, 13.40, 10, loader=self._loader)
+        self.assertEqual([row[0] for row in rows], [1])
+
+        _, rows = sightings.nearby_sightings(52.52, 13.40, 50, loader=self._loader)
+        self.assertEqual([row[0] for row in rows], [1, 2])
+        self.assertLess(rows[0][-1], rows[1][-1])
+
+    def test_nearby_users_share_cached_cells(self):
+        first_cell, _ = sightings.nearby_sightings(
+            52.52, 13.40, 50, loader=self._loader
+        )
+        loads = len(self.loaded)
+        second_cell, _ = sightings.nearby_sightings(
+            52.51, 13.41, 50, loader=self._loader
+        )
+
+        self.assertEqual(first_cell, second_cell)
+        self.assertEqual(len(self.loaded), loads)
+
+    def test_hit_ratio_is_reported(self):
+        cache.stats.reset()
+        sightings.nearby_sightings(52.52, 13.40, 50, loader=self._loader)
+        sightings.nearby_sightings(52.52, 13.40, 50, loader=self._loader)
+        report = cache.stats.report()[sightings.CELL_STATS_NAME]
+        self.assertEqual(report["hit_rate"], 0.5)
+
+
+class SightingEndpointTestCase(TestCase):
+    def setUp(self):
+        cache.get_backend().clear()
+        default_cache.clear()
+        self.bird = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Eurasian Hobby"
+        )
+        Sighting.objects.create(
+            bird=self.bird,
+            latitude=52.5163,
+            longitude=13.3777,
+            observed_on=datetime.date(2025, 6, 1),
+            recording_id="XC123",
+        )
+
+    def _get(self, **params):
+        response = self.client.get(reverse("sighting-list"), params)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_returns_sightings_within_radius(self):
+        body = self._get(lat=52.52, lng=13.40)
+        self.assertEqual(body["meta"]["fields"], list(sightings.RESPONSE_FIELDS))
+        self.assertEqual(len(body["data"]), 1)
+        self.assertEqual(body["data"][0][2], "Eurasian Hobby")
+        self.assertEqual(body["data"][0][5], "2025-06-01")
+
+    def test_new_sighting_is_visible_immediately(self):
+        self._get(lat=52.52, lng=13.40)
+        with self.captureOnCommitCallbacks(execute=True):
+            Sighting.objects.create(
+                bird=self.bird,
+                latitude=52.53,
+                longitude=13.41,
+                observed_on=datetime.date(2025, 6, 2),
+            )
+        self.assertEqual(len(self._get(lat=52.52, lng=13.40)["data"]), 2)
+
+    def test_new_sighting_elsewhere_keeps_cells_cached(self):
+        self._get(lat=52.52, lng=13.40)
+        Sighting.objects.create(
+            bird=self.bird,
+            latitude=-33.86,
+            longitude=151.21,
+            observed_on=datetime.date(2025, 6, 2),
+        )
+        with self.assertNumQueries(0):
+            self._get(lat=52.52, lng=13.40)
+
+    def test_missing_cells_are_loaded_in_one_query(self):
+        with self.assertNumQueries(1):
+            self._get(lat=52.52, lng=13.40)
+
+    def test_sighting_geohash_is_derived_on_save(self):
+        sighting = Sighting.objects.get()
+        self.assertEqual(sighting.geohash, sightings.geohash.encode(52.5163, 13.3777))
+
+    def test_invalid_parameters(self):
+        for params in (
+            {},
+            {"lat": "x", "lng": 1},
+            {"lat": 91, "lng": 0},
+            {"lat": 0, "lng": 0, "radius": 5000},
+        ):
+            response = self.client.get(reverse("sighting-list"), params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("errors", response.json())
@@ -0,0 +1,167 @@
+import datetime
+import io
+import os
+import tempfile
+import unittest
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import audio, similarity
+from api.models import Bird, Sighting
+
+from .test_thumbnails import RATE, tone, write_wav
+
+np = audio.np
+
+
+def chirps(frequencies, seconds=0.5):
+    """A recording of tones played one after another."""
+    return np.concatenate([tone(frequency, seconds) for frequency in frequencies])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class SimilarityTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.audio_dir = os.path.join(directory.name, "audio")
+        os.makedirs(self.audio_dir)
+        settings = override_settings(
+            RECORDING_AUDIO={"DIR": self.audio_dir},
+            SIMILARITY={"DIR": os.path.join(directory.name, "index"), "BATCH_SIZE": 2},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _write(self, recording_id, frequencies):
+        write_wav(
+            os.path.join(self.audio_dir, f"{recording_id}.wav"), chirps(frequencies)
+        )
+
+    def test_feature_vectors_are_unit_length(self):
+        options = {**similarity.get_similarity_settings(), "N_MELS": 16}
+        vector = similarity.feature_vector(chirps([2000, 4000]), RATE, options)
+        self.assertEqual(vector.shape, (32,))
+        self.assertEqual(vector.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1, places=5)
+
+    def test_mel_filters_cover_the_frequency_range(self):
+        filters = similarity.mel_filterbank(RATE, 1024, 8, 500, 12000)
+        self.assertEqual(filters.shape, (8, 513))
+        frequencies = np.fft.rfftfreq(1024, 1 / RATE)
+        covered = filters.sum(axis=0) > 0
+        self.assertTrue(covered[(frequencies > 600) & (frequencies < 11500)].all())
+        self.assertFalse(covered[frequencies < 500].any())
+
+    def test_index_appends_and_readers_see_new_rows(self):
+        index = similarity.get_index()
+        self.assertEqual(len(index.load()[0]), 0)
+        dimensions = index.dimensions
+        vectors = np.eye(3, dimensions, dtype=np.float32)
+        self.assertEqual(index.append(["1", "2"], vectors[:2]), 2)
+        ids, matrix = index.load()
+        self.assertEqual(ids.tolist(), [1, 2])
+        self.assertIsInstance(matrix, np.memmap)
+
+        # Another process appending, seen through a separate index object
+        writer = similarity.FeatureIndex(index.directory, dimensions)
+        self.assertEqual(writer.append(["2", "3"], vectors[1:]), 1)
+        ids, matrix = index.load()
+        self.assertEqual(ids.tolist(), [1, 2, 3])
+        np.testing.assert_array_equal(matrix, vectors)
+
+        with self.assertRaises(similarity.IndexMismatch):
+            similarity.FeatureIndex(index.directory, dimensions + 1).load()
+
+    def test_similar_ranks_by_cosine(self):
+        index = similarity.get_index()
+        query = np.zeros(index.dimensions, np.float32)
+        query[0] = 1
+        close = query.copy()
+        close[1] = 0.2
+        far = np.zeros(index.dimensions, np.float32)
+        far[2] = 1
+        index.append(["1", "2", "3"], [query, far, close / np.linalg.norm(close)])
+
+        matches = index.similar("1", 5, chunk_rows=2)
+        self.assertEqual([match_id for match_id, _ in matches], ["3", "2"])
+        self.assertAlmostEqual(matches[0][1], 1 / np.linalg.norm(close), places=5)
+        self.assertEqual(index.similar("1", 1), matches[:1])
+        self.assertIsNone(index.similar("9", 5))
+
+    def test_index_recordings_finds_similar_calls(self):
+        self._write("1", [3000, 5000, 3000])
+        self._write("2", [3100, 5100, 3100])
+        self._write("3", [800, 1000, 800])
+        self._write("4", [9000, 10000, 9000])
+
+        indexed, errors = similarity.index_recordings(processes=2)
+        self.assertEqual((indexed, errors), (4, {}))
+        self.assertEqual(similarity.get_index().similar("1", 1)[0][0], "2")
+
+        self._write("5", [3000, 5000, 3000])
+        indexed, errors = similarity.index_recordings(["1", "5", "6"])
+        self.assertEqual(indexed, 1)
+        self.assertEqual(errors, {"6": "audio not cached"})
+        self.assertEqual(similarity.get_index().similar("1", 1)[0][0], "5")
+
+    def test_similar_endpoint(self):
+        bird = Bird.objects.create(
+            genus="Falco", species="subbuteo", english_name="Hobby"
+        )
+        Sighting.objects.create(
+            bird=bird,
+            latitude=52,
+            longitude=13,
+            observed_on=datetime.date(2024, 5, 1),
+            recording_id="XC2",
+        )
+        self._write("1", [3000, 5000])
+        self._write("2", [3100, 5100])
+        self._write("3", [800, 1000])
+        similarity.index_recordings()
+
+        response = self.client.get(
+            reverse("recording-similar", args=["XC1"]), {"limit": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            body["meta"]["fields"], ["recording_id", "score", "bird_id", "english_name"]
+        )
+        self.assertEqual(len(body["data"]), 1)
+        self.assertEqual(body["data"][0][0], "2")
+        self.assertEqual(body["data"][0][2:], [bird.id, "Hobby"])
+
+        response = self.client.get(reverse("recording-similar", args=["1"]))
+        self.assertEqual(response.json()["data"][1][2:], [None, None])
+        response = self.client.get(reverse("recording-similar", args=["9"]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse("recording-similar", args=["1"]), {"limit": "x"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_similar_endpoint_rejects_non_ascii_digits(self):
+        """``"²".isdigit()`` is true, but it isn't a recording id."""
+        response = self.client.get(reverse("recording-similar", args=["²"]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_similar_endpoint_with_outdated_index(self):
+        self._write("1", [3000, 5000])
+        similarity.index_recordings()
+        options = similarity.get_similarity_settings()
+        with override_settings(SIMILARITY={**options, "N_MELS": options["N_MELS"] + 1}):
+            response = self.client.get(reverse("recording-similar", args=["1"]))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("rebuild index", response.json()["errors"][0])
+
+    def test_index_recordings_command(self):
+        self._write("1", [3000])
+        out = io.StringIO()
+        call_command("index_recordings", "--processes", "1", stdout=out)
+        self.assertIn("Indexed 1 recordings", out.getvalue())
+        call_command("index_recordings", "--rebuild", stdout=out)
+        self.assertIn("Indexed 1 recordings", out.getvalue().splitlines()[-1])
@@ -0,0 +1,182 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache as default_cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api import snapshots
+from api.models import Bird
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        override = override_settings(CATALOGUE_SNAPSHOT_DIR=self.tmpdir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.hobby = Bird.objects.create(
+            genus="Falco",
+            species="subbuteo",
+            english_name="Eurasian Hobby",
+            family="Falconidae",
+        )
+        self.merlin = Bird.objects.create(
+            genus="Falco",
+            species="columbarius",
+            subspecies="suckleyi",
+            english_name="Merlin",
+            family="Falconidae",
+        )
+        self.lyrebird = Bird.objects.create(
+            genus="Menura",
+            species="novaehollandiae",
+            english_name="Superb Lyrebird",
+        )
+
+    def _db_rows(self):
+        return list(Bird.objects.order_by("id").values_list(*snapshots.FIELDS))
+
+    def test_snapshot_round_trips_catalogue(self):
+        digest = snapshots.build_snapshot()
+        header, columns = snapshots.read_snapshot(snapshots.snapshot_path(digest))
+
+        self.assertEqual(header["kind"], "full")
+        self.assertEqual(header["rows"], 3)
+        self.assertEqual(snapshots.snapshot_rows(columns), self._db_rows())
+
+    def test_repeated_strings_are_stored_once(self):
+        digest = snapshots.build_snapshot()
+        header, _ = snapshots.read_snapshot(snapshots.snapshot_path(digest))
+        metas = {meta["name"]: meta for meta in header["columns"]}
+
+        self.assertEqual(metas["genus"]["strings"], 2)
+        self.assertEqual(metas["family"]["strings"], 1)
+
+    def test_unchanged_catalogue_keeps_digest(self):
+        self.assertEqual(snapshots.build_snapshot(), snapshots.build_snapshot())
+
+    def test_current_snapshot_rebuilds_after_catalogue_change(self):
+        first = snapshots.current_snapshot()
+        self.assertEqual(snapshots.current_snapshot(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Bird.objects.create(
+                genus="Strix", species="nebulosa", english_name="Great Grey Owl"
+            )
+        self.assertNotEqual(snapshots.current_snapshot(), first)
+
+    def test_workers_sharing_the_cache_reuse_each_others_snapshot(self):
+        """A worker with its own cache connection sees the pointer as current."""
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                }
+            }
+            with override_settings(CACHES=shared):
+                digest = snapshots.current_snapshot()
+            # New cache objects, as in another process
+            with override_settings(CACHES=shared), mock.patch.object(
+                snapshots, "build_snapshot"
+            ) as build:
+                self.assertEqual(snapshots.current_snapshot(), digest)
+            build.assert_not_called()
+
+    def test_older_build_keeps_newer_pointer(self):
+        digest = snapshots.current_snapshot()
+        version = snapshots.catalogue_version()
+        # Unlike save(), update() leaves the catalogue version alone
+        Bird.objects.filter(pk=self.merlin.pk).update(english_name="Pigeon Hawk")
+        with mock.patch.object(
+            snapshots, "catalogue_version", return_value=version - 1
+        ):
+            self.assertNotEqual(snapshots.build_snapshot(), digest)
+        self.assertEqual(snapshots.current_snapshot(), digest)
+
+    def test_delta_contains_only_changes(self):
+        base = snapshots.build_snapshot()
+        self.merlin.family = None
+        self.merlin.save()
+        lyrebird_id = self.lyrebird.id
+        self.lyrebird.delete()
+        owl = Bird.objects.create(
+            genus="Strix", species="nebulosa", english_name="Great Grey Owl"
+        )
+        digest = snapshots.build_snapshot()
+
+        header, columns = snapshots.read_snapshot(snapshots.build_delta(base, digest))
+        self.assertEqual(header["kind"], "delta")
+        self.assertEqual(header["base"], base)
+        self.assertEqual(columns["id"], [self.merlin.id, owl.id])
+        self.assertEqual(columns["family"], [None, None])
+        self.assertEqual(columns["deleted_id"], [lyrebird_id])
+
+    def test_delta_from_unknown_snapshot(self):
+        digest = snapshots.build_snapshot()
+        self.assertIsNone(snapshots.build_delta("0123456789abcdef", digest))
+        self.assertIsNone(snapshots.build_delta("../../etc/passwd", digest))
+
+    def test_prune_keeps_most_recent_snapshots(self):
+        base = snapshots.build_snapshot()
+        os.utime(snapshots.snapshot_path(base), (0, 0))
+        Bird.objects.create(
+            genus="Strix", species="nebulosa", english_name="Great Grey Owl"
+        )
+        digest = snapshots.build_snapshot()
+        snapshots.build_delta(base, digest)
+
+        snapshots.prune_snapshots(keep=1)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir.name)),
+            ["catalogue-%s.hbcs" % digest, "current.json"],
+        )
+
+    def test_endpoint_serves_full_snapshot(self):
+        response = self.client.get(reverse("catalogue-snapshot"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        body = b"".join(response.streaming_content)
+        self.assertEqual(body[:4], snapshots.MAGIC)
+
+    def test_endpoint_serves_delta_since_known_snapshot(self):
+        base = self.client.get(reverse("catalogue-snapshot"))["X-Catalogue-Snapshot"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Bird.objects.create(
+                genus="Strix", species="nebulosa", english_name="Great Grey Owl"
+            )
+
+        response = self.client.get(reverse("catalogue-snapshot"), {"since": base})
+        b"".join(response.streaming_content)
+        path = snapshots.delta_path(base, response["X-Catalogue-Snapshot"])
+        header, _ = snapshots.read_snapshot(path)
+        self.assertEqual(header["rows"], 1)
+
+    def test_endpoint_not_modified(self):
+        response = self.client.get(reverse("catalogue-snapshot"))
+        digest = response["X-Catalogue-Snapshot"]
+
+        response = self.client.get(reverse("catalogue-snapshot"), {"since": digest})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            reverse("catalogue-snapshot"), HTTP_IF_NONE_MATCH=f'"{digest}"'
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_management_command_builds_snapshot_and_delta(self):
+        base = snapshots.build_snapshot()
+        Bird.objects.create(
+            genus="Strix", species="nebulosa", english_name="Great Grey Owl"
+        )
+        out = StringIO()
+        call_command("build_catalogue_snapshot", delta_from=[base], stdout=out)
+
+        self.assertIn("Snapshot", out.getvalue())
+        self.assertIn(f"Delta {base}", out.getvalue())
@@ -0,0 +1,87 @@
+from django.core.cache import cache as default_cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from api import suggest
+from api.models import Bird
+
+
+class SuggestIndexTestCase(SimpleTestCase):
+    rows = [
+        (1, "Great Grey Owl", "Strix", "nebulosa"),
+        (2, "Great Kiskadee", "Pitangus", "sulphuratus"),
+        (3, "Grey Heron", "Ardea", "cinerea"),
+        (4, "Greylag Goose", "Anser", "anser"),
+        (5, "Fiery-throated Hummingbird", "Panterpe", "insignis"),
+        (6, "Rüppell's Warbler", "Curruca", "ruppeli"),
+    ]
+
+    def setUp(self):
+        self.index = suggest.SuggestIndex(self.rows)
+
+    def _names(self, query, limit=10):
+        return [bird["english_name"] for bird in self.index.search(query, limit)]
+
+    def test_normalize(self):
+        self.assertEqual(suggest.normalize("  Rüppell's  Warbler"), "ruppell s warbler")
+
+    def test_name_start_ranks_before_inner_word(self):
+        self.assertEqual(
+            self._names("grey"), ["Grey Heron", "Greylag Goose", "Great Grey Owl"]
+        )
+
+    def test_multi_word_prefix(self):
+        self.assertEqual(self._names("great gr"), ["Great Grey Owl"])
+        self.assertEqual(self._names("grey o"), ["Great Grey Owl"])
+
+    def test_scientific_names_match(self):
+        self.assertEqual(self._names("strix neb"), ["Great Grey Owl"])
+        self.assertEqual(self._names("cinerea"), ["Grey Heron"])
+
+    def test_hyphens_and_accents_are_ignored(self):
+        self.assertEqual(self._names("throated"), ["Fiery-throated Hummingbird"])
+        self.assertEqual(self._names("ruppell"), ["Rüppell's Warbler"])
+
+    def test_each_bird_is_returned_once(self):
+        self.assertEqual(self._names("anser"), ["Greylag Goose"])
+
+    def test_limit(self):
+        self.assertEqual(len(self._names("g", limit=2)), 2)
+
+    def test_empty_query(self):
+        self.assertEqual(self._names("  "), [])
+
+
+class SuggestEndpointTestCase(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        Bird.objects.create(
+            genus="Strix", species="nebulosa", english_name="Great Grey Owl"
+        )
+
+    def test_suggest_returns_matches(self):
+        response = self.client.get(reverse("bird-suggest"), {"q": "great"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual([bird["english_name"] for bird in data], ["Great Grey Owl"])
+
+    def test_index_rebuilds_after_catalogue_change(self):
+        self.client.get(reverse("bird-suggest"), {"q": "great"})
+        with self.captureOnCommitCallbacks(execute=True):
+            Bird.objects.create(
+                genus="Pitangus", species="sulphuratus", english_name="Great Kiskadee"
+            )
+
+        response = self.client.get(reverse("bird-suggest"), {"q": "great"})
+        self.assertEqual(len(response.json()["data"]), 2)
+
+    def test_up_to_date_index_does_not_query_database(self):
+        self.client.get(reverse("bird-suggest"), {"q": "great"})
+        with self.assertNumQueries(0):
+            self.client.get(reverse("bird-suggest"), {"q": "grey"})
+
+    def test_invalid_limit(self):
+        response = self.client.get(
+            reverse("bird-suggest"), {"q": "great", "limit": "x"}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,128 @@
+import json
+
+from django.core.cache import cache as default_cache
+from django.test import TestCase
+from django.urls import reverse
+
+from api import cache, taxonomy
+from api.models import Bird, TaxonNode
+
+
+class TaxonomyTestCase(TestCase):
+    def setUp(self):
+        cache.get_backend().clear()
+        default_cache.clear()
+        for genus, species, subspecies, family in [
+            ("Lanius", "excubitor", None, "Laniidae"),
+            ("Lanius", "excubitor", "leucopygos", "Laniidae"),
+            ("Lanius", "collurio", None, "Laniidae"),
+            ("Falco", "subbuteo", None, "Falconidae"),
+            ("Menura", "novaehollandiae", None, None),
+        ]:
+            Bird.objects.create(
+                genus=genus,
+                species=species,
+                subspecies=subspecies,
+                family=family,
+                english_name=f"{genus} {species}",
+            )
+
+    def _get(self, **params):
+        response = self.client.get(reverse("taxonomy-tree"), params)
+        body = json.loads(response.content)
+        if response.status_code != 200:
+            return response.status_code, body
+        return [dict(zip(body["meta"]["fields"], row)) for row in body["data"]]
+
+    def test_tree_counts_descendant_birds(self):
+        """Every node counts the birds below it, subspecies included."""
+        taxonomy.rebuild_tree()
+        nodes = {node.path: node for node in TaxonNode.objects.all()}
+
+        self.assertEqual(nodes["Laniidae"].bird_count, 3)
+        self.assertEqual(nodes["Laniidae"].child_count, 1)
+        self.assertEqual(nodes["Laniidae/Lanius"].child_count, 2)
+        self.assertEqual(nodes["Laniidae/Lanius/excubitor"].bird_count, 2)
+        self.assertEqual(
+            nodes["Laniidae/Lanius/excubitor/leucopygos"].rank, "subspecies"
+        )
+        self.assertEqual(nodes["(unassigned)/Menura"].bird_count, 1)
+        self.assertEqual(len(nodes), 11)
+
+    def test_top_level(self):
+        nodes = self._get()
+        self.assertEqual(
+            [(node["name"], node["bird_count"]) for node in nodes],
+            [("(unassigned)", 1), ("Falconidae", 1), ("Laniidae", 3)],
+        )
+
+    def test_lazy_expansion_by_path(self):
+        """A node expands into its descendants down the requested depth."""
+        nodes = self._get(path="Laniidae/Lanius")
+        self.assertEqual(
+            [node["path"] for node in nodes],
+            [
+                "Laniidae/Lanius",
+                "Laniidae/Lanius/collurio",
+                "Laniidae/Lanius/excubitor",
+            ],
+        )
+
+        nodes = self._get(path="Laniidae", depth=3)
+        self.assertEqual(nodes[-1]["path"], "Laniidae/Lanius/excubitor/leucopygos")
+
+    def test_subtree_is_one_query(self):
+        """A fresh tree answers a subtree with a single indexed query."""
+        taxonomy.rebuild_tree()
+        with self.assertNumQueries(1):
+            rows = taxonomy.subtree("Laniidae", depth=2)
+        self.assertEqual(len(rows), 4)
+
+    def test_tree_refreshes_after_catalogue_change(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Bird.objects.create(
+                genus="Corvus", species="corax", english_name="Raven", family="Corvidae"
+            )
+        names = [node["name"] for node in self._get()]
+        self.assertIn("Corvidae", names)
+
+    def test_stale_tree_is_not_cached_while_another_process_rebuilds(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Bird.objects.create(
+                genus="Corvus", species="corax", english_name="Raven", family="Corvidae"
+            )
+        default_cache.add(taxonomy.LOCK_KEY, True)
+        response = self.client.get(reverse("taxonomy-tree"))
+        self.assertIn("no-store", response["Cache-Control"])
+        self.assertNotContains(response, "Corvidae")
+
+        default_cache.delete(taxonomy.LOCK_KEY)
+        response = self.client.get(reverse("taxonomy-tree"))
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertContains(response, "Corvidae")
+
+    def test_names_with_separators_get_their_own_paths(self):
+        for family in ("Sylviidae/Phylloscopidae", "Sylviidae Phylloscopidae"):
+            Bird.objects.create(
+                genus="Phylloscopus",
+                species="trochilus",
+                english_name="Willow Warbler",
+                family=family,
+            )
+        taxonomy.rebuild_tree()
+        nodes = dict(TaxonNode.objects.filter(depth=0).values_list("path", "name"))
+        self.assertEqual(
+            nodes["Sylviidae%2FPhylloscopidae"], "Sylviidae/Phylloscopidae"
+        )
+        self.assertEqual(nodes["Sylviidae Phylloscopidae"], "Sylviidae Phylloscopidae")
+        rows = self._get(path="Sylviidae%2FPhylloscopidae", depth=2)
+        self.assertEqual(
+            rows[-1]["path"], "Sylviidae%2FPhylloscopidae/Phylloscopus/trochilus"
+        )
+
+    def test_errors(self):
+        self.assertEqual(self._get(path="Nonexistidae")[0], 404)
+        self.assertEqual(self._get(depth=0)[0], 400)
+        self.assertEqual(self._get(depth="x")[0], 400)
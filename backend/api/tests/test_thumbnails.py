@@ -0,0 +1,172 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+import wave
+import zlib
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api import audio, thumbnails
+
+np = audio.np
+
+RATE = 24000
+
+
+def write_wav(path, samples, rate=RATE, width=2, channels=1):
+    """Write float ``samples`` in [-1, 1] as a PCM WAV file."""
+    scaled = np.round(samples * (2 ** (8 * width - 1) - 1)).astype("<i4")
+    if width == 2:
+        data = scaled.astype("<i2").tobytes()
+    else:
+        # The low three bytes of each little-endian int32
+        data = scaled.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    with wave.open(path, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(width)
+        f.setframerate(rate)
+        f.writeframes(data)
+
+
+def tone(frequency, seconds, rate=RATE, amplitude=0.5):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def read_png(data):
+    """Return ``(width, height, rows)`` of an unfiltered 8-bit grayscale PNG."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", data[16:24])
+    length = struct.unpack(">I", data[33:37])[0]
+    raw = zlib.decompress(data[41 : 41 + length])
+    rows = np.frombuffer(raw, np.uint8).reshape(height, width + 1)
+    return width, height, rows[:, 1:]
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class ThumbnailTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.audio_dir = os.path.join(directory.name, "audio")
+        self.thumbnail_dir = os.path.join(directory.name, "thumbnails")
+        os.makedirs(self.audio_dir)
+        settings = override_settings(
+            RECORDING_AUDIO={"DIR": self.audio_dir},
+            RECORDING_THUMBNAILS={
+                "DIR": self.thumbnail_dir,
+                "WIDTH": 32,
+                "HEIGHT": 16,
+                "BATCH_SIZE": 1,
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_decode_wav_mixes_down_and_scales(self):
+        path = os.path.join(self.audio_dir, "1.wav")
+        stereo = np.repeat(tone(440, 0.1), 2)
+        write_wav(path, stereo, channels=2)
+        samples, rate = audio.decode(path)
+        self.assertEqual(rate, RATE)
+        np.testing.assert_allclose(samples, tone(440, 0.1), atol=1e-3)
+
+        write_wav(path, tone(440, 0.1), width=3)
+        samples, _ = audio.decode(path, max_seconds=0.05)
+        self.assertEqual(len(samples), RATE // 20)
+        np.testing.assert_allclose(samples, tone(440, 0.05), atol=1e-3)
+
+    def test_spectrogram_shows_tone_at_its_frequency(self):
+        options = thumbnails.get_thumbnail_settings()
+        pixels = thumbnails.spectrogram_pixels(tone(6000, 1), RATE, options)
+        self.assertEqual(pixels.shape, (16, 32))
+        # 6 kHz is half of MAX_FREQUENCY, so the darkest row is mid-image
+        darkest = int(np.argmin(pixels.mean(axis=1)))
+        self.assertIn(darkest, (7, 8))
+
+    def test_waveform_peaks_follow_loudness(self):
+        samples = np.concatenate([tone(440, 0.5, amplitude=0.1), tone(440, 0.5)])
+        peaks = thumbnails.waveform_peaks(samples, 32)
+        self.assertEqual(peaks.dtype, np.uint8)
+        self.assertEqual(peaks.max(), 255)
+        self.assertTrue((peaks[:15] < 60).all())
+        self.assertTrue((peaks[17:] > 200).all())
+        self.assertFalse(thumbnails.waveform_peaks(np.zeros(100), 32).any())
+
+    def test_encode_png(self):
+        pixels = np.arange(24, dtype=np.uint8).reshape(4, 6)
+        width, height, rows = read_png(thumbnails.encode_png(pixels))
+        self.assertEqual((width, height), (6, 4))
+        np.testing.assert_array_equal(rows, pixels)
+
+    def test_build_thumbnails_renders_each_cached_recording_once(self):
+        for recording_id in ("1", "2", "3"):
+            write_wav(
+                os.path.join(self.audio_dir, f"{recording_id}.wav"), tone(3000, 0.5)
+            )
+        with open(os.path.join(self.audio_dir, "4.wav"), "wb") as f:
+            f.write(b"not audio")
+
+        rendered, errors = thumbnails.build_thumbnails(processes=2)
+        self.assertEqual(sorted(rendered), ["1", "2", "3"])
+        self.assertEqual(list(errors), ["4"])
+        width, height, _ = read_png(
+            open(thumbnails.thumbnail_path("2", "spectrogram"), "rb").read()
+        )
+        self.assertEqual((width, height), (32, 16))
+        self.assertEqual(
+            os.path.getsize(thumbnails.thumbnail_path("2", "waveform")), 32
+        )
+
+        rendered, errors = thumbnails.build_thumbnails(["1", "5"])
+        self.assertEqual(rendered, [])
+        self.assertEqual(errors, {"5": "audio not cached"})
+        rendered, _ = thumbnails.build_thumbnails(["1"], force=True)
+        self.assertEqual(rendered, ["1"])
+
+    def test_fetch_audio_downloads_uncached_recordings(self):
+        write_wav(os.path.join(self.audio_dir, "1.wav"), tone(440, 0.1))
+        details = {"2": {"file": "https://example.com/2"}, "3": {"file": ""}}
+
+        def download(recording_id, url, directory, timeout):
+            return os.path.join(directory, f"{recording_id}.mp3")
+
+        with mock.patch.object(
+            audio.recordings, "get_recordings", return_value=(details, {})
+        ) as get_recordings, mock.patch.object(audio, "_download", download):
+            paths, errors = audio.fetch_audio(["1", "2", "3"])
+        get_recordings.assert_called_once_with(["2", "3"])
+        self.assertEqual(paths["1"], os.path.join(self.audio_dir, "1.wav"))
+        self.assertEqual(paths["2"], os.path.join(self.audio_dir, "2.mp3"))
+        self.assertEqual(errors, {"3": "no audio file"})
+
+    def test_thumbnail_endpoints(self):
+        write_wav(os.path.join(self.audio_dir, "7.wav"), tone(3000, 0.5))
+        thumbnails.build_thumbnails()
+
+        response = self.client.get(reverse("recording-spectrogram", args=["XC7"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("max-age=2592000", response["Cache-Control"])
+        self.assertIn("public", response["Cache-Control"])
+        read_png(b"".join(response.streaming_content))
+
+        response = self.client.get(reverse("recording-waveform", args=["7"]))
+        self.assertEqual(len(b"".join(response.streaming_content)), 32)
+
+        response = self.client.get(reverse("recording-waveform", args=["8"]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("recording-waveform", args=["abc"]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_build_thumbnails_command(self):
+        write_wav(os.path.join(self.audio_dir, "9.wav"), tone(3000, 0.5))
+        out = io.StringIO()
+        call_command("build_thumbnails", "XC9", "--processes", "1", stdout=out)
+        self.assertIn("Rendered thumbnails of 1 recordings", out.getvalue())
+        self.assertTrue(os.path.exists(thumbnails.thumbnail_path("9", "spectrogram")))
@@ -0,0 +1,188 @@
+"""Spectrogram and waveform thumbnails of cached recordings.
+
+For each recording in the audio cache (see ``api.audio``) two files are
+written to ``RECORDING_THUMBNAILS["DIR"]``:
+
+``<id>.spectrogram.png``
+    an 8-bit grayscale PNG of ``WIDTH`` x ``HEIGHT`` pixels, louder being
+    darker, with frequencies up to ``MAX_FREQUENCY`` from bottom to top.
+``<id>.waveform.bin``
+    ``WIDTH`` bytes, each the peak amplitude of one slice of the recording
+    scaled so the loudest slice is 255.
+
+Recordings are rendered in batches of ``BATCH_SIZE`` on a process pool, so
+decoding and FFTs use every core. The worker functions only take plain
+arguments and never touch the database.
+"""
+
+import os
+import struct
+import tempfile
+import zlib
+
+from django.conf import settings
+
+from . import audio
+
+DEFAULT_SETTINGS = {
+    "DIR": os.path.join(tempfile.gettempdir(), "hellobirdie-thumbnails"),
+    "WIDTH": 256,
+    "HEIGHT": 64,
+    "N_FFT": 512,
+    "HOP": 256,
+    "MAX_FREQUENCY": 12000,
+    # Decibels below the loudest bin that still show as non-white
+    "DYNAMIC_RANGE": 80,
+    "BATCH_SIZE": 8,
+    # Pool size; None uses every core
+    "PROCESSES": None,
+    # Seconds clients and proxies may cache a thumbnail
+    "MAX_AGE": 30 * 86400,
+}
+
+KINDS = {
+    "spectrogram": (".spectrogram.png", "image/png"),
+    "waveform": (".waveform.bin", "application/octet-stream"),
+}
+
+
+def get_thumbnail_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "RECORDING_THUMBNAILS", {})}
+
+
+def thumbnail_path(recording_id, kind, directory=None):
+    directory = directory or get_thumbnail_settings()["DIR"]
+    return os.path.join(directory, f"{recording_id}{KINDS[kind][0]}")
+
+
+def _edges(length, count):
+    """Start indices splitting ``length`` items into ``count`` slices."""
+    return audio.np.linspace(0, length, count, endpoint=False).astype(int)
+
+
+def spectrogram_pixels(samples, rate, options):
+    """Return the spectrogram of ``samples`` as a (height, width) uint8 array."""
+    np = audio.np
+    magnitudes = audio.stft_magnitudes(samples, options["N_FFT"], options["HOP"])
+    bins = magnitudes.shape[1]
+    top = min(bins, int(options["MAX_FREQUENCY"] * options["N_FFT"] / rate) + 1)
+    magnitudes = magnitudes[:, :top]
+    # Max-pool frames into columns and frequency bins into rows
+    pooled = np.maximum.reduceat(magnitudes, _edges(len(magnitudes), options["WIDTH"]))
+    pooled = np.maximum.reduceat(pooled, _edges(top, options["HEIGHT"]), axis=1)
+
+    decibels = 20 * np.log10(np.maximum(pooled, 1e-10))
+    floor = decibels.max() - options["DYNAMIC_RANGE"]
+    scaled = (np.clip(decibels, floor, None) - floor) / options["DYNAMIC_RANGE"]
+    # Rows top to bottom are high to low frequencies; loud is dark
+    return (255 - scaled.T[::-1] * 255).astype(np.uint8)
+
+
+def waveform_peaks(samples, width):
+    """Return the peak amplitude of ``width`` slices as uint8, loudest 255."""
+    np = audio.np
+    if not len(samples):
+        return np.zeros(width, np.uint8)
+    peaks = np.maximum.reduceat(np.abs(samples), _edges(len(samples), width))
+    loudest = peaks.max()
+    if loudest == 0:
+        return np.zeros(width, np.uint8)
+    return (peaks / loudest * 255).astype(np.uint8)
+
+
+def _png_chunk(kind, data):
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def encode_png(pixels):
+    """Encode a (height, width) uint8 array as an 8-bit grayscale PNG."""
+    height, width = pixels.shape
+    # Each row is prefixed with filter type 0 (none)
+    rows = audio.np.hstack(
+        [audio.np.zeros((height, 1), audio.np.uint8), pixels]
+    ).tobytes()
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)),
+            _png_chunk(b"IDAT", zlib.compress(rows, 9)),
+            _png_chunk(b"IEND", b""),
+        ]
+    )
+
+
+def _write(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def render(recording_id, path, options):
+    """Write both thumbnails of the recording whose audio is at ``path``."""
+    samples, rate = audio.decode(path, options["MAX_SECONDS"])
+    os.makedirs(options["DIR"], exist_ok=True)
+    _write(
+        thumbnail_path(recording_id, "spectrogram", options["DIR"]),
+        encode_png(spectrogram_pixels(samples, rate, options)),
+    )
+    _write(
+        thumbnail_path(recording_id, "waveform", options["DIR"]),
+        waveform_peaks(samples, options["WIDTH"]).tobytes(),
+    )
+
+
+def render_batch(batch, options):
+    """Render ``(recording_id, path)`` pairs; return ``(rendered, errors)``."""
+    rendered = []
+    errors = {}
+    for recording_id, path in batch:
+        try:
+            render(recording_id, path, options)
+        except (audio.AudioUnavailable, OSError, ValueError) as error:
+            errors[recording_id] = str(error)
+        else:
+            rendered.append(recording_id)
+    return rendered, errors
+
+
+def build_thumbnails(recording_ids=None, force=False, processes=None):
+    """Render thumbnails of cached recordings that don't have them yet.
+
+    Defaults to every recording in the audio cache; ``force`` re-renders
+    existing thumbnails. Returns ``(rendered, errors)`` like ``render_batch``;
+    requested recordings missing from the audio cache are errors.
+    """
+    if audio.np is None:
+        raise audio.AudioUnavailable("NumPy is not installed")
+    audio_options = audio.get_audio_settings()
+    options = {
+        **get_thumbnail_settings(),
+        "MAX_SECONDS": audio_options["MAX_SECONDS"],
+    }
+    if processes is None:
+        processes = options["PROCESSES"]
+
+    errors = {}
+    pending = []
+    for recording_id in recording_ids or audio.cached_recording_ids():
+        path = audio.audio_path(recording_id, audio_options["DIR"])
+        if path is None:
+            errors[recording_id] = "audio not cached"
+        elif force or not os.path.exists(
+            thumbnail_path(recording_id, "waveform", options["DIR"])
+        ):
+            pending.append((recording_id, path))
+
+    rendered = []
+    for batch_rendered, batch_errors in audio.map_batches(
+        render_batch, pending, options, processes
+    ):
+        rendered.extend(batch_rendered)
+        errors.update(batch_errors)
+    return rendered, errors
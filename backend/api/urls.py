@@ -3,4 +3,38 @@ from . import views
 
 urlpatterns = [
     path("health-check/", views.health_check, name="health-check"),
+    path("birds/", views.bird_list, name="bird-list"),
+    path("birds/suggest/", views.bird_suggest, name="bird-suggest"),
+    path("sightings/", views.sighting_list, name="sighting-list"),
+    path("taxonomy/", views.taxonomy_tree, name="taxonomy-tree"),
+    path("recordings/", views.recording_list, name="recording-list"),
+    path(
+        "recordings/<str:recording_id>/",
+        views.recording_detail,
+        name="recording-detail",
+    ),
+    path(
+        "recordings/<str:recording_id>/spectrogram.png",
+        views.recording_thumbnail,
+        {"kind": "spectrogram"},
+        name="recording-spectrogram",
+    ),
+    path(
+        "recordings/<str:recording_id>/waveform",
+        views.recording_thumbnail,
+        {"kind": "waveform"},
+        name="recording-waveform",
+    ),
+    path(
+        "recordings/<str:recording_id>/similar/",
+        views.recording_similar,
+        name="recording-similar",
+    ),
+    path("species-nearby/", views.species_nearby, name="species-nearby"),
+    path(
+        "catalogue/snapshot/",
+        views.catalogue_snapshot,
+        name="catalogue-snapshot",
+    ),
+    path("cache-stats/", views.cache_stats, name="cache-stats"),
 ]
@@ -1,8 +1,356 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+
+from . import (
+    audio,
+    cache,
+    querybudget,
+    recordings,
+    rollups,
+    sightings,
+    similarity,
+    snapshots,
+    suggest,
+    taxonomy,
+    thumbnails,
+)
+from .models import Bird, Sighting
+from .responses import (
+    FastJsonResponse,
+    JsonRowStreamingResponse,
+    negotiate_encoding,
+)
+
+BIRD_FIELDS = ("id", "genus", "species", "subspecies", "english_name", "family")
+
+SIGHTINGS_DEFAULT_RADIUS_KM = 50
+SIGHTINGS_MAX_RADIUS_KM = 500
+
+SPECIES_NEARBY_DEFAULT_MONTHS = 12
+SPECIES_NEARBY_MAX_LIMIT = 200
+
+SIMILAR_DEFAULT_LIMIT = 10
+SIMILAR_MAX_LIMIT = 100
+
+TAXONOMY_MAX_DEPTH = 3
+
+# Largest bigint; larger ids can't be compared with a primary key
+MAX_BIRD_ID = 2**63 - 1
+
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
 
 
 # Create your views here.
+# At most the session and user lookups of middleware; the view itself has none
+@querybudget.query_budget(max_queries=2)
 def health_check(request):
     """Health check endpoint. Returns status confirmation."""
     response = {"status": "ok"}
     return JsonResponse(response)
+
+
+@cache.cache_response("bird-list", tags=[cache.CATALOGUE_TAG], vary_on_encoding=True)
+def bird_list(request):
+    """Bird catalogue endpoint. Streams every bird ordered by id as field rows.
+
+    With ``ids``, returns just those birds in the requested order instead.
+    """
+    if "ids" in request.GET:
+        return _bird_batch(request)
+    rows = Bird.objects.order_by("id").values_list(*BIRD_FIELDS).iterator(2000)
+    return JsonRowStreamingResponse(
+        rows, BIRD_FIELDS, compress=negotiate_encoding(request)
+    )
+
+
+def _parse_batch_ids(request, normalize):
+    """Return ``(ids, errors, error_response)`` for the ``ids`` parameter.
+
+    ``normalize`` turns one comma-separated value into an id or ``None``;
+    invalid values become per-item errors, duplicates are dropped.
+    """
+    values = [value for value in request.GET.get("ids", "").split(",") if value]
+    max_size = getattr(settings, "API_MAX_BATCH_SIZE", 100)
+    if not values:
+        return None, None, JsonResponse({"errors": ["ids is required"]}, status=400)
+    if len(values) > max_size:
+        return (
+            None,
+            None,
+            JsonResponse(
+                {"errors": [f"ids can list at most {max_size} ids"]}, status=400
+            ),
+        )
+
+    ids = {}
+    errors = []
+    for value in values:
+        normalized = normalize(value)
+        if normalized is None:
+            errors.append({"id": value, "error": "invalid id"})
+        else:
+            ids.setdefault(normalized, None)
+    return list(ids), errors, None
+
+
+def _bird_id(value):
+    value = value.strip()
+    if recordings.is_ascii_digits(value) and int(value) <= MAX_BIRD_ID:
+        return int(value)
+    return None
+
+
+def _bird_batch(request):
+    ids, errors, error_response = _parse_batch_ids(request, _bird_id)
+    if error_response:
+        return error_response
+    birds = {
+        row[0]: row for row in Bird.objects.filter(id__in=ids).values_list(*BIRD_FIELDS)
+    }
+    errors += [{"id": pk, "error": "not found"} for pk in ids if pk not in birds]
+    return FastJsonResponse(
+        {
+            "meta": {"fields": BIRD_FIELDS},
+            "data": [birds[pk] for pk in ids if pk in birds],
+            "errors": errors,
+        }
+    )
+
+
+def recording_list(request):
+    """Details of several xeno-canto recordings, e.g. ``?ids=XC123,456``."""
+    ids, errors, error_response = _parse_batch_ids(request, recordings.normalize_id)
+    if error_response:
+        return error_response
+    found, failed = recordings.get_recordings(ids)
+    errors += [{"id": pk, "error": message} for pk, message in failed.items()]
+    return FastJsonResponse(
+        {"data": [found[pk] for pk in ids if pk in found], "errors": errors}
+    )
+
+
+def recording_detail(request, recording_id):
+    """Details of one xeno-canto recording."""
+    normalized = recordings.normalize_id(recording_id)
+    if normalized is None:
+        return JsonResponse({"errors": ["invalid id"]}, status=400)
+    found, failed = recordings.get_recordings([normalized])
+    if normalized in found:
+        return FastJsonResponse({"data": found[normalized]})
+    status = 404 if failed[normalized] == "not found" else 502
+    return JsonResponse({"errors": [failed[normalized]]}, status=status)
+
+
+def recording_thumbnail(request, recording_id, kind):
+    """Precomputed spectrogram PNG or waveform peaks of a cached recording."""
+    normalized = recordings.normalize_id(recording_id)
+    if normalized is None:
+        return JsonResponse({"errors": ["invalid id"]}, status=400)
+    try:
+        file = open(thumbnails.thumbnail_path(normalized, kind), "rb")
+    except FileNotFoundError:
+        return JsonResponse({"errors": [f"no {kind} for this recording"]}, status=404)
+    response = FileResponse(file, content_type=thumbnails.KINDS[kind][1])
+    patch_cache_control(
+        response, public=True, max_age=thumbnails.get_thumbnail_settings()["MAX_AGE"]
+    )
+    return response
+
+
+@querybudget.query_budget(max_queries=2)
+def recording_similar(request, recording_id):
+    """Cached recordings that sound most like this one, most similar first.
+
+    Rows are ``[recording_id, score, bird_id, english_name]``, where ``score``
+    is the cosine similarity of the recordings' mel features and the bird is
+    the one the recording was ingested as a sighting of, if any.
+    """
+    normalized = recordings.normalize_id(recording_id)
+    if normalized is None:
+        return JsonResponse({"errors": ["invalid id"]}, status=400)
+    try:
+        limit = int(request.GET.get("limit", SIMILAR_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"errors": ["limit must be an integer"]}, status=400)
+    if audio.np is None:
+        return JsonResponse({"errors": ["similarity search unavailable"]}, status=503)
+
+    options = similarity.get_similarity_settings()
+    try:
+        matches = similarity.get_index().similar(
+            normalized,
+            max(1, min(limit, SIMILAR_MAX_LIMIT)),
+            chunk_rows=options["CHUNK_ROWS"],
+        )
+    except similarity.IndexMismatch:
+        # The feature settings changed since the index was built
+        return JsonResponse(
+            {
+                "errors": [
+                    "similarity index is out of date; "
+                    "rebuild index with index_recordings --rebuild"
+                ]
+            },
+            status=503,
+        )
+    if matches is None:
+        return JsonResponse({"errors": ["recording not indexed"]}, status=404)
+    birds = dict(
+        Sighting.objects.filter(
+            recording_id__in=[f"XC{match_id}" for match_id, _ in matches]
+        ).values_list("recording_id", "bird_id")
+    )
+    names = dict(
+        Bird.objects.filter(id__in=set(birds.values())).values_list(
+            "id", "english_name"
+        )
+    )
+    rows = []
+    for match_id, score in matches:
+        bird_id = birds.get(f"XC{match_id}")
+        rows.append([match_id, round(score, 4), bird_id, names.get(bird_id)])
+    return FastJsonResponse(
+        {
+            "meta": {"fields": ["recording_id", "score", "bird_id", "english_name"]},
+            "data": rows,
+        }
+    )
+
+
+def species_nearby(request):
+    """Birds ranked by how often they were sighted within ``radius`` km."""
+    lat, lng, radius, errors = _parse_location(request)
+    try:
+        months = int(request.GET.get("months", SPECIES_NEARBY_DEFAULT_MONTHS))
+        limit = int(request.GET.get("limit", SPECIES_NEARBY_MAX_LIMIT))
+    except ValueError:
+        errors.append("months and limit must be integers")
+    else:
+        if months < 1:
+            errors.append("months must be at least 1")
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    ranked = rollups.species_near(
+        lat, lng, radius, months, max(1, min(limit, SPECIES_NEARBY_MAX_LIMIT))
+    )
+    return FastJsonResponse(
+        {
+            "meta": {"fields": ["bird_id", "english_name", "count"], "months": months},
+            "data": ranked,
+        }
+    )
+
+
+def bird_suggest(request):
+    """Autocomplete bird names. Served from the in-memory prefix index."""
+    try:
+        limit = int(request.GET.get("limit", SUGGEST_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"errors": ["limit must be an integer"]}, status=400)
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+    results = suggest.get_index().search(request.GET.get("q", ""), limit)
+    return FastJsonResponse({"data": results})
+
+
+@cache.cache_response("taxonomy", tags=[cache.CATALOGUE_TAG])
+def taxonomy_tree(request):
+    """A subtree of the taxonomy with bird counts, for lazy tree expansion.
+
+    ``path`` selects the node to expand (the top level when omitted) and
+    ``depth`` how many levels below it to include.
+    """
+    try:
+        depth = int(request.GET.get("depth", 1))
+    except ValueError:
+        depth = 0
+    if not 1 <= depth <= TAXONOMY_MAX_DEPTH:
+        return JsonResponse(
+            {"errors": [f"depth must be between 1 and {TAXONOMY_MAX_DEPTH}"]},
+            status=400,
+        )
+
+    fresh = taxonomy.ensure_fresh()
+    path = request.GET.get("path")
+    rows = taxonomy.subtree(path, depth)
+    if path and not rows:
+        response = JsonResponse({"errors": [f"Unknown taxon {path!r}"]}, status=404)
+    else:
+        response = FastJsonResponse({"meta": {"fields": taxonomy.FIELDS}, "data": rows})
+    if not fresh:
+        # Another process is still rebuilding; the previous tree must not be
+        # cached under the new catalogue version
+        patch_cache_control(response, no_store=True)
+    return response
+
+
+def _parse_location(request):
+    """Return ``(lat, lng, radius, errors)`` from the query string."""
+    errors = []
+    lat = lng = radius = None
+    try:
+        lat = float(request.GET["lat"])
+        lng = float(request.GET["lng"])
+    except (KeyError, ValueError):
+        errors.append("lat and lng are required numbers")
+    else:
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            errors.append("lat or lng is out of range")
+    try:
+        radius = float(request.GET.get("radius", SIGHTINGS_DEFAULT_RADIUS_KM))
+    except ValueError:
+        errors.append("radius must be a number")
+    else:
+        if not 0 < radius <= SIGHTINGS_MAX_RADIUS_KM:
+            errors.append(f"radius must be between 0 and {SIGHTINGS_MAX_RADIUS_KM}")
+    return lat, lng, radius, errors
+
+
+def sighting_list(request):
+    """Sightings within ``radius`` km of ``lat``/``lng``, nearest first."""
+    lat, lng, radius, errors = _parse_location(request)
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    cell, rows = sightings.nearby_sightings(lat, lng, radius)
+    return JsonRowStreamingResponse(
+        rows,
+        sightings.RESPONSE_FIELDS,
+        meta={"cell": cell, "radius_km": radius},
+        compress=negotiate_encoding(request),
+    )
+
+
+@staff_member_required
+def cache_stats(request):
+    """Per-endpoint response cache hit rates for this process."""
+    return JsonResponse({"data": cache.stats.report()})
+
+
+def catalogue_snapshot(request):
+    """Binary catalogue snapshot for offline clients.
+
+    Clients holding an older snapshot pass its digest as ``since`` to receive
+    only the delta, when that snapshot is still known to the server.
+    """
+    digest = snapshots.current_snapshot()
+    etag = f'"{digest}"'
+    since = request.GET.get("since")
+    if since == digest or request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified(headers={"ETag": etag})
+
+    path = None
+    if since:
+        path = snapshots.build_delta(since, digest)
+    if path is None:
+        path = snapshots.snapshot_path(digest)
+
+    response = FileResponse(open(path, "rb"), content_type="application/octet-stream")
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    response["X-Catalogue-Snapshot"] = digest
+    return response
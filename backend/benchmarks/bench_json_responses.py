@@ -0,0 +1,88 @@
+"""Benchmark JSON encoding of large catalogue responses.
+
+Compares building a 50k-row body with ``JsonResponse`` over per-row dicts
+against ``JsonRowStreamingResponse`` over ``values_list()``-style tuples, for
+each available encoder and content encoding.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_json_responses [--rows 50000] [--repeat 5]
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hellobirdie.settings.local")
+django.setup()
+
+from django.http import JsonResponse  # noqa: E402
+
+from api import responses  # noqa: E402
+
+FIELDS = ("id", "genus", "species", "subspecies", "english_name", "family")
+
+
+def make_rows(count):
+    return [
+        (
+            i,
+            f"Genus{i % 2300}",
+            f"species{i}",
+            f"subspecies{i}" if i % 3 else None,
+            f"English Name Number {i}",
+            f"Family{i % 250}idae",
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+
+def bench_json_response(rows):
+    data = [dict(zip(FIELDS, row)) for row in rows]
+    return len(JsonResponse({"data": data}).content)
+
+
+def bench_streaming(rows, encoder, compress):
+    response = responses.JsonRowStreamingResponse(
+        iter(rows), FIELDS, encoder=encoder, compress=compress
+    )
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    cases = [("JsonResponse (dicts, stdlib)", lambda: bench_json_response(rows))]
+    for name in responses.ENCODERS:
+        if name == "orjson" and responses.orjson is None:
+            continue
+        encoder = responses.get_encoder(name)
+        for compress in (None,) + responses.available_encodings():
+            label = f"streaming rows ({name}, {compress or 'identity'})"
+            cases.append(
+                (label, lambda e=encoder, c=compress: bench_streaming(rows, e, c))
+            )
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for label, func in cases:
+        seconds, size = best_of(args.repeat, func)
+        print(f"{label:<40} {seconds * 1000:9.1f} ms {size / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
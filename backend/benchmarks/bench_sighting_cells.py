@@ -0,0 +1,101 @@
+"""Synthetic benchmark of location-quantized sighting caching.
+
+Simulates users spread around a few cities querying nearby sightings. Compares
+caching keyed on raw coordinates with the geohash-cell cache used by
+``/api/sightings/``, reporting hit ratios and time per query. Cell loads are
+served from an in-memory list with a simulated database latency, so no
+database is needed.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_sighting_cells [--users 20000] [--sightings 100000]
+"""
+
+import argparse
+import os
+import random
+import time
+from bisect import bisect_left
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hellobirdie.settings.local")
+django.setup()
+
+from django.core.cache import cache as default_cache  # noqa: E402
+
+from api import cache, geohash, sightings  # noqa: E402
+
+CITIES = [(52.52, 13.40), (48.86, 2.35), (51.51, -0.13), (40.42, -3.70)]
+
+
+def make_sightings(count, rng):
+    rows = []
+    for i in range(count):
+        lat, lng = rng.choice(CITIES)
+        lat += rng.gauss(0, 1)
+        lng += rng.gauss(0, 1)
+        rows.append((geohash.encode(lat, lng), (i, 1, "Bird", lat, lng, None, None)))
+    rows.sort()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--sightings", type=int, default=100_000)
+    parser.add_argument("--radius", type=float, default=50)
+    parser.add_argument(
+        "--db-latency-ms",
+        type=float,
+        default=2.0,
+        help="Simulated cost of loading one cell from the database.",
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    indexed = make_sightings(args.sightings, rng)
+    keys = [key for key, _ in indexed]
+
+    def loader(cells):
+        time.sleep(args.db_latency_ms / 1000)
+        loaded = {}
+        for cell in cells:
+            start = bisect_left(keys, cell)
+            end = bisect_left(keys, cell + "~")
+            loaded[cell] = [row for _, row in indexed[start:end]]
+        return loaded
+
+    users = []
+    for _ in range(args.users):
+        lat, lng = rng.choice(CITIES)
+        users.append(
+            (round(lat + rng.gauss(0, 0.3), 4), round(lng + rng.gauss(0, 0.3), 4))
+        )
+
+    # Raw-coordinate keys: every distinct position is a separate entry
+    seen = set()
+    raw_hits = 0
+    for user in users:
+        raw_hits += user in seen
+        seen.add(user)
+    print(f"raw coordinate keys: hit ratio {raw_hits / len(users):.3f}")
+
+    cache.get_backend().clear()
+    default_cache.clear()
+    cache.stats.reset()
+    start = time.perf_counter()
+    for lat, lng in users:
+        sightings.nearby_sightings(lat, lng, args.radius, loader=loader)
+    elapsed = time.perf_counter() - start
+
+    report = cache.stats.report()[sightings.CELL_STATS_NAME]
+    print(
+        f"geohash cell cache:  hit ratio {report['hit_rate']:.3f} "
+        f"({report['misses']} cell loads), "
+        f"{elapsed / len(users) * 1000:.2f} ms per query"
+    )
+
+
+if __name__ == "__main__":
+    main()
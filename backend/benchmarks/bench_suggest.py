@@ -0,0 +1,75 @@
+"""Benchmark autocomplete queries against the in-memory prefix index.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_suggest [--birds 30000] [--queries 20000]
+"""
+
+import argparse
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hellobirdie.settings.local")
+django.setup()
+
+from api.suggest import SuggestIndex  # noqa: E402
+
+WORDS = (
+    "great grey little black white red crested spotted golden eurasian common "
+    "northern southern lesser greater long-tailed short-toed rufous olive plain "
+    "owl heron warbler kiskadee hawk falcon lark shrike cuckoo sparrow finch "
+    "hummingbird babbler kingfisher flycatcher thrush wren pipit bunting"
+).split()
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        (
+            i,
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title(),
+            f"Genus{rng.randrange(2300)}",
+            f"species{i}",
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--birds", type=int, default=30_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.birds)
+    start = time.perf_counter()
+    index = SuggestIndex(rows)
+    print(f"built index over {args.birds} birds in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.queries):
+        name = rng.choice(rows)[1].lower()
+        queries.append(name[: rng.randint(1, len(name))])
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    def percentile(p):
+        return timings[int(p * (len(timings) - 1))] * 1_000_000
+
+    print(
+        f"{args.queries} queries: p50 {percentile(0.5):.0f} us, "
+        f"p99 {percentile(0.99):.0f} us, max {percentile(1.0):.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Fixtures for the benchmark suite.
+
+Run from the backend directory:
+
+    python -m pytest benchmarks [--bench-scale 1k|30k|1m] [--update-baseline]
+
+Timings are collected by pytest-benchmark; use ``--benchmark-autosave`` and
+``--benchmark-compare`` to compare them between runs. Query counts are
+deterministic, so they are checked against ``benchmarks/baseline.json`` on
+every run.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+from django.core.cache import cache as default_cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import cache
+from api.tests.factories import create_birds, create_sightings
+
+SCALES = {"1k": 1_000, "30k": 30_000, "1m": 1_000_000}
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("hellobirdie benchmarks")
+    group.addoption(
+        "--bench-scale",
+        choices=sorted(SCALES),
+        default="1k",
+        help="Number of birds (and sightings) to generate.",
+    )
+    group.addoption(
+        "--update-baseline",
+        action="store_true",
+        help="Rewrite benchmarks/baseline.json with the query counts of this run.",
+    )
+
+
+def pytest_configure(config):
+    config._query_counts = {}
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if config.getoption("--update-baseline", False) and config._query_counts:
+        baseline = _load_baseline()
+        baseline.update(config._query_counts)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def _load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+@pytest.fixture(scope="session")
+def bench_scale(request):
+    return SCALES[request.config.getoption("--bench-scale")]
+
+
+@pytest.fixture(scope="session")
+def catalogue(django_db_setup, django_db_blocker, bench_scale):
+    """Populate the test database once per session at the requested scale."""
+    with django_db_blocker.unblock():
+        create_birds(bench_scale)
+        create_sightings(bench_scale)
+    return bench_scale
+
+
+@pytest.fixture
+def clear_caches():
+    def clear():
+        default_cache.clear()
+        cache.get_backend().clear()
+
+    clear()
+    return clear
+
+
+@pytest.fixture
+def query_budget(request, benchmark):
+    """Record the queries of one call and compare them with the baseline.
+
+    Usage: ``query_budget(func)`` runs ``func`` once under query capture, stores
+    the count in the benchmark's ``extra_info`` and fails if it exceeds the
+    count recorded in ``baseline.json``.
+    """
+    name = request.node.name
+
+    def check(func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        count = len(queries)
+        benchmark.extra_info["queries"] = count
+        request.config._query_counts[name] = count
+
+        expected = _load_baseline().get(name)
+        if expected is not None and not request.config.getoption("--update-baseline"):
+            assert count <= expected, (
+                f"{name} ran {count} queries, baseline allows {expected}:\n"
+                + "\n".join(query["sql"] for query in queries.captured_queries)
+            )
+        return count
+
+    return check
@@ -0,0 +1,65 @@
+import tracemalloc
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def admin_client(client):
+    client.force_login(
+        User.objects.create(username="admin", is_staff=True, is_superuser=True)
+    )
+    return client
+
+
+def _get(client, url, **params):
+    def request():
+        response = client.get(url, params)
+        assert response.status_code == 200
+        return response
+
+    return request
+
+
+def test_changelist(benchmark, catalogue, admin_client, query_budget):
+    request = _get(admin_client, reverse("admin:api_bird_changelist"))
+    query_budget(request)
+    benchmark(request)
+
+
+def test_changelist_search(benchmark, catalogue, admin_client, query_budget):
+    request = _get(admin_client, reverse("admin:api_bird_changelist"), q="Bird 12")
+    query_budget(request)
+    benchmark(request)
+
+
+def test_changelist_filter(benchmark, catalogue, admin_client, query_budget):
+    request = _get(admin_client, reverse("admin:api_bird_changelist"), genus="Falco")
+    query_budget(request)
+    benchmark(request)
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export(benchmark, catalogue, admin_client, format):
+    """Stream every bird; peak traced memory must not grow with the scale."""
+    url = reverse("admin:api_bird_export", args=[format])
+
+    def request():
+        response = admin_client.get(url)
+        size = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+        return size
+
+    tracemalloc.start()
+    try:
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_memory_mb"] = round(peak / 2**20, 2)
+    assert peak < 8 * 2**20, f"export peaked at {peak / 2**20:.1f} MiB"
+    benchmark.pedantic(request, rounds=3)
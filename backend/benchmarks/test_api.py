@@ -0,0 +1,64 @@
+import pytest
+from django.urls import reverse
+
+pytestmark = pytest.mark.django_db
+
+
+def _get(client, url, **params):
+    def request():
+        response = client.get(url, params)
+        assert response.status_code == 200
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    return request
+
+
+def test_health_check(benchmark, client, query_budget):
+    request = _get(client, reverse("health-check"))
+    query_budget(request)
+    benchmark(request)
+
+
+def test_bird_list_uncached(benchmark, catalogue, client, clear_caches, query_budget):
+    request = _get(client, reverse("bird-list"))
+    query_budget(request)
+    benchmark.pedantic(request, setup=clear_caches, rounds=10)
+
+
+def test_bird_list_cached(benchmark, catalogue, client, clear_caches, query_budget):
+    request = _get(client, reverse("bird-list"))
+    request()
+    query_budget(request)
+    benchmark(request)
+
+
+def test_bird_suggest(benchmark, catalogue, client, clear_caches, query_budget):
+    request = _get(client, reverse("bird-suggest"), q="test bird 1")
+    request()
+    query_budget(request)
+    benchmark(request)
+
+
+def test_catalogue_snapshot(
+    benchmark, catalogue, client, clear_caches, query_budget, settings, tmp_path
+):
+    settings.CATALOGUE_SNAPSHOT_DIR = str(tmp_path)
+    request = _get(client, reverse("catalogue-snapshot"))
+    request()
+    query_budget(request)
+    benchmark(request)
+
+
+def test_sightings_uncached(benchmark, catalogue, client, clear_caches, query_budget):
+    request = _get(client, reverse("sighting-list"), lat=50.0, lng=12.0, radius=50)
+    query_budget(request)
+    benchmark.pedantic(request, setup=clear_caches, rounds=10)
+
+
+def test_sightings_cached(benchmark, catalogue, client, clear_caches, query_budget):
+    request = _get(client, reverse("sighting-list"), lat=50.0, lng=12.0, radius=50)
+    request()
+    query_budget(request)
+    benchmark(request)
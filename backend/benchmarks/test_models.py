@@ -0,0 +1,21 @@
+import pytest
+
+from api.models import Bird
+
+pytestmark = pytest.mark.django_db
+
+
+def test_bird_str(benchmark):
+    bird = Bird(
+        genus="Diphyllodes",
+        species="respublica",
+        subspecies="rubra",
+        english_name="Wilson's Bird-of-paradise",
+    )
+    result = benchmark(str, bird)
+    assert result == "Wilson's Bird-of-paradise (Diphyllodes respublica rubra)"
+
+
+def test_bird_str_over_catalogue_page(benchmark, catalogue):
+    birds = list(Bird.objects.order_by("id")[:100])
+    benchmark(lambda: [str(bird) for bird in birds])
@@ -0,0 +1,50 @@
+"""Per-request cost of rate limiting.
+
+Compare ``test_health_check_rate_limited`` with ``test_health_check`` in
+``test_api.py`` for the middleware's overhead on a whole request.
+"""
+
+import itertools
+
+import pytest
+from django.urls import reverse
+
+from api import ratelimit
+
+pytestmark = pytest.mark.django_db
+
+UNLIMITED = "1000000000/s"
+
+
+def test_mmap_backend_hit(benchmark, tmp_path):
+    backend = ratelimit.MmapBackend(str(tmp_path / "buckets"))
+    benchmark(backend.hit, "health-check:192.0.2.1", 10**9, 1)
+
+
+def test_mmap_backend_hit_many_clients(benchmark, tmp_path):
+    backend = ratelimit.MmapBackend(str(tmp_path / "buckets"))
+    clients = itertools.cycle(
+        [f"health-check:10.0.{i // 256}.{i % 256}" for i in range(10_000)]
+    )
+    benchmark(lambda: backend.hit(next(clients), 10**9, 1))
+
+
+def test_django_cache_backend_hit(benchmark, clear_caches):
+    backend = ratelimit.DjangoCacheBackend()
+    benchmark(backend.hit, "health-check:192.0.2.1", 10**9, 1)
+
+
+def test_health_check_rate_limited(benchmark, client, query_budget, settings, tmp_path):
+    settings.API_RATE_LIMIT = {
+        "ENABLED": True,
+        "LOCATION": str(tmp_path / "buckets"),
+        "DEFAULT": UNLIMITED,
+    }
+    url = reverse("health-check")
+
+    def request():
+        response = client.get(url)
+        assert response.status_code == 200
+
+    query_budget(request)
+    benchmark(request)
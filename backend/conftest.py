@@ -0,0 +1,106 @@
+"""pytest configuration shared by ``api/tests`` and ``benchmarks``.
+
+With pytest-xdist (``python -m pytest -n auto``), the first worker to start
+migrates a template test database and every worker then runs on its own copy
+of it (``CREATE DATABASE ... TEMPLATE`` on PostgreSQL, a file copy on SQLite),
+instead of each worker migrating a database from scratch. The template is
+recreated on the next run unless ``--reuse-db`` is given. In-memory SQLite
+databases are private to each worker, so they are simply migrated per worker.
+
+Tests slower than ``SLOW_TEST_SECONDS`` are listed at the end of every run;
+``--durations N`` lists the N slowest.
+"""
+
+import contextlib
+import fcntl
+
+import pytest
+from django.conf import settings
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+_slow_tests = []
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _in_memory():
+    return all(
+        connection.vendor == "sqlite" and not connection.settings_dict["TEST"]["NAME"]
+        for connection in connections.all()
+    )
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings_xdist_suffix():
+    """Keep one test database name for every worker; see ``django_db_setup``."""
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(
+    request,
+    django_test_environment,
+    django_db_blocker,
+    django_db_keepdb,
+    worker_id,
+    tmp_path_factory,
+):
+    verbosity = request.config.option.verbose
+    cloned = worker_id != "master" and not _in_memory()
+    with django_db_blocker.unblock():
+        if not cloned:
+            old_config = setup_databases(
+                verbosity, interactive=False, keepdb=django_db_keepdb
+            )
+        else:
+            # Shared by all workers of this run
+            root = tmp_path_factory.getbasetemp().parent
+            with _file_lock(root / "template-db.lock"):
+                ready = root / "template-db.ready"
+                old_config = setup_databases(
+                    verbosity,
+                    interactive=False,
+                    keepdb=django_db_keepdb or ready.exists(),
+                )
+                ready.touch()
+                for connection, _, _ in old_config:
+                    # PostgreSQL can't copy a database others are connected to
+                    connection.close()
+                    connection.creation.clone_test_db(
+                        suffix=worker_id, verbosity=verbosity
+                    )
+            for connection in connections.all():
+                connection.creation.setup_worker_connection(worker_id)
+
+    yield
+
+    with django_db_blocker.unblock():
+        if not cloned:
+            teardown_databases(old_config, verbosity, keepdb=django_db_keepdb)
+        else:
+            # Drops this worker's clone and points the connection back at the
+            # template, which is left for the next run
+            for connection, old_name, _ in old_config:
+                connection.creation.destroy_test_db(old_name, verbosity)
+
+
+def pytest_runtest_logreport(report):
+    threshold = getattr(settings, "SLOW_TEST_SECONDS", None)
+    if report.when == "call" and threshold and report.duration >= threshold:
+        _slow_tests.append((report.duration, report.nodeid))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _slow_tests:
+        threshold = settings.SLOW_TEST_SECONDS
+        terminalreporter.write_sep("-", f"tests slower than {threshold}s")
+        for duration, nodeid in sorted(_slow_tests, reverse=True):
+            terminalreporter.write_line(f"{duration:.3f}s {nodeid}")
@@ -21,10 +21,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.RateLimitMiddleware",
+    "api.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "api.middleware.ReplicaStickinessMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -49,6 +53,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "hellobirdie.wsgi.application"
 
+# Reads of api models go to healthy replicas (see api/routers.py). Settings
+# modules add the replica aliases to DATABASES and ALIASES; without any, every
+# query uses "default".
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+DATABASE_REPLICAS = {
+    "ALIASES": [],
+    # Seconds a replica may lag before reads fail over to the primary
+    "MAX_LAG": 5,
+    "CHECK_INTERVAL": 5,
+    # Seconds a client keeps reading from the primary after a write
+    "STICKY_SECONDS": 10,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -70,3 +87,176 @@ STATIC_URL = "static/"
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Django's cache holds state every worker process must agree on: the api cache's
+# tag versions, the taxonomy version and the "django" rate limit backend. It must
+# be shared between processes, so it defaults to files under var/cache (one host);
+# set REDIS_URL to share it between hosts. A process-local cache such as
+# LocMemCache fails the api.E001 system check.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get(
+                "CACHE_LOCATION", str(BASE_DIR / "var" / "cache")
+            ),
+            # Tag versions never expire; culling one would invalidate every
+            # entry built against it
+            "OPTIONS": {"MAX_ENTRIES": 100000},
+        }
+    }
+
+# Response cache for the api app (see api/cache.py)
+# BACKEND is one of "lru" (process-local), "django" (CACHES[CACHE_ALIAS]) or "file"
+API_CACHE = {
+    "BACKEND": os.environ.get("API_CACHE_BACKEND", "lru"),
+    "TIMEOUT": 300,
+    "MAX_ENTRIES": 1024,
+    "LOCATION": os.environ.get(
+        "API_CACHE_LOCATION", str(BASE_DIR / "var" / "api-cache")
+    ),
+    "CACHE_ALIAS": "default",
+}
+
+# JSON encoder for api responses: "auto" (orjson if installed), "orjson" or "stdlib"
+API_JSON_ENCODER = os.environ.get("API_JSON_ENCODER", "auto")
+
+# Where binary catalogue snapshots for offline clients are written (see api/snapshots.py)
+CATALOGUE_SNAPSHOT_DIR = os.environ.get(
+    "CATALOGUE_SNAPSHOT_DIR", str(BASE_DIR / "var" / "snapshots")
+)
+
+# Most ids one batch request (/api/birds/?ids=, /api/recordings/?ids=) may list
+API_MAX_BATCH_SIZE = 100
+
+# xeno-canto API used for recording details (see api/recordings.py)
+XENO_CANTO = {
+    "API_URL": "https://xeno-canto.org/api/2/recordings",
+    "TIMEOUT": 5,
+    # Seconds recording details stay cached
+    "CACHE_TIMEOUT": 86400,
+    # Concurrent upstream requests per batch
+    "MAX_WORKERS": 8,
+}
+
+# Local cache of recording audio (see api/audio.py)
+RECORDING_AUDIO = {
+    "DIR": os.environ.get("RECORDING_AUDIO_DIR", str(BASE_DIR / "var" / "audio")),
+    # Only the start of longer recordings is decoded
+    "MAX_SECONDS": 60,
+    "TIMEOUT": 30,
+}
+
+# Spectrogram and waveform thumbnails of cached recordings (see api/thumbnails.py)
+RECORDING_THUMBNAILS = {
+    "DIR": os.environ.get(
+        "RECORDING_THUMBNAILS_DIR", str(BASE_DIR / "var" / "thumbnails")
+    ),
+    "WIDTH": 256,
+    "HEIGHT": 64,
+    "N_FFT": 512,
+    "HOP": 256,
+    "MAX_FREQUENCY": 12000,
+    "DYNAMIC_RANGE": 80,
+    # Recordings per process pool task
+    "BATCH_SIZE": 8,
+    # Process pool size; None uses every core
+    "PROCESSES": None,
+    # Seconds clients and proxies may cache a thumbnail
+    "MAX_AGE": 30 * 86400,
+}
+
+# Mel feature index for /api/recordings/<id>/similar/ (see api/similarity.py)
+SIMILARITY = {
+    "DIR": os.environ.get("SIMILARITY_DIR", str(BASE_DIR / "var" / "similarity")),
+    # Changing these requires rebuilding the index (index_recordings --rebuild)
+    "N_MELS": 32,
+    "MIN_FREQUENCY": 500,
+    "MAX_FREQUENCY": 12000,
+    "N_FFT": 1024,
+    "HOP": 512,
+    # Recordings per process pool task
+    "BATCH_SIZE": 8,
+    # Process pool size; None uses every core
+    "PROCESSES": None,
+    # Rows scored at a time, bounding memory per query
+    "CHUNK_ROWS": 65536,
+}
+
+# Seconds a geohash cell's sightings stay cached (see api/sightings.py)
+SIGHTING_CELL_TIMEOUT = 600
+
+# Only serve sightings from the last N days (None for all). Bounding the dates
+# lets PostgreSQL skip the month partitions of older sightings.
+SIGHTING_WINDOW_DAYS = None
+
+# Rate limits for /api/ (see api/ratelimit.py). BACKEND is "mmap" (token buckets
+# shared by the workers on one host) or "django" (CACHES[CACHE_ALIAS], for
+# several hosts). ROUTES maps URL names to a rate such as "30/m", or None.
+API_RATE_LIMIT = {
+    "ENABLED": True,
+    "BACKEND": os.environ.get("API_RATE_LIMIT_BACKEND", "mmap"),
+    "LOCATION": str(BASE_DIR / "var" / "ratelimit"),
+    "SLOTS": 65536,
+    "CACHE_ALIAS": "default",
+    # e.g. "HTTP_X_FORWARDED_FOR" behind a trusted proxy
+    "CLIENT_IP_HEADER": None,
+    # Number of proxies appending to CLIENT_IP_HEADER; the client address is
+    # that many entries from the right, as anything left of it is spoofable
+    "TRUSTED_PROXIES": 1,
+    "DEFAULT": "120/m",
+    "ROUTES": {
+        "health-check": None,
+        "bird-suggest": "600/m",
+        "catalogue-snapshot": "30/h",
+    },
+}
+
+# Database job queue (see api/jobs.py and the run_workers command)
+JOB_QUEUE = {
+    "CHANNEL": "api_jobs",
+    # Seconds idle workers wait before checking for due jobs without a NOTIFY
+    "POLL_INTERVAL": 5,
+    # Seconds before the first retry of a failed job; doubled for each attempt
+    "RETRY_DELAY": 10,
+    # Seconds before a running job is requeued, or failed if out of attempts
+    "STALE_AFTER": 3600,
+    # Seconds between checks for stale jobs while workers run
+    "STALE_CHECK_INTERVAL": 60,
+    "METRICS_INTERVAL": 60,
+}
+
+# On-demand profiling of staff requests (see api/profiling.py)
+API_PROFILING = {
+    "ENABLED": os.environ.get("API_PROFILING_ENABLED", "true").lower() == "true",
+    # Profile requests sending this header or query parameter
+    "HEADER": "HTTP_X_PROFILE",
+    "QUERY_PARAM": "_profile",
+    # Seconds between stack samples
+    "SAMPLE_INTERVAL": 0.001,
+    "MAX_SQL_LENGTH": 2000,
+    # Number of profiles kept
+    "KEEP": 200,
+}
+
+# Query budgets and N+1 detection (see api/querybudget.py). Requests making more
+# than MAX_QUERIES queries, or running one query shape more than MAX_REPEATS
+# times, are logged ("warn") or fail ("raise"). Enabled in development and tests.
+QUERY_BUDGET = {
+    "ENABLED": os.environ.get("QUERY_BUDGET_ENABLED", "false").lower() == "true",
+    "MODE": "warn",
+    "MAX_QUERIES": None,
+    "MAX_REPEATS": 5,
+    # Budgets by URL name; views can also declare one with @query_budget
+    "ROUTES": {
+        "admin:api_bird_changelist": {"MAX_QUERIES": 10},
+        "admin:api_requestprofile_changelist": {"MAX_QUERIES": 10},
+    },
+}
@@ -53,3 +53,12 @@ else:
             ),
         }
     }
+
+# Read replicas as a comma-separated list of URLs, added as replica1, replica2...
+REPLICA_DATABASE_URLS = os.environ.get("REPLICA_DATABASE_URLS", "")
+for index, url in enumerate(filter(None, REPLICA_DATABASE_URLS.split(",")), 1):
+    DATABASES[f"replica{index}"] = dj_database_url.parse(url.strip())
+    DATABASE_REPLICAS["ALIASES"].append(f"replica{index}")
+
+# Log requests over their query budget (likely N+1 queries) while developing
+QUERY_BUDGET = {**QUERY_BUDGET, "ENABLED": True}
@@ -75,6 +75,37 @@ else:
         }
     }
 
+# TEST_DATABASE=sqlite runs the suite on an in-memory SQLite database instead,
+# for quick model and admin test runs without PostgreSQL; PostgreSQL-only tests
+# skip themselves
+if os.environ.get("TEST_DATABASE") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "test.sqlite3",
+        }
+    }
+
+# A replica alias mirroring the test database; routing tests enable it with
+# override_settings(DATABASE_REPLICAS=...)
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+
+# Each test process gets its own cache, which also keeps parallel test workers
+# apart; api.E001 only matters for multi-process servers
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+SILENCED_SYSTEM_CHECKS = ["api.E001"]
+
+# Tests issue many requests from one client; rate limit tests enable it
+API_RATE_LIMIT = {**API_RATE_LIMIT, "ENABLED": False}
+
+# Any request the test client makes over its query budget fails the test
+QUERY_BUDGET = {**QUERY_BUDGET, "ENABLED": True, "MODE": "raise"}
+
+# Reports tests slower than SLOW_TEST_SECONDS after each run (see
+# hellobirdie/test_runner.py and conftest.py)
+TEST_RUNNER = "hellobirdie.test_runner.TestRunner"
+SLOW_TEST_SECONDS = float(os.environ.get("SLOW_TEST_SECONDS", "0.5"))
+
 # Faster password hashing for tests
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.MD5PasswordHasher",
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` that lists the tests slower than ``SLOW_TEST_SECONDS``.
+
+    Per-test timings come from unittest, so the list also covers ``--parallel``
+    runs; ``--durations N`` additionally prints the N slowest tests.
+    """
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        self.report_slow_tests(result)
+        return result
+
+    def report_slow_tests(self, result):
+        threshold = getattr(settings, "SLOW_TEST_SECONDS", None)
+        if not threshold:
+            return
+        slow = sorted(
+            (
+                (elapsed, name)
+                for name, elapsed in getattr(result, "collectedDurations", [])
+                if elapsed >= threshold
+            ),
+            reverse=True,
+        )
+        if slow:
+            self.log(f"\n{len(slow)} tests took longer than {threshold}s:")
+            for elapsed, name in slow:
+                self.log(f"  {elapsed:.3f}s {name}")